@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - AI Sonuç Önbelleği
+Aynı metin veya görsel için, aynı persona/model/prompt sürümüyle üretilmiş başlıkları
+saklar. Önde bellek içi bir LRU, arkada `bot_data.db` içinde süre (TTL) ve boyut
+sınırlı bir SQLite tablosu bulunur.
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+
+class AICache:
+    """İçerik adresli (hash anahtarlı) iki katmanlı AI önbelleği."""
+
+    def __init__(self, db_path: str = 'bot_data.db', memory_size: int = 256, ttl_seconds: int = 7 * 24 * 3600,
+                 max_rows: int = 5000, evict_every: int = 50):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._writes = 0
+
+    def ensure_schema(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE IF NOT EXISTS ai_cache (cache_key TEXT PRIMARY KEY, kind TEXT, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_ai_cache_last_used ON ai_cache (last_used)')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def make_key(kind: str, content: Union[str, bytes], persona_prompt: str, model_name: str, prompt_version: int) -> str:
+        digest = hashlib.sha256()
+        for part in (kind, persona_prompt, model_name, str(prompt_version)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        digest.update(content.encode('utf-8') if isinstance(content, str) else content)
+        return f"{kind}:{digest.hexdigest()}"
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _db_get(self, key: str) -> Optional[Tuple[str, float]]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT value, created_at FROM ai_cache WHERE cache_key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE ai_cache SET last_used = ? WHERE cache_key = ?", (time.time(), key))
+                conn.commit()
+        finally:
+            conn.close()
+        return row
+
+    def _db_set(self, key: str, value: str, now: float, evict: bool) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("INSERT OR REPLACE INTO ai_cache (cache_key, kind, value, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                         (key, key.split(':', 1)[0], value, now, now))
+            if evict:
+                # Süresi dolanlar silinir, sonra en az kullanılanlardan başlanarak boyut sınırına inilir.
+                conn.execute("DELETE FROM ai_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                conn.execute("DELETE FROM ai_cache WHERE cache_key IN (SELECT cache_key FROM ai_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                             (self.max_rows,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is None:
+            entry = await asyncio.to_thread(self._db_get, key)
+        if entry is None or now - entry[1] > self.ttl_seconds:
+            self._memory.pop(key, None)
+            self.misses += 1
+            return None
+        self._remember(key, entry[0], entry[1])
+        self.hits += 1
+        return entry[0]
+
+    async def set(self, key: str, value: str) -> None:
+        now = time.time()
+        self._remember(key, value, now)
+        self._writes += 1
+        await asyncio.to_thread(self._db_set, key, value, now, self._writes % self.evict_every == 0)
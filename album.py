@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Albüm (media_group) Toplayıcı
+Telegram albümdeki her öğeyi ayrı bir güncelleme olarak gönderir. Toplayıcı, aynı
+`media_group_id` değerine sahip mesajları kısa bir pencere boyunca biriktirir ve
+albüm tamamlandığında hepsini tek seferde işleyiciye verir.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MAX_ALBUM_ITEMS = 10
+
+
+class MediaGroupAggregator:
+    """Son öğeden `window` saniye sonra (veya 10 öğeye ulaşınca) albümü işleyiciye teslim eder."""
+
+    def __init__(self, on_album: Callable[[List[Any], Any], Awaitable[None]], window: float = 1.5):
+        self.on_album = on_album
+        self.window = window
+        self._groups: Dict[str, List[Any]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._groups)
+
+    def add(self, message: Any, bot: Any) -> None:
+        group_id = message.media_group_id
+        items = self._groups.setdefault(group_id, [])
+        items.append(message)
+        timer = self._timers.pop(group_id, None)
+        if timer:
+            timer.cancel()
+        if len(items) >= TELEGRAM_MAX_ALBUM_ITEMS:
+            self._flush(group_id, bot)
+        else:
+            self._timers[group_id] = asyncio.get_running_loop().call_later(self.window, self._flush, group_id, bot)
+
+    def _flush(self, group_id: str, bot: Any) -> None:
+        self._timers.pop(group_id, None)
+        items = self._groups.pop(group_id, None)
+        if not items:
+            return
+        items.sort(key=lambda m: m.message_id)
+        task = asyncio.get_running_loop().create_task(self._run(items, bot))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: List[Any], bot: Any) -> None:
+        try:
+            await self.on_album(items, bot)
+        except Exception as e:
+            logger.error(f"Albüm işleme hatası ({items[0].media_group_id}): {e}")
+
+    async def drain(self) -> None:
+        """Kapanışta bekleyen albümleri hemen işler ve bitmelerini bekler."""
+        for group_id in list(self._timers):
+            timer = self._timers.pop(group_id)
+            timer.cancel()
+            items = self._groups.get(group_id)
+            if items:
+                self._flush(group_id, items[0].get_bot())
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
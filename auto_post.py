@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Zamanlanmış Otomatik Gönderiler
+Her zaman dilimi (slot) kendi saati, personası ve hedef kanallarıyla APScheduler'a iki
+cron işi olarak eklenir: gönderim saatinden `warm_minutes` önce içerik üretilip
+`bot_data.db` içine kaydedilir, tam dakikasında ise hazır metin tüm kanallara eşzamanlı
+gönderilir. Her çalıştırmanın durumu ve (çalıştırma, hedef) başına gönderim kaydı SQLite'ta
+tutulduğundan, bot kapalıyken kaçırılan ya da yarım kalan gönderim açılışta `misfire_grace`
+süresi içindeyse yalnızca eksik kanallara bir kez yapılır.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from apscheduler.triggers.cron import CronTrigger
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+AUTO_POSTS = registry.counter("krbrz_auto_posts_total", "Zamanlanmış gönderi çalıştırmaları.", ["outcome"])
+JOB_PREFIXES = ("auto_post_warm:", "auto_post_fire:")
+
+
+def parse_time(value: str) -> Optional[Tuple[int, int]]:
+    """"SS:DD" biçimindeki saati (saat, dakika) olarak döndürür; geçersizse None."""
+    parts = value.strip().split(":")
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        return None
+    hour, minute = int(parts[0]), int(parts[1])
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+class AutoPostScheduler:
+    """Slotları zamanlayıcıya işleyen, içeriği önceden hazırlayan ve çalıştırmaları kalıcı tutan yönetici."""
+
+    def __init__(self, scheduler, generate: Callable[[Dict], Awaitable[Optional[str]]], db_path: str = 'bot_data.db',
+                 warm_minutes: int = 10, misfire_grace: float = 3600.0, keep_days: int = 30):
+        self.scheduler = scheduler
+        self.generate = generate
+        self.db_path = db_path
+        self.warm_minutes = warm_minutes
+        self.misfire_grace = misfire_grace
+        self.keep_days = keep_days
+        self._deliver: Optional[Callable[[Dict, str, List[str]], Awaitable[List[str]]]] = None
+        self._destinations: Callable[[Dict], List[str]] = lambda slot: []
+        self._slots: Dict[str, Dict] = {}
+        self._warming: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._firing: set = set()
+        self._catch_up_task: Optional[asyncio.Task] = None
+
+    def ensure_schema(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS auto_post_runs (slot_id TEXT NOT NULL, run_key TEXT NOT NULL, content TEXT, '
+                         'status TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (slot_id, run_key)) WITHOUT ROWID')
+            conn.execute('CREATE TABLE IF NOT EXISTS auto_post_deliveries (slot_id TEXT NOT NULL, run_key TEXT NOT NULL, destination TEXT NOT NULL, '
+                         'delivered_at REAL NOT NULL, PRIMARY KEY (slot_id, run_key, destination)) WITHOUT ROWID')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _execute(self, sql: str, params: Tuple = (), fetch: bool = False):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(sql, params)
+            rows = cursor.fetchall() if fetch else cursor.rowcount
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    async def _db(self, sql: str, params: Tuple = (), fetch: bool = False):
+        return await asyncio.to_thread(self._execute, sql, params, fetch)
+
+    async def _run_row(self, slot_id: str, run_key: str) -> Optional[Tuple[Optional[str], str]]:
+        rows = await self._db("SELECT content, status FROM auto_post_runs WHERE slot_id = ? AND run_key = ?", (slot_id, run_key), fetch=True)
+        return rows[0] if rows else None
+
+    async def _save_run(self, slot_id: str, run_key: str, content: Optional[str], status: str) -> None:
+        await self._db("INSERT OR REPLACE INTO auto_post_runs (slot_id, run_key, content, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                       (slot_id, run_key, content, status, time.time()))
+
+    async def _delivered(self, slot_id: str, run_key: str) -> set:
+        rows = await self._db("SELECT destination FROM auto_post_deliveries WHERE slot_id = ? AND run_key = ?", (slot_id, run_key), fetch=True)
+        return {row[0] for row in rows}
+
+    async def _mark_delivered(self, slot_id: str, run_key: str, destination: str) -> None:
+        await self._db("INSERT OR IGNORE INTO auto_post_deliveries (slot_id, run_key, destination, delivered_at) VALUES (?, ?, ?, ?)",
+                       (slot_id, run_key, destination, time.time()))
+
+    def _trigger(self, hour: int, minute: int) -> CronTrigger:
+        return CronTrigger(hour=hour, minute=minute, timezone=self.scheduler.timezone)
+
+    def _fire_times(self, slot: Dict) -> Tuple[datetime, datetime]:
+        """Slotun en son (geçmiş) ve bir sonraki gönderim zamanları."""
+        now = datetime.now(self.scheduler.timezone)
+        trigger = self._trigger(*parse_time(slot["time"]))
+        return trigger.get_next_fire_time(None, now - timedelta(days=1)), trigger.get_next_fire_time(None, now)
+
+    @staticmethod
+    def run_key(fire_time: datetime) -> str:
+        return fire_time.strftime("%Y-%m-%d %H:%M")
+
+    def reschedule(self, slots: List[Dict]) -> None:
+        """Zamanlayıcıdaki slot işlerini verilen listeyle değiştirir; menüden yapılan değişiklikler hemen geçerli olur."""
+        for job in self.scheduler.get_jobs():
+            if job.id.startswith(JOB_PREFIXES):
+                job.remove()
+        self._slots = {}
+        for slot in slots:
+            parsed = parse_time(slot.get("time", ""))
+            if not slot.get("enabled", True) or parsed is None:
+                continue
+            hour, minute = parsed
+            warm_at = (hour * 60 + minute - self.warm_minutes) % 1440
+            self._slots[slot["id"]] = slot
+            self.scheduler.add_job(self.warm, self._trigger(warm_at // 60, warm_at % 60), args=[slot["id"]],
+                                   id=f"auto_post_warm:{slot['id']}", misfire_grace_time=300, coalesce=True)
+            self.scheduler.add_job(self.fire, self._trigger(hour, minute), args=[slot["id"]],
+                                   id=f"auto_post_fire:{slot['id']}", misfire_grace_time=300, coalesce=True)
+        if self._slots:
+            logger.info("Otomatik gönderi zamanlandı: " + ", ".join(f"{s['time']} ({s['id']})" for s in self._slots.values()))
+        else:
+            logger.info("Zamanlanmış otomatik gönderi yok.")
+
+    def next_runs(self) -> List[Tuple[Dict, datetime]]:
+        """Etkin slotlar ve bir sonraki gönderim zamanları, zamana göre sıralı."""
+        return sorted(((slot, self._fire_times(slot)[1]) for slot in self._slots.values()), key=lambda item: item[1])
+
+    async def _prepare(self, slot: Dict, run_key: str) -> Optional[str]:
+        """Çalıştırmanın içeriğini üretip kaydeder; kayıtlı içerik varsa onu döndürür."""
+        row = await self._run_row(slot["id"], run_key)
+        if row and row[0]:
+            return row[0]
+        content = await self.generate(slot)
+        if content:
+            await self._save_run(slot["id"], run_key, content, "warm")
+        return content
+
+    async def warm(self, slot_id: str) -> None:
+        """Bir sonraki gönderimin içeriğini önceden üretir."""
+        slot = self._slots.get(slot_id)
+        if slot is None:
+            return
+        run_key = self.run_key(self._fire_times(slot)[1])
+        key = (slot_id, run_key)
+        if key in self._warming:
+            return
+        task = self._warming[key] = asyncio.ensure_future(self._prepare(slot, run_key))
+        try:
+            if await task:
+                logger.info(f"Otomatik gönderi içeriği hazır ({slot['time']}, {slot_id}).")
+            else:
+                logger.warning(f"Otomatik gönderi içeriği önceden üretilemedi ({slot_id}), gönderim saatinde yeniden denenecek.")
+        finally:
+            self._warming.pop(key, None)
+
+    async def fire(self, slot_id: str, run_key: Optional[str] = None) -> None:
+        """Slotun gönderimini yapar; içerik hazırlanıyorsa onu bekler, hiç yoksa şimdi üretir."""
+        slot = self._slots.get(slot_id)
+        if slot is None or self._deliver is None:
+            return
+        run_key = run_key or self.run_key(self._fire_times(slot)[0])
+        key = (slot_id, run_key)
+        if key in self._firing:
+            return
+        self._firing.add(key)
+        try:
+            row = await self._run_row(slot_id, run_key)
+            if row and row[1] == "done":
+                return
+            warming = self._warming.get(key)
+            content = await warming if warming is not None else await self._prepare(slot, run_key)
+            if not content:
+                AUTO_POSTS.inc(outcome="no_content")
+                logger.error(f"Otomatik gönderi için AI içerik üretemedi ({slot_id}).")
+                return
+            # Yalnızca bu çalıştırmada henüz ulaşılmamış kanallara gönderilir; yeniden denemede tekrar gönderim olmaz.
+            delivered = await self._delivered(slot_id, run_key)
+            pending = [dest for dest in dict.fromkeys(self._destinations(slot)) if dest not in delivered]
+            sent = await self._deliver(slot, content, pending) if pending else []
+            for dest in sent:
+                await self._mark_delivered(slot_id, run_key, dest)
+            remaining = [dest for dest in pending if dest not in sent]
+            complete = not remaining and bool(delivered or sent)
+            await self._save_run(slot_id, run_key, content, "done" if complete else "failed")
+            AUTO_POSTS.inc(outcome="sent" if complete else ("partial" if sent else "failed"))
+            if remaining:
+                logger.warning(f"Otomatik gönderi {len(remaining)} kanala ulaşamadı ({slot_id}): {', '.join(remaining)}")
+        except Exception as e:
+            AUTO_POSTS.inc(outcome="failed")
+            logger.error(f"Otomatik gönderi hatası ({slot_id}): {e}")
+        finally:
+            self._firing.discard(key)
+
+    async def _catch_up(self) -> None:
+        """Bot kapalıyken kaçırılan ve henüz gönderilmemiş çalıştırmaları bir kez yapar."""
+        now = datetime.now(self.scheduler.timezone)
+        missed = []
+        for slot in self._slots.values():
+            previous = self._fire_times(slot)[0]
+            if (now - previous).total_seconds() > self.misfire_grace:
+                continue
+            row = await self._run_row(slot["id"], self.run_key(previous))
+            if row is None or row[1] != "done":
+                logger.warning(f"Kaçırılan otomatik gönderi yapılıyor ({self.run_key(previous)}, {slot['id']}).")
+                missed.append(self.fire(slot["id"], self.run_key(previous)))
+        await asyncio.gather(*missed)
+
+    async def seed_previous_run(self, slot: Dict) -> None:
+        """Slotun son çalıştırmasını yapılmış sayar; eski ayardan dönüştürülen slot açılışta tekrar gönderilmez."""
+        if parse_time(slot.get("time", "")) is None:
+            return
+        run_key = self.run_key(self._fire_times(slot)[0])
+        await self._db("INSERT OR IGNORE INTO auto_post_runs (slot_id, run_key, content, status, updated_at) VALUES (?, ?, NULL, 'done', ?)",
+                       (slot["id"], run_key, time.time()))
+
+    async def start(self, deliver: Callable[[Dict, str, List[str]], Awaitable[List[str]]], destinations: Callable[[Dict], List[str]],
+                    slots: List[Dict]) -> None:
+        """`deliver(slot, metin, hedefler)` ulaşılan hedefleri döndürür; `destinations(slot)` slotun tüm hedefleridir."""
+        self._deliver = deliver
+        self._destinations = destinations
+        await self._db("DELETE FROM auto_post_runs WHERE updated_at < ?", (time.time() - self.keep_days * 86400,))
+        await self._db("DELETE FROM auto_post_deliveries WHERE delivered_at < ?", (time.time() - self.keep_days * 86400,))
+        self.reschedule(slots)
+        # Zamanlayıcı, botun çalıştığı döngüye bağlanması için döngü içinde başlatılır.
+        if not self.scheduler.running:
+            self.scheduler.start()
+        self._catch_up_task = asyncio.get_running_loop().create_task(self._catch_up())
+
+    async def stop(self) -> None:
+        if self._catch_up_task is not None:
+            await asyncio.gather(self._catch_up_task, return_exceptions=True)
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Mikro Toplu İşleyici (Micro-batcher)
+Aynı anahtara (model + persona) sahip bekleyen istekleri birkaç on milisaniye ya da
+boyut sınırı dolana kadar biriktirir ve tek bir çağrıda işler. Sonuçlar bekleyen
+eşyordamlara dağıtılır; toplu çağrı başarısız olursa her istek tek tek işlenir.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """`process_batch(key, items)` ile toplu, `process_single(key, item)` ile tekil işleyen toplayıcı."""
+
+    def __init__(self, process_batch: Callable[[Hashable, List[Any]], Awaitable[List[Any]]],
+                 process_single: Callable[[Hashable, Any], Awaitable[Any]],
+                 max_batch_size: int = 8, max_wait: float = 0.03):
+        self.process_batch = process_batch
+        self.process_single = process_single
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_sizes: Counter = Counter()
+        self.fallbacks = 0
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._tasks = set()
+
+    @property
+    def average_batch_size(self) -> float:
+        batches = sum(self.batch_sizes.values())
+        return sum(size * count for size, count in self.batch_sizes.items()) / batches if batches else 0.0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        group = self._pending.setdefault(key, [])
+        group.append((item, future))
+        if len(group) >= self.max_batch_size:
+            self._dispatch(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._dispatch, key)
+        return await future
+
+    def _dispatch(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        group = self._pending.pop(key, None)
+        if group:
+            task = asyncio.get_running_loop().create_task(self._run(key, group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Hashable, group: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batch_sizes[len(group)] += 1
+        items = [item for item, _ in group]
+        if len(group) > 1:
+            try:
+                results = await self.process_batch(key, items)
+                if len(results) != len(group):
+                    raise ValueError(f"{len(group)} sonuç bekleniyordu, {len(results)} geldi")
+                for (_, future), result in zip(group, results):
+                    if not future.done():
+                        future.set_result(result)
+                return
+            except Exception as e:
+                self.fallbacks += 1
+                logger.warning(f"Toplu istek işlenemedi ({len(group)} öğe), tekil isteklere dönülüyor: {e}")
+        results = await asyncio.gather(*(self.process_single(key, item) for item in items), return_exceptions=True)
+        for (_, future), result in zip(group, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,538 @@
+# -*- coding: utf-8 -*-
+"""
+Uçtan Uca Çevrimdışı Benchmark
+`forwarder`, `user_message_handler` ve otomatik gönderi zamanlayıcısını sahte
+`Update` nesneleriyle çalıştırır. Telegram yerine gönderimleri kaydeden (ve istenirse
+`RetryAfter` fırlatan) süreç içi sahte bir `Bot`, Gemini yerine gecikmesi ve 429 oranı
+ayarlanabilen yerel bir `generateContent`/`streamGenerateContent` HTTP taslağı kullanılır. Her iş yükü için
+mesaj/saniye, aşama bazında p50/p95/p99, en yüksek RSS ve olay döngüsü gecikmesi raporlanır.
+
+`--compare-vision` ile görsel iş yükleri ön işleme kapalı ve açıkken iki kez çalıştırılır;
+Gemini'ye gönderilen bayt ve gecikme farkı yan yana görülür. `--compare-stream` ile `reply`
+iş yükü akışsız ve akışlı yanıtla iki kez çalıştırılır; `stage[reply_first_text]` satırı
+müşterinin ilk metni görme süresidir. `--degraded-model` bir modeli sürekli 429 döndürür,
+`--slow-rate`/`--slow-latency` yavaş kuyruk gecikmesi ekler; model yönlendiricinin devre
+kesici, yedek istek ve süre sınırı davranışı sonda özetlenir.
+
+Kullanım: python benchmarks/bench_pipeline.py [--messages 40] [--workloads text,photo,video,album,reply,auto]
+          [--gemini-latency 0.2] [--gemini-429-rate 0.05] [--retry-after-rate 0.02] [--real-limits]
+          [--photo-size 1280x720] [--compare-vision] [--compare-stream] [--stream-chunks 8]
+          [--degraded-model gemini-1.5-flash-latest] [--slow-rate 0.05] [--slow-latency 8]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import re
+import resource
+import socket
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image, ImageDraw
+
+SOURCE = "bench_kaynak"
+DESTINATIONS = ["@bench_hedef_1", "@bench_hedef_2", "@bench_hedef_3"]
+ADMIN_ID = 1
+WORKLOADS = ("text", "photo", "video", "album", "reply", "auto")
+
+
+# --- Sahte Gemini ---
+REPLY_TEXT = ("Merhaba! *KRBRZ VIP BYPASS* şu an sorunsuz çalışıyor ve her güncellemeyle birlikte test ediliyor. "
+              "Kurulum birkaç dakika sürüyor, emülatörünüzde ek bir ayar gerekmiyor. Güncel duyurular, fiyatlar ve "
+              "kullanıcı yorumları için ana kanalımızı takip edebilirsiniz: @KRBRZ063 #KRBRZVipBypass")
+
+
+def build_gemini_stub(latency: float, rate_429: float, retry_after: float, stats: dict, stream_chunks: int = 8,
+                      degraded_model: str = None, slow_rate: float = 0.0, slow_latency: float = 8.0):
+    """`generateContent` ve `streamGenerateContent` uç noktalarını taklit eden Starlette uygulaması.
+
+    Akışlı yanıt `latency` süresine yayılmış `stream_chunks` SSE olayı olarak gönderilir; gelen
+    gövde boyutları `stats`'a yazılır. `degraded_model` her istekte 429 döndürür, isteklerin
+    `slow_rate` kadarı `slow_latency` saniye sürer.
+    """
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    rnd = random.Random(42)
+
+    def answer(payload: dict) -> str:
+        prompt = payload["contents"][0]["parts"][0]["text"]
+        if payload.get("generationConfig", {}).get("responseMimeType") == "application/json":
+            count = len(re.findall(r'^\d+\. "', prompt, flags=re.MULTILINE))
+            return json.dumps([f"Sahte başlık {i + 1} @KRBRZ063" for i in range(count)], ensure_ascii=False)
+        if "Bir müşteri" in prompt:
+            return REPLY_TEXT
+        return "Sahte başlık @KRBRZ063 #KRBRZVipBypass"
+
+    async def read_payload(request: Request) -> dict:
+        body = await request.body()
+        payload = json.loads(body)
+        stats["requests"] += 1
+        stats["bytes"] += len(body)
+        if any("inline_data" in part for part in payload["contents"][0]["parts"]):
+            stats["image_requests"] += 1
+            stats["image_bytes"] += len(body)
+        return payload
+
+    def rate_limited():
+        return JSONResponse({"error": {"code": 429}}, status_code=429, headers={"Retry-After": str(retry_after)})
+
+    def failing(request: Request) -> bool:
+        return request.path_params["model"] == degraded_model or rnd.random() < rate_429
+
+    async def generate_content(request: Request):
+        payload = await read_payload(request)
+        await asyncio.sleep(slow_latency if rnd.random() < slow_rate else latency)
+        if failing(request):
+            return rate_limited()
+        return JSONResponse({"candidates": [{"content": {"parts": [{"text": answer(payload)}]}}]})
+
+    async def stream_generate_content(request: Request):
+        payload = await read_payload(request)
+        stats["stream_requests"] += 1
+        if failing(request):
+            await asyncio.sleep(latency / stream_chunks)
+            return rate_limited()
+        text = answer(payload)
+        step = math.ceil(len(text) / stream_chunks)
+
+        async def events():
+            for offset in range(0, len(text), step):
+                await asyncio.sleep(latency / stream_chunks)
+                chunk = {"candidates": [{"content": {"parts": [{"text": text[offset:offset + step]}], "role": "model"}}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/models/{model}:generateContent", generate_content, methods=["POST"]),
+                             Route("/models/{model}:streamGenerateContent", stream_generate_content, methods=["POST"])])
+
+
+async def start_gemini_stub(app):
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="error", access_log=False, lifespan="off"))
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+# --- Sahte Telegram ---
+class FakeFile:
+    file_path = None
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.file_size = len(data)
+
+    async def download_as_bytearray(self) -> bytearray:
+        return bytearray(self.data)
+
+    async def download_to_memory(self, out) -> None:
+        out.write(self.data)
+
+
+class FakeBot:
+    """Gönderimleri kaydeden, ağ gecikmesini taklit eden ve istenirse `RetryAfter` fırlatan bot."""
+
+    def __init__(self, files: Dict[str, bytes], latency: float = 0.01, retry_after_rate: float = 0.0, retry_after: float = 0.2):
+        self.files = files
+        self.latency = latency
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.sent: List[tuple] = []
+        self.retry_afters = 0
+        self._counter = 0
+        self._rnd = random.Random(7)
+
+    async def _call(self, method: str, chat_id=None):
+        from telegram.error import RetryAfter
+
+        await asyncio.sleep(self.latency)
+        if chat_id is not None and self._rnd.random() < self.retry_after_rate:
+            self.retry_afters += 1
+            raise RetryAfter(self.retry_after)
+        self.sent.append((method, chat_id))
+        self._counter += 1
+        return self._counter
+
+    def _message(self, kind: str, number: int):
+        if kind == 'photo':
+            return SimpleNamespace(photo=[SimpleNamespace(file_id=f"yuklenen_foto_{number}")], video=None)
+        if kind == 'video':
+            return SimpleNamespace(photo=[], video=SimpleNamespace(file_id=f"yuklenen_video_{number}"))
+        return SimpleNamespace(photo=[], video=None, message_id=number)
+
+    async def get_file(self, file_id: str):
+        await asyncio.sleep(self.latency)
+        return FakeFile(self.files[file_id])
+
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        return self._message('photo', await self._call("send_photo", chat_id))
+
+    async def send_video(self, chat_id, video, caption=None, **kwargs):
+        return self._message('video', await self._call("send_video", chat_id))
+
+    async def send_message(self, chat_id, text, **kwargs):
+        message = self._message('text', await self._call("send_message", chat_id))
+        # Aşamalı yanıtlar gönderilen mesajı `edit_text` ile günceller.
+        message.edit_text = lambda new_text, **kw: self.edit_message_text(new_text, chat_id=chat_id, message_id=message.message_id, **kw)
+        return message
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        await self._call("edit_message_text", chat_id)
+        return True
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        return self._message('text', await self._call("copy_message", chat_id))
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        number = await self._call("send_media_group", chat_id)
+        return [self._message('photo' if type(item).__name__ == "InputMediaPhoto" else 'video', number * 100 + index)
+                for index, item in enumerate(media)]
+
+    async def send_chat_action(self, chat_id, action, **kwargs):
+        await self._call("send_chat_action")
+        return True
+
+
+def make_photo(index: int, width: int, height: int) -> bytes:
+    """Her indeks için farklı (AI önbelleğine takılmayan) bir JPEG üretir."""
+    rnd = random.Random(index)
+    image = Image.new("RGB", (width, height), (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(20):
+        x, y = rnd.randrange(width), rnd.randrange(height)
+        draw.rectangle((x, y, x + rnd.randrange(40, 300), y + rnd.randrange(40, 200)), fill=(rnd.randrange(256), 90, 40))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+# --- Sahte Güncellemeler ---
+def channel_post(message_id: int, **fields) -> dict:
+    post = {"message_id": message_id, "date": int(time.time()), "chat": {"id": -1009000000001, "type": "channel", "username": SOURCE, "title": "Bench"}}
+    post.update(fields)
+    return {"update_id": message_id, "channel_post": post}
+
+
+def add_photo(files: Dict[str, bytes], name: str, index: int, size: tuple) -> list:
+    """Telegram'ın yaptığı gibi aynı görselin küçükten büyüğe PhotoSize varyantlarını üretir."""
+    width, height = size
+    original = make_photo(index, width, height)
+    sizes = []
+    for suffix, edge in (("kucuk", 90), ("s", 320), ("m", 800), (None, max(width, height))):
+        if edge > max(width, height):
+            continue
+        file_id = f"{name}_{suffix}" if suffix else name
+        scaled = (max(1, width * edge // max(width, height)), max(1, height * edge // max(width, height)))
+        if suffix:
+            with Image.open(io.BytesIO(original)) as image:
+                buffer = io.BytesIO()
+                image.resize(scaled).save(buffer, format="JPEG", quality=85)
+                files[file_id] = buffer.getvalue()
+        else:
+            files[file_id] = original
+        sizes.append({"file_id": file_id, "file_unique_id": f"{file_id}_u", "width": scaled[0], "height": scaled[1], "file_size": len(files[file_id])})
+    return sizes
+
+
+def build_updates(workload: str, count: int, files: Dict[str, bytes], bot, photo_size: tuple, run_index: int = 0) -> List:
+    from telegram import Update
+
+    # Aynı iş yükü tekrar çalıştırılırsa kimlikler çakışmasın (kuyruk tekrarları yok sayar).
+    base = {"text": 10_000, "photo": 20_000, "video": 30_000, "album": 40_000, "reply": 50_000}[workload] * 100 + run_index * 10_000_000
+    raw = []
+    for i in range(count):
+        message_id = base + i
+        if workload == "text":
+            raw.append(channel_post(message_id, text=f"Yeni güncelleme {message_id}: sunucu bakımı tamamlandı, sürüm 2.{i}."))
+        elif workload == "photo":
+            name = f"foto_{message_id}"
+            raw.append(channel_post(message_id, photo=add_photo(files, name, message_id, photo_size), caption=f"Maç sonucu {message_id}"))
+        elif workload == "video":
+            raw.append(channel_post(message_id, caption=f"Video {message_id}: yeni klip",
+                                    video={"file_id": f"video_{message_id}", "file_unique_id": f"v_{message_id}", "width": 1280, "height": 720, "duration": 10}))
+        elif workload == "album":
+            # Her albüm 4 öğeden oluşur; `count` albüm sayısıdır.
+            for item in range(4):
+                item_id = base + i * 10 + item
+                name = f"album_{item_id}"
+                raw.append(channel_post(item_id, photo=add_photo(files, name, item_id, photo_size), media_group_id=f"grup_{base + i}",
+                                        caption=f"Albüm {i}" if item == 0 else None))
+        elif workload == "reply":
+            raw.append({"update_id": message_id, "message": {"message_id": message_id, "date": int(time.time()),
+                                                            "chat": {"id": 700000 + i, "type": "private"},
+                                                            "from": {"id": 700000 + i, "is_bot": False, "first_name": "Müşteri"},
+                                                            "text": f"Merhaba, ürün {message_id} hâlâ çalışıyor mu?"}})
+    return [Update.de_json(data, bot) for data in raw]
+
+
+# --- Ölçüm ---
+class LoopLagMonitor:
+    """Olay döngüsünün planlanan uyanmaya göre ne kadar geciktiğini örnekler."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def reset_histograms(registry) -> None:
+    for metric in registry.metrics():
+        if metric.type_name == "histogram":
+            metric.series.clear()
+
+
+async def wait_until_idle(main, timeout: float = 300.0) -> None:
+    """Albüm toplayıcı ve gönderi kuyruğu boşalana kadar bekler."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        counts = await main.outbox.counts()
+        if not main.media_group_aggregator.pending and not main.outbox.in_flight and not counts.get('pending') and not counts.get('processing'):
+            return
+        await asyncio.sleep(0.02)
+    raise TimeoutError("Kuyruk zamanında boşalmadı.")
+
+
+async def run_workload(main, workload: str, count: int, bot: FakeBot, files: Dict[str, bytes], monitor: LoopLagMonitor,
+                       stub_stats: dict, photo_size: tuple, run_index: int = 0, label: str = None) -> dict:
+    from metrics import registry
+
+    updates = build_updates(workload, count, files, bot, photo_size, run_index) if workload != "auto" else []
+    stats_before = dict(stub_stats)
+    context = SimpleNamespace(bot=bot, args=[])
+    reset_histograms(registry)
+    sends_before = len(bot.sent)
+    if workload == "auto":
+        # İçerik gerçek akıştaki gibi önceden hazırlanır; ölçülen süre gönderim dakikasındaki gecikmedir.
+        slots = [{"id": f"bench{run_index}_{i}", "time": "00:00", "persona": None, "channels": [], "enabled": True} for i in range(count)]
+        main.auto_poster.reschedule(slots)
+        await asyncio.gather(*(main.auto_poster.warm(slot["id"]) for slot in slots))
+        run_keys = {slot["id"]: main.auto_poster.run_key(when) for slot, when in main.auto_poster.next_runs()}
+    monitor.start()
+    started = time.perf_counter()
+    if workload == "reply":
+        await asyncio.gather(*(main.user_message_handler(update, context) for update in updates))
+        # Yanıtlar birleştirici görevlerinde arka planda üretilir.
+        await main.message_coalescer.drain()
+    elif workload == "auto":
+        await asyncio.gather(*(main.auto_poster.fire(slot_id, run_key) for slot_id, run_key in run_keys.items()))
+        main.auto_poster.reschedule([])
+    else:
+        for update in updates:
+            await main.forwarder(update, context)
+        await wait_until_idle(main)
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+
+    stages = {}
+    for metric in registry.metrics():
+        if metric.type_name != "histogram":
+            continue
+        for key, series in metric.series.items():
+            name = metric.name.replace("krbrz_", "").replace("_seconds", "")
+            name += "[" + ",".join(value for _, value in key) + "]" if key else ""
+            stages[name] = (series.count, metric.percentiles(**dict(key)))
+    gemini = {key: stub_stats[key] - stats_before[key] for key in stub_stats}
+    return {"workload": label or workload, "count": count, "gemini": gemini, "elapsed": elapsed, "rate": count / elapsed if elapsed else 0.0,
+            "sends": len(bot.sent) - sends_before, "lag_p99": percentile(monitor.samples, 0.99),
+            "lag_max": max(monitor.samples, default=0.0), "rss": peak_rss_mb(), "stages": stages}
+
+
+def write_config(directory: str, args, gemini_url: str) -> None:
+    config = {
+        "source_channels": [f"@{SOURCE}"], "destination_channels": DESTINATIONS, "admin_ids": [ADMIN_ID],
+        "auto_post_enabled": False,
+        "gemini_client": {"base_url": gemini_url, "max_retries": 5, "base_delay": 0.05, "max_delay": 1.0},
+        "album": {"window": 0.2},
+        "outbox": {"workers": args.workers, "base_delay": 0.2, "poll_interval": 0.05},
+        # Sentetik metinler birbirine benzediği için yineleme kontrolü ve SSS indeksi kapatılır.
+        "dedup": {"enabled": False},
+        "faq_index": {"enabled": False},
+        # Yük atma varsayılan olarak kapalıdır; aksi halde AI aşamalarının ölçümü yük altında atlanır.
+        "load_shedding": {"enabled": args.load_shedding, "interval": 0.1, "restore_after": 1.0},
+        # Sentetik metinler güncelleme duyurusu olduğundan şablonlar yalnızca istenirse açılır.
+        "template_engine": {"enabled": args.templates, "min_confidence": 0.5},
+    }
+    if not args.real_limits:
+        # Varsayılan olarak Telegram/Gemini hız sınırları kaldırılır; botun kendi verimi ölçülür.
+        config["gemini_client"].update({"max_concurrency": 16, "requests_per_minute": 60_000, "burst": 100})
+        config["fanout"] = {"max_concurrency": 32, "global_rate": 10_000, "per_chat_rate": 10_000, "per_chat_burst": 10_000, "max_retries": 3}
+        config["user_rate_limit"] = {"per_minute": 60_000, "burst": 10_000}
+    with open(os.path.join(directory, "bot_config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+
+
+async def run(args) -> List[dict]:
+    stub_stats = {"requests": 0, "bytes": 0, "image_requests": 0, "image_bytes": 0, "stream_requests": 0}
+    stub = build_gemini_stub(args.gemini_latency, args.gemini_429_rate, args.gemini_retry_after, stub_stats, args.stream_chunks,
+                             args.degraded_model, args.slow_rate, args.slow_latency)
+    server, server_task, gemini_url = await start_gemini_stub(stub)
+    workdir = tempfile.mkdtemp(prefix="krbrz_bench_")
+    os.chdir(workdir)
+    write_config(workdir, args, gemini_url)
+    os.environ.update({"BOT_TOKEN": "123456:BENCH", "ADMIN_USER_ID": str(ADMIN_ID), "GEMINI_API_KEY": "bench"})
+
+    import main  # bot_config.json çalışma dizininden okunacağı için burada içe aktarılır.
+    from vision import VisionPreprocessor
+
+    files: Dict[str, bytes] = {}
+    bot = FakeBot(files, latency=args.telegram_latency, retry_after_rate=args.retry_after_rate)
+    application = SimpleNamespace(bot=bot)
+    main.init_database()
+    await main.on_startup(application)
+    monitor = LoopLagMonitor()
+    results = []
+    try:
+        configured = main.vision_preprocessor
+        stream_config = main.bot_config.setdefault("user_reply_stream", {})
+        for workload in args.workloads:
+            count = max(1, args.messages // 4) if workload in ("album", "auto") else args.messages
+            if args.compare_vision and workload in ("photo", "album"):
+                # Önce ön işleme kapalı (orijinal görsel), sonra ayarlı haliyle çalıştırılır.
+                main.vision_preprocessor = VisionPreprocessor(enabled=False)
+                results.append(await run_workload(main, workload, count, bot, files, monitor, stub_stats, args.photo_size, 1, f"{workload}/ham"))
+                main.vision_preprocessor = configured
+                label = f"{workload}/{configured.max_edge}px"
+                results.append(await run_workload(main, workload, count, bot, files, monitor, stub_stats, args.photo_size, 2, label))
+            elif args.compare_stream and workload == "reply":
+                # Önce tek parça yanıt, sonra akışlı yanıt; ilk metin süresi `stage[reply_first_text]`.
+                stream_config["enabled"] = False
+                results.append(await run_workload(main, workload, count, bot, files, monitor, stub_stats, args.photo_size, 1, "reply/akışsız"))
+                stream_config["enabled"] = True
+                results.append(await run_workload(main, workload, count, bot, files, monitor, stub_stats, args.photo_size, 2, "reply/akışlı"))
+            else:
+                results.append(await run_workload(main, workload, count, bot, files, monitor, stub_stats, args.photo_size))
+    finally:
+        await main.on_shutdown(application)
+        server.should_exit = True
+        await server_task
+    print(f"\nÇalışma dizini: {workdir} | sahte RetryAfter: {bot.retry_afters}")
+    report_router(main)
+    report_shedding(main)
+    if main.template_engine.enabled:
+        engine = main.template_engine
+        print(f"Şablon: isabet %{engine.hit_ratio * 100:.0f} ({engine.hits}/{engine.hits + engine.misses}), "
+              f"kazanılan süre ~{engine.saved_seconds:.1f} s")
+    return results
+
+
+def report_router(main) -> None:
+    """Model yönlendiricinin tüm çalıştırma boyunca topladığı sağlık ve sayaç özetini yazar."""
+    from model_router import DEADLINES, HEDGES, ROUTER_CALLS
+
+    print(f"\n{'Model':<28}{'Devre':>10}{'Başarılı':>10}{'Hatalı':>8}{'p95 (s)':>9}")
+    for health in main.model_router.snapshot():
+        p95 = health.p95()
+        print(f"{health.name:<28}{health.state:>10}{ROUTER_CALLS.value(model=health.name, outcome='ok'):>10.0f}"
+              f"{ROUTER_CALLS.value(model=health.name, outcome='error'):>8.0f}{p95 if p95 is not None else 0.0:>9.2f}")
+    print(f"Yedek istek: {HEDGES.value(result='sent'):.0f} gönderilen / {HEDGES.value(result='won'):.0f} kazanan | "
+          f"süre sınırı aşımı: {DEADLINES.value():.0f}")
+
+
+def report_shedding(main) -> None:
+    """Yük atma denetleyicisinin mod değişikliklerini ve AI'ye gönderilmeyen başlıkları yazar."""
+    from load_shedding import AI_SHED
+
+    if not main.degradation.enabled:
+        return
+    print(f"Yük atma: {main.degradation.changes} mod değişikliği, son mod: {main.degradation.level_name} | "
+          f"atlanan görsel AI: {AI_SHED.value(kind='image'):.0f} / metin AI: {AI_SHED.value(kind='text'):.0f}")
+
+
+def report(results: List[dict]) -> None:
+    print(f"\n{'İş yükü':<14}{'Adet':>6}{'Süre (s)':>10}{'Mesaj/s':>10}{'Gönderim':>10}{'Lag p99':>10}{'Lag max':>10}{'RSS (MB)':>10}")
+    for r in results:
+        print(f"{r['workload']:<14}{r['count']:>6}{r['elapsed']:>10.2f}{r['rate']:>10.1f}{r['sends']:>10}"
+              f"{r['lag_p99'] * 1000:>8.1f}ms{r['lag_max'] * 1000:>8.1f}ms{r['rss']:>10.1f}")
+    print(f"\n{'İş yükü':<14}{'Gemini istek':>14}{'Toplam KB':>12}{'Görsel istek':>14}{'KB/görsel':>12}")
+    for r in results:
+        g = r["gemini"]
+        per_image = g["image_bytes"] / g["image_requests"] / 1024 if g["image_requests"] else 0.0
+        print(f"{r['workload']:<14}{g['requests']:>14}{g['bytes'] / 1024:>12.1f}{g['image_requests']:>14}{per_image:>12.1f}")
+    for r in results:
+        print(f"\n[{r['workload']}] aşama süreleri (ms)")
+        print(f"  {'Aşama':<42}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for label, (count, (p50, p95, p99)) in sorted(r["stages"].items()):
+            print(f"  {label:<42}{count:>6}{p50 * 1000:>9.1f}{p95 * 1000:>9.1f}{p99 * 1000:>9.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="KRBRZ VIP Bot çevrimdışı uçtan uca benchmark")
+    parser.add_argument("--messages", type=int, default=40, help="İş yükü başına mesaj sayısı (albüm/otomatik gönderi için 1/4'ü)")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help=f"Virgülle ayrılmış: {','.join(WORKLOADS)}")
+    parser.add_argument("--workers", type=int, default=3, help="Gönderi kuyruğu işçi sayısı")
+    parser.add_argument("--gemini-latency", type=float, default=0.2, help="Sahte Gemini yanıt gecikmesi (s)")
+    parser.add_argument("--gemini-429-rate", type=float, default=0.05, help="Sahte Gemini 429 oranı (0-1)")
+    parser.add_argument("--gemini-retry-after", type=float, default=0.2, help="429 yanıtındaki Retry-After (s)")
+    parser.add_argument("--telegram-latency", type=float, default=0.01, help="Sahte Telegram çağrı gecikmesi (s)")
+    parser.add_argument("--retry-after-rate", type=float, default=0.02, help="Sahte Telegram RetryAfter oranı (0-1)")
+    parser.add_argument("--real-limits", action="store_true", help="Varsayılan Telegram/Gemini hız sınırlarını koru")
+    parser.add_argument("--photo-size", default="1280x720", help="Orijinal görsel çözünürlüğü (GxY)")
+    parser.add_argument("--compare-vision", action="store_true", help="Görsel iş yüklerini ön işleme kapalı/açık iki kez çalıştır")
+    parser.add_argument("--compare-stream", action="store_true", help="Yanıt iş yükünü akışsız/akışlı iki kez çalıştır")
+    parser.add_argument("--stream-chunks", type=int, default=8, help="Sahte Gemini akışlı yanıtının parça sayısı")
+    parser.add_argument("--degraded-model", default=None, help="Her istekte 429 döndürecek model adı")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Yavaş kuyruğa düşen Gemini isteği oranı (0-1)")
+    parser.add_argument("--slow-latency", type=float, default=8.0, help="Yavaş Gemini isteğinin süresi (s)")
+    parser.add_argument("--templates", action="store_true", help="Bilinen duyuruları AI yerine şablonla yazan şablon motorunu aç")
+    parser.add_argument("--load-shedding", action="store_true", help="Kuyruk birikince AI aşamalarını atlayan yük atmayı aç")
+    args = parser.parse_args()
+    args.photo_size = tuple(int(part) for part in args.photo_size.lower().split("x"))
+    args.workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"Bilinmeyen iş yükü: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main():
+    report(asyncio.run(run(parse_args())))
+
+
+if __name__ == "__main__":
+    main()
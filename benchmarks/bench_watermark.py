@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Filigran Benchmark'ı
+Eski (tam kare katman + alpha_composite, her görselde font yükleme) yöntem ile
+önbellekli damga yapıştırma yöntemini görsel başına süre olarak karşılaştırır.
+
+Kullanım: python benchmarks/bench_watermark.py [tekrar_sayısı]
+"""
+
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from watermark import FONT_PATHS, COLORS, watermark_bytes
+
+WM_CONFIG = {"text": "KRBRZ_VIP", "position": "sag-alt", "color": "beyaz", "enabled": True}
+
+
+def legacy_watermark(photo_bytes: bytes, wm_config: dict) -> bytes:
+    """main.py'deki eski apply_watermark gövdesinin senkron kopyası."""
+    with Image.open(io.BytesIO(photo_bytes)).convert("RGBA") as base:
+        txt = Image.new("RGBA", base.size, (255, 255, 255, 0))
+        font_size = max(15, base.size[1] // 25)
+        font = None
+        for path in FONT_PATHS:
+            try:
+                font = ImageFont.truetype(path, size=font_size)
+                break
+            except IOError:
+                continue
+        if not font:
+            font = ImageFont.load_default()
+        d = ImageDraw.Draw(txt)
+        fill_color = COLORS.get(wm_config.get("color", "beyaz").lower(), COLORS["beyaz"])
+        text = wm_config.get("text", "KRBRZ_VIP")
+        text_bbox = d.textbbox((0, 0), text, font=font)
+        text_width, text_height = text_bbox[2] - text_bbox[0], text_bbox[3] - text_bbox[1]
+        x, y = base.width - text_width - 15, base.height - text_height - 15
+        d.text((x, y), text, font=font, fill=fill_color)
+        out = Image.alpha_composite(base, txt)
+        buffer = io.BytesIO()
+        out.convert("RGB").save(buffer, format="JPEG", quality=95)
+        return buffer.getvalue()
+
+
+def make_photo(width: int, height: int) -> bytes:
+    rnd = random.Random(width * height)
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    ImageDraw.Draw(image).rectangle((0, 0, width // 2, height // 2), fill=(rnd.randrange(256), 90, 40))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def measure(func, photo: bytes, repeats: int) -> list:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(photo, WM_CONFIG)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"{'Çözünürlük':<12}{'Eski (ms)':>12}{'Yeni (ms)':>12}{'Hızlanma':>10}")
+    for width, height in [(1280, 720), (1920, 1080), (3840, 2160)]:
+        photo = make_photo(width, height)
+        watermark_bytes(photo, WM_CONFIG)  # damga önbelleğini ısıt
+        old = statistics.median(measure(legacy_watermark, photo, repeats))
+        new = statistics.median(measure(watermark_bytes, photo, repeats))
+        print(f"{f'{width}x{height}':<12}{old:>12.1f}{new:>12.1f}{old / new:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Şablon Motoru
+Rutin duyurular (güncelleme, bakım vb.) için hazır başlık şablonları. Her şablon bir kez
+derlenir: metin sabit parçalar ve değişken adlarına ayrılır, anahtar kelimeleri tek bir
+düzenli ifadede birleştirilir. Kaynak metin anahtar kelime/desen eşleşmeleriyle
+sınıflandırılır; en iyi şablon yeterince baskınsa başlık şablondan üretilir ve AI
+isteği hiç yapılmaz.
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from string import Formatter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from faq_index import normalize
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_LOOKUPS = registry.counter("krbrz_template_lookups_total", "Şablon sınıflandırma sonuçları.", ["result"])
+TEMPLATE_SAVED_SECONDS = registry.counter("krbrz_template_saved_seconds_total", "Şablon kullanımıyla atlanan AI isteklerinin tahmini süresi.")
+
+VARIABLES = {
+    "tarih": "Bugünün tarihi (GG.AA.YYYY)",
+    "saat": "Şu anki saat (SS:DD)",
+    "surum": "Metindeki sürüm numarası (örn. v2.4.1)",
+    "etiketler": "Aktif personanın etiketleri",
+    "metin": "Kaynak metnin kendisi",
+}
+# Noktalı sayı ancak "v" önekiyle ya da bitişiğinde sürüm kelimesi varsa sürüm sayılır; fiyat ve tarihler elenir.
+VERSION_PATTERN = re.compile(
+    r"(?:\b(?P<keyword>sürüm|versiyon|version|güncelleme|update|yama|patch)\w*\s*:?\s*)?"
+    r"\b(?P<prefix>v)?(?P<number>\d+(?:\.\d+){1,3})\b(?![.,]\d)"
+    r"(?P<suffix>\s+(?:sürüm|versiyon|version))?(?P<currency>\s*(?:TL\b|₺))?", re.IGNORECASE)
+DATE_LIKE = re.compile(r"\d{2}\.\d{2}|\d{1,2}\.\d{1,2}\.\d{4}|\d{1,3}(?:\.\d{3})+")
+TAG_PATTERN = re.compile(r"[@#]\w+")
+DEFAULT_TAGS = "@KRBRZ063 #KRBRZ"
+
+
+def find_version(text: str) -> Optional[str]:
+    """Metindeki ilk sürüm numarası ("v" önekiyle); tarih, fiyat ve binlik ayraçlı sayılar sayılmaz."""
+    for match in VERSION_PATTERN.finditer(text):
+        if match.group("currency"):
+            continue
+        if match.group("prefix") or ((match.group("keyword") or match.group("suffix")) and not DATE_LIKE.fullmatch(match.group("number"))):
+            return f"v{match.group('number')}"
+    return None
+
+
+def compile_template(text: str) -> Tuple[Callable[[Dict[str, str]], str], frozenset]:
+    """Şablonu (sabit parça, değişken) çiftlerine ayırıp hızlı bir render fonksiyonu döndürür.
+
+    Bilinmeyen değişken ya da biçim belirteci varsa ValueError fırlatır.
+    """
+    segments = []
+    for literal, name, spec, conversion in Formatter().parse(text):
+        if name is not None:
+            if name not in VARIABLES:
+                raise ValueError(f"Bilinmeyen değişken: {{{name}}}")
+            if spec or conversion:
+                raise ValueError(f"Değişkende biçim belirteci desteklenmez: {{{name}}}")
+        segments.append((literal, name))
+    segments = tuple(segments)
+
+    def render(values: Dict[str, str]) -> str:
+        return "".join(literal + values[name] if name is not None else literal for literal, name in segments)
+
+    return render, frozenset(name for _, name in segments if name is not None)
+
+
+@dataclass
+class CompiledTemplate:
+    """Derlenmiş şablon: render fonksiyonu, gerekli değişkenler ve sınıflandırma kuralları."""
+    name: str
+    text: str
+    render: Callable[[Dict[str, str]], str]
+    variables: frozenset
+    keywords: Optional[re.Pattern]
+    patterns: List[re.Pattern] = field(default_factory=list)
+
+    def score(self, raw: str, normalized: str) -> int:
+        """Eşleşen farklı anahtar kelime ve desen sayısı."""
+        hits = len(set(self.keywords.findall(normalized))) if self.keywords else 0
+        return hits + sum(1 for pattern in self.patterns if pattern.search(raw))
+
+
+@dataclass
+class TemplateMatch:
+    template: CompiledTemplate
+    confidence: float
+    caption: Optional[str] = None
+
+
+class TemplateEngine:
+    """Kaynak metni şablonlarla sınıflandırır ve güvenilir eşleşmede başlığı şablondan üretir."""
+
+    def __init__(self, templates: Dict[str, Dict], clock: Callable[[], datetime] = datetime.now, enabled: bool = True,
+                 min_confidence: float = 0.6, max_chars: int = 400, initial_ai_latency: float = 1.0):
+        # `templates` konfigürasyondaki sözlüğün kendisidir; yönetim komutları onu günceller.
+        self.templates = templates
+        self.clock = clock
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.max_chars = max_chars
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        # Tasarruf tahmini için AI başlık süresi; gerçek ölçümlerle güncellenir.
+        self.ai_latency = initial_ai_latency
+        self._compiled: Dict[str, CompiledTemplate] = {}
+        for name, spec in list(templates.items()):
+            try:
+                self._compiled[name] = self._compile(name, spec)
+            except (ValueError, re.error) as e:
+                logger.error(f"'{name}' şablonu derlenemedi, atlanıyor: {e}")
+
+    @staticmethod
+    def _compile(name: str, spec: Dict) -> CompiledTemplate:
+        render, variables = compile_template(spec["text"])
+        keywords = [re.escape(normalize(keyword).strip()) for keyword in spec.get("keywords", []) if keyword.strip()]
+        # Anahtar kelimeler kelime başında eşleşir; "güncelleme" kelimesi "güncellemesi"ni de yakalar.
+        keyword_pattern = re.compile(r"\b(?:" + "|".join(keywords) + ")") if keywords else None
+        patterns = [re.compile(pattern, re.IGNORECASE) for pattern in spec.get("patterns", [])]
+        return CompiledTemplate(name, spec["text"], render, variables, keyword_pattern, patterns)
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def compiled(self) -> List[CompiledTemplate]:
+        return sorted(self._compiled.values(), key=lambda template: template.name)
+
+    def set_template(self, name: str, text: str, keywords: Optional[List[str]] = None) -> CompiledTemplate:
+        """Şablonu ekler ya da metnini değiştirir (anahtar kelimeler verilmezse korunur); geçersizse ValueError."""
+        spec = dict(self.templates.get(name, {}))
+        spec["text"] = text
+        if keywords is not None:
+            spec["keywords"] = keywords
+        compiled = self._compile(name, spec)
+        self.templates[name] = spec
+        self._compiled[name] = compiled
+        return compiled
+
+    def set_keywords(self, name: str, keywords: List[str]) -> bool:
+        if name not in self.templates:
+            return False
+        self.set_template(name, self.templates[name]["text"], keywords)
+        return True
+
+    def remove(self, name: str) -> bool:
+        self._compiled.pop(name, None)
+        return self.templates.pop(name, None) is not None
+
+    def classify(self, text: str) -> Optional[TemplateMatch]:
+        """En yüksek puanlı şablon ve güveni (puan / (puan + ikinci puan + 1)); eşleşme yoksa None."""
+        normalized = normalize(text)
+        scores = sorted(((template.score(text, normalized), template) for template in self._compiled.values()),
+                        key=lambda item: item[0], reverse=True)
+        if not scores or scores[0][0] == 0:
+            return None
+        best, template = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0
+        return TemplateMatch(template, best / (best + runner_up + 1))
+
+    def variables(self, text: str, persona_prompt: str) -> Dict[str, str]:
+        now = self.clock()
+        version = find_version(text)
+        values = {"tarih": now.strftime("%d.%m.%Y"), "saat": now.strftime("%H:%M"), "metin": text.strip(),
+                  "etiketler": " ".join(dict.fromkeys(TAG_PATTERN.findall(persona_prompt))) or DEFAULT_TAGS}
+        if version:
+            values["surum"] = version
+        return values
+
+    def render(self, text: str, persona_prompt: str) -> Optional[TemplateMatch]:
+        """Sınıflandırma + render; güven düşükse ya da şablonun istediği değişken metinde yoksa None."""
+        if not self.enabled or not text or len(text) > self.max_chars:
+            return None
+        started = time.perf_counter()
+        match = self.classify(text)
+        values = self.variables(text, persona_prompt) if match else {}
+        if match is None or match.confidence < self.min_confidence or not match.template.variables <= values.keys():
+            self.misses += 1
+            TEMPLATE_LOOKUPS.inc(result="miss")
+            return None
+        match.caption = match.template.render(values)
+        self.hits += 1
+        TEMPLATE_LOOKUPS.inc(result="hit")
+        saved = max(0.0, self.ai_latency - (time.perf_counter() - started))
+        self.saved_seconds += saved
+        TEMPLATE_SAVED_SECONDS.inc(saved)
+        return match
+
+    def observe_ai_latency(self, seconds: float) -> None:
+        """AI ile üretilen başlık süresinin kayan ortalaması; tasarruf tahmini buna göre yapılır."""
+        self.ai_latency += 0.1 * (seconds - self.ai_latency)
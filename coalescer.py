@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Özel Mesaj Birleştirici
+Kullanıcı başına tek bir yanıt görevi çalıştırır. Görev başlamadan önceki kısa pencerede
+ya da yanıt üretilirken aynı kullanıcıdan gelen mesajlar biriktirilir ve bir sonraki
+turda tek soru olarak işlenir; art arda yazan bir kullanıcı her satır için ayrı bir
+AI isteği tetiklemez. Bir turun metni `max_chars` ile sınırlıdır; sığmayan mesajlar
+atılmaz, sonraki turda işlenir. İşleyici arka planda çalıştığından güncelleme döngüsü bekletilmez.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class MessageCoalescer:
+    """İlk mesajdan `window` saniye sonra birikenleri `on_messages`'a verir; kullanıcı başına tek görev çalışır."""
+
+    def __init__(self, on_messages: Callable[[List[Any]], Awaitable[None]], window: float = 0.4, max_chars: int = 1000):
+        self.on_messages = on_messages
+        self.window = window
+        self.max_chars = max_chars
+        self.coalesced = 0
+        self._pending: Dict[int, List[Any]] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> int:
+        return sum(len(messages) for messages in self._pending.values())
+
+    @property
+    def active(self) -> int:
+        return len(self._tasks)
+
+    def add(self, user_id: int, message: Any) -> None:
+        messages = self._pending.setdefault(user_id, [])
+        messages.append(message)
+        if user_id not in self._tasks:
+            self._tasks[user_id] = asyncio.get_running_loop().create_task(self._run(user_id))
+
+    async def _run(self, user_id: int) -> None:
+        try:
+            await asyncio.sleep(self.window)
+            while True:
+                messages = self._take(user_id)
+                if not messages:
+                    return
+                self.coalesced += len(messages) - 1
+                try:
+                    await self.on_messages(messages)
+                except Exception as e:
+                    logger.error(f"Kullanıcı mesajı işleme hatası ({user_id}): {e}")
+        finally:
+            # Kuyruk boş görüldüğü adımda kaydı silinir; arada gelen mesaj yeni görev başlatır.
+            self._tasks.pop(user_id, None)
+
+    def _take(self, user_id: int) -> List[Any]:
+        """Sıradaki turun mesajları: toplam metni `max_chars`'ı aşmayan en eski mesajlar (en az bir mesaj)."""
+        messages = self._pending.pop(user_id, None)
+        if not messages:
+            return []
+        total = count = 0
+        for message in messages:
+            total += len(getattr(message, "text", None) or "")
+            if count and total > self.max_chars:
+                break
+            count += 1
+        if count < len(messages):
+            self._pending[user_id] = messages[count:]
+        return messages[:count]
+
+    async def drain(self) -> None:
+        """Kapanışta çalışan yanıt görevlerinin bitmesini bekler."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
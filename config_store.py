@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - İndeksli Konfigürasyon Deposu
+Kaynak/hedef kanalları ve admin ID'leri için hash-set indeksleri tutar; böylece her
+gönderide ve her admin kontrolünde liste taraması yapılmaz. Kayıtlar kısa bir süre
+biriktirilip tek seferde, geçici dosya + rename ile atomik olarak diske yazılır; yazım
+başarısız olursa artan aralıklarla yeniden denenir.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from threading import Lock
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEXED_KEYS = ("source_channels", "destination_channels", "admin_ids")
+
+
+class ConfigStore:
+    """`bot_config` sözlüğünü indeksleyen ve gecikmeli/atomik kaydeden depo."""
+
+    def __init__(self, path: str, data: Dict[str, Any], lock: Optional[Lock] = None, save_delay: float = 1.0,
+                 max_retry_delay: float = 60.0):
+        self.path = path
+        self.data = data
+        self.lock = lock or Lock()
+        self.save_delay = save_delay
+        self.max_retry_delay = max_retry_delay
+        self.writes = 0
+        self.failures = 0
+        self._indexes: Dict[str, Set[Any]] = {}
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._dirty = False
+        self._sequence = 0
+        self._written_sequence = 0
+        self._write_lock = Lock()
+        self.reindex()
+
+    def reindex(self) -> None:
+        for key in INDEXED_KEYS:
+            self._indexes[key] = set(self.data.get(key, []))
+
+    def contains(self, key: str, value: Any) -> bool:
+        return value in self._indexes.get(key, ())
+
+    def is_source(self, *identifiers: str) -> bool:
+        source = self._indexes["source_channels"]
+        return any(identifier in source for identifier in identifiers)
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self._indexes["admin_ids"]
+
+    def add_item(self, key: str, value: Any) -> bool:
+        """Listeye yoksa ekler ve kaydı zamanlar; eklendiyse True döner."""
+        with self.lock:
+            if value in self._indexes[key]:
+                return False
+            self.data[key].append(value)
+            self._indexes[key].add(value)
+        self.schedule_save()
+        return True
+
+    def remove_item(self, key: str, value: Any) -> bool:
+        with self.lock:
+            if value not in self._indexes[key]:
+                return False
+            self.data[key].remove(value)
+            self._indexes[key].discard(value)
+        self.schedule_save()
+        return True
+
+    def schedule_save(self) -> None:
+        """Kaydı `save_delay` saniye erteler; bu sürede gelen diğer değişiklikler aynı yazıma katılır."""
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._schedule(loop, self.save_delay)
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop, delay: float) -> None:
+        if self._save_handle is None:
+            self._save_handle = loop.call_later(delay, lambda: loop.create_task(self._save_async()))
+
+    async def _save_async(self) -> None:
+        self._save_handle = None
+        # JSON döngü iş parçacığında üretilir (sözlüğü değiştiren kodlar da orada çalışır);
+        # iş parçacığına yalnızca hazır metnin yazımı bırakılır.
+        payload = self._serialize()
+        if payload is None:
+            return
+        if await asyncio.to_thread(self._write, *payload):
+            self.failures = 0
+            return
+        # Değişiklik yalnızca bellekte kalmasın diye kayıt üstel geri çekilmeyle yeniden zamanlanır.
+        self.failures += 1
+        delay = min(self.max_retry_delay, self.save_delay * (2 ** self.failures))
+        logger.warning(f"Konfigürasyon kaydı {delay:.0f} saniye sonra yeniden denenecek.")
+        self._schedule(asyncio.get_running_loop(), delay)
+
+    def _serialize(self) -> Optional[Tuple[int, str]]:
+        with self.lock:
+            if not self._dirty:
+                return None
+            text = json.dumps(self.data, indent=4, ensure_ascii=False)
+            self._dirty = False
+            self._sequence += 1
+            return self._sequence, text
+
+    def _write(self, sequence: int, payload: str) -> bool:
+        """İçeriği atomik olarak yazar; yazılamazsa değişiklik kirli işaretlenir ve False döner."""
+        with self._write_lock:
+            # Daha yeni bir içerik zaten yazıldıysa eski içerik onun üzerine yazılmaz.
+            if sequence <= self._written_sequence:
+                return True
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(prefix=".bot_config.", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self._written_sequence = sequence
+                self.writes += 1
+                return True
+            except Exception as e:
+                self._dirty = True
+                logger.error(f"Konfigürasyon kaydedilemedi: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return False
+
+    def flush(self) -> None:
+        """Değişiklik varsa konfigürasyonu hemen ve atomik olarak yazar (çağıran iş parçacığında)."""
+        payload = self._serialize()
+        if payload is not None:
+            self._write(*payload)
+
+    async def close(self) -> None:
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        payload = self._serialize()
+        if payload is not None:
+            await asyncio.to_thread(self._write, *payload)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Yinelenen Gönderi Tespiti
+Görseller için algısal hash (dHash), metinler için normalize edilmiş SimHash parmak izi
+üretir ve bunları kayan bir zaman penceresinde Hamming mesafesine göre arar. Yeniden
+sıkıştırılmış veya boyutu değişmiş aynı ekran görüntüsü yakın kopya olarak yakalanır.
+Görselli gönderide başlık da karşılaştırılır; aynı afiş/logo yeni bir duyuruyla
+paylaşıldığında gönderi yinelenen sayılmaz.
+"""
+
+import hashlib
+import io
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+
+HASH_BITS = 64
+TURKISH_CASE_MAP = str.maketrans({"I": "ı", "İ": "i"})
+
+
+def dhash(image_bytes: bytes, hash_size: int = 8) -> int:
+    """Komşu piksellerin parlaklık farkından 64 bitlik fark hash'i üretir."""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def normalize_text(text: str) -> str:
+    """Türkçe büyük/küçük harf, bağlantı, etiket ve noktalama farklarını yok sayar."""
+    text = text.translate(TURKISH_CASE_MAP).lower()
+    text = re.sub(r"https?://\S+|[@#]\w+", " ", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def text_simhash(text: str) -> int:
+    """Normalize edilmiş metnin kelime ikilileri üzerinden 64 bitlik SimHash'i."""
+    words = normalize_text(text).split()
+    shingles = [" ".join(words[i:i + 2]) for i in range(max(1, len(words) - 1))] if words else []
+    weights = [0] * HASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.md5(shingle.encode('utf-8')).digest()[:8], 'big')
+        for bit in range(HASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(HASH_BITS) if weights[bit] > 0)
+
+
+class HammingIndex:
+    """Kayan pencereli, çoklu bant (pigeonhole) Hamming mesafesi indeksi.
+
+    64 bit, `max_distance + 1` banda bölünür; mesafesi eşik içinde kalan iki hash'in
+    en az bir bandı birebir aynı olacağından yalnızca o bandı paylaşan adaylar taranır.
+    """
+
+    def __init__(self, max_distance: int, window_seconds: float):
+        self.max_distance = max_distance
+        self.window_seconds = window_seconds
+        bands = max_distance + 1
+        width = HASH_BITS // bands
+        self._bands = [(i * width, width if i < bands - 1 else HASH_BITS - i * width) for i in range(bands)]
+        self._buckets: Dict[Tuple[int, int], Set[int]] = {}
+        self._entries: Deque[Tuple[float, int]] = deque()
+        # Aynı değer pencere içinde birden çok kez eklenebilir; son kopya düşene kadar kovada kalır.
+        self._counts: Dict[int, int] = {}
+
+    def _keys(self, value: int):
+        for index, (shift, width) in enumerate(self._bands):
+            yield index, (value >> shift) & ((1 << width) - 1)
+
+    def expire(self, now: float) -> List[int]:
+        """Süresi dolan kayıtları atar; indeksten tamamen çıkan değerleri döndürür."""
+        removed = []
+        while self._entries and now - self._entries[0][0] > self.window_seconds:
+            _, value = self._entries.popleft()
+            self._counts[value] -= 1
+            if self._counts[value]:
+                continue
+            del self._counts[value]
+            removed.append(value)
+            for key in self._keys(value):
+                bucket = self._buckets.get(key)
+                if bucket:
+                    bucket.discard(value)
+                    if not bucket:
+                        del self._buckets[key]
+        return removed
+
+    def matches(self, value: int) -> Set[int]:
+        """Mesafesi eşik içinde kalan kayıtlı değerler."""
+        found = set()
+        for key in self._keys(value):
+            for candidate in self._buckets.get(key, ()):
+                if candidate not in found and bin(candidate ^ value).count("1") <= self.max_distance:
+                    found.add(candidate)
+        return found
+
+    def find(self, value: int) -> bool:
+        return bool(self.matches(value))
+
+    def add(self, value: int, now: float) -> None:
+        self._entries.append((now, value))
+        self._counts[value] = self._counts.get(value, 0) + 1
+        for key in self._keys(value):
+            self._buckets.setdefault(key, set()).add(value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DuplicateDetector:
+    """Görsel ve metin parmak izlerini pencere içinde tutup yakın kopyaları bildirir."""
+
+    def __init__(self, enabled: bool = True, window_seconds: float = 3600, max_distance: int = 6,
+                 text_max_distance: int = 3, max_captions: int = 32):
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self.photos = HammingIndex(max_distance, window_seconds)
+        self.texts = HammingIndex(text_max_distance, window_seconds)
+        self.text_max_distance = text_max_distance
+        self.max_captions = max_captions
+        # Görsel hash'i → o görselle pencere içinde görülen (zaman, başlık SimHash'i) çiftleri (boş başlık için None).
+        # Sık tekrarlanan görselin listesi büyümesin diye hem süreyle hem de `max_captions` ile sınırlıdır.
+        self._photo_captions: Dict[int, Deque[Tuple[float, Optional[int]]]] = {}
+        self.skipped = 0
+
+    def _check(self, index: HammingIndex, value: int) -> bool:
+        now = time.monotonic()
+        index.expire(now)
+        if index.find(value):
+            self.skipped += 1
+            return True
+        index.add(value, now)
+        return False
+
+    def check_photo(self, image_bytes: bytes, caption: Optional[str] = None) -> bool:
+        """Görsel ve başlığı pencere içinde birlikte görüldüyse True döner, görülmediyse indekse ekler.
+
+        Başlık boşsa görselin eşleşmesi yeterlidir; doluysa aynı görselle görülmüş bir başlığın
+        SimHash'i de eşik içinde olmalıdır.
+        """
+        photo = dhash(image_bytes)
+        text = text_simhash(caption) if caption and normalize_text(caption) else None
+        now = time.monotonic()
+        for value in self.photos.expire(now):
+            self._photo_captions.pop(value, None)
+        for candidate in self.photos.matches(photo):
+            seen = self._photo_captions.get(candidate, ())
+            while seen and now - seen[0][0] > self.window_seconds:
+                seen.popleft()
+            if text is None or any(other is not None and bin(other ^ text).count("1") <= self.text_max_distance for _, other in seen):
+                self.skipped += 1
+                return True
+        self.photos.add(photo, now)
+        captions = self._photo_captions.get(photo)
+        if captions is None:
+            captions = self._photo_captions[photo] = deque(maxlen=self.max_captions)
+        captions.append((now, text))
+        return False
+
+    def check_text(self, text: str) -> bool:
+        if not normalize_text(text):
+            return False
+        return self._check(self.texts, text_simhash(text))
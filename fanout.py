@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Hedef Kanallara Eşzamanlı Dağıtım
+Telegram'ın genel ve sohbet başına hız sınırlarına uyarak bir gönderiyi tüm hedef
+kanallara aynı anda iletir. `RetryAfter` alan sohbet yalnızca kendi başına bekletilir.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from telegram.error import RetryAfter
+
+from metrics import registry
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SEND_SECONDS = registry.histogram("krbrz_send_seconds", "Tek bir hedefe gönderimin süresi (hız sınırı beklemeleri dahil).", ["destination"])
+SEND_FAILURES = registry.counter("krbrz_send_failures_total", "Tüm denemelere rağmen başarısız olan gönderimler.", ["destination"])
+RATE_LIMITED = registry.counter("krbrz_rate_limited_total", "Karşılaşılan hız sınırı (429 / RetryAfter) yanıtları.", ["service"])
+
+
+@dataclass
+class DeliveryResult:
+    """Tek bir hedefe yapılan gönderimin sonucu."""
+    destination: str
+    ok: bool
+    latency: float
+    attempts: int
+    result: Any = None
+    error: Optional[str] = None
+
+
+class FanoutDispatcher:
+    """Genel ve sohbet başına token-bucket'larla sınırlanmış eşzamanlı gönderici."""
+
+    def __init__(self, max_concurrency: int = 8, global_rate: float = 25.0, per_chat_rate: float = 0.33,
+                 per_chat_burst: int = 3, max_retries: int = 3):
+        self.max_concurrency = max_concurrency
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(rate=global_rate, capacity=global_rate)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _chat_bucket(self, destination: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(destination)
+        if bucket is None:
+            bucket = TokenBucket(rate=self.per_chat_rate, capacity=self.per_chat_burst)
+            self._chat_buckets[destination] = bucket
+        return bucket
+
+    async def _deliver(self, destination: str, send: Callable[[str], Awaitable[Any]]) -> DeliveryResult:
+        started = time.monotonic()
+        chat_bucket = self._chat_bucket(destination)
+        attempts = 0
+        error = None
+        while attempts <= self.max_retries:
+            attempts += 1
+            await chat_bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                async with self._semaphore:
+                    result = await send(destination)
+                latency = time.monotonic() - started
+                SEND_SECONDS.observe(latency, destination=destination)
+                return DeliveryResult(destination, True, latency, attempts, result=result)
+            except RetryAfter as e:
+                # Yalnızca sınırlanan sohbet beklemeye alınır, diğer hedefler devam eder.
+                retry_after = float(getattr(e, "retry_after", 1) or 1)
+                RATE_LIMITED.inc(service="telegram")
+                chat_bucket.pause(retry_after)
+                error = str(e)
+                logger.warning(f"{destination} için flood limiti: {retry_after:.0f} saniye sonra tekrar denenecek.")
+            except Exception as e:
+                error = str(e)
+                break
+        latency = time.monotonic() - started
+        SEND_SECONDS.observe(latency, destination=destination)
+        SEND_FAILURES.inc(destination=destination)
+        return DeliveryResult(destination, False, latency, attempts, error=error)
+
+    async def dispatch(self, destinations: Iterable[str],
+                       send: Callable[[str], Awaitable[Any]]) -> Dict[str, DeliveryResult]:
+        """`send(destination)` eşyordamını tüm hedefler için eşzamanlı çalıştırır."""
+        destinations = list(dict.fromkeys(destinations))
+        results = await asyncio.gather(*(self._deliver(dest, send) for dest in destinations))
+        return {result.destination: result for result in results}
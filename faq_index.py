@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - SSS Yanıt İndeksi
+Müşterilerin daha önce sorduğu sorular ve verilen yanıtlar `bot_data.db` içinde saklanır.
+Yeni bir soru, Türkçe'ye uygun normalleştirilmiş kelime köklerinin TF-IDF vektörleriyle
+kayıtlı sorulara benzetilir; kosinüs benzerliği eşiği geçerse yanıt Gemini'ye gitmeden
+indeksten verilir. Gemini yanıtından oluşan kayıt önce adaydır: başka kullanıcılar aynı
+soruyu `min_asks` kez sorana ya da bir admin sabitleyene kadar kimseye verilmez.
+Sabitlenen kayıtlar kapasite temizliğinde silinmez.
+"""
+
+import asyncio
+import logging
+import math
+import re
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Türkçe karakterler ASCII karşılıklarına katlanır; müşteriler çoğu zaman ş/ğ/ı yazmaz.
+TURKISH_FOLD = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Kök olarak kelimenin ilk 5 harfi kullanılır (eklemeli dillerde basit ama etkili bir yöntem).
+STEM_LENGTH = 5
+STOPWORDS = {
+    "acaba", "ama", "bana", "ben", "bir", "biz", "bu", "da", "de", "diye", "gibi", "hala", "hem", "icin", "ile",
+    "ise", "kac", "kadar", "ki", "mi", "mu", "nasil", "ne", "neden", "nedir", "o", "sen", "siz", "su", "ve", "veya", "ya",
+    "yani", "var", "yok", "bi", "abi", "hocam", "lutfen", "selam", "merhaba", "slm", "mrb",
+}
+
+
+def normalize(text: str) -> str:
+    """Türkçe kurallarına göre küçük harfe çevirir ve aksanları katlar (İ→i, I→ı→i)."""
+    return text.replace("İ", "i").replace("I", "ı").lower().translate(TURKISH_FOLD)
+
+
+def terms(text: str) -> Counter:
+    """Metnin durak kelimeleri atılmış kök sayımları."""
+    tokens = TOKEN_PATTERN.findall(normalize(text))
+    return Counter(token if token.isdigit() else token[:STEM_LENGTH] for token in tokens if token not in STOPWORDS)
+
+
+@dataclass
+class FaqEntry:
+    """İndeksteki tek bir soru → yanıt kaydı."""
+    id: int
+    question: str
+    answer: str
+    pinned: bool = False
+    hits: int = 0
+    created_at: float = 0.0
+    last_hit_at: float = 0.0
+    asks: int = 1
+    terms: Counter = field(default_factory=Counter, repr=False)
+    # Aynı kullanıcının tekrarı sayılmasın diye soranlar (yalnızca bellekte) tutulur.
+    askers: Set[int] = field(default_factory=set, repr=False)
+
+
+class FaqIndex:
+    """Bellek içi ters indeks + SQLite kalıcılığı ile benzer soru araması."""
+
+    def __init__(self, db_path: str = 'bot_data.db', threshold: float = 0.75, max_entries: int = 500,
+                 max_question_chars: int = 300, min_asks: int = 3, enabled: bool = True):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.min_asks = min_asks
+        self.max_entries = max_entries
+        self.max_question_chars = max_question_chars
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[int, FaqEntry] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def ensure_schema(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE IF NOT EXISTS faq_entries (id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT NOT NULL, answer TEXT NOT NULL, '
+                     'pinned INTEGER NOT NULL DEFAULT 0, hits INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, last_hit_at REAL NOT NULL, '
+                     'asks INTEGER NOT NULL DEFAULT 1)')
+        conn.commit()
+        conn.close()
+
+    def load(self) -> None:
+        """Kayıtları veritabanından belleğe alır (açılışta bir kez)."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute("SELECT id, question, answer, pinned, hits, created_at, last_hit_at, asks FROM faq_entries").fetchall()
+        finally:
+            conn.close()
+        self._entries.clear()
+        self._postings.clear()
+        for row in rows:
+            self._index(FaqEntry(row[0], row[1], row[2], bool(row[3]), row[4], row[5], row[6], row[7]))
+        logger.info(f"SSS indeksi yüklendi: {len(self._entries)} kayıt.")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def pinned_count(self) -> int:
+        return sum(1 for entry in self._entries.values() if entry.pinned)
+
+    def servable(self, entry: FaqEntry) -> bool:
+        """Kayıt başkalarına verilebilir mi: sabitlenmiş ya da yeterince farklı kullanıcı tarafından sorulmuş."""
+        return entry.pinned or entry.asks >= self.min_asks
+
+    def get(self, entry_id: int) -> Optional[FaqEntry]:
+        return self._entries.get(entry_id)
+
+    def entries(self) -> List[FaqEntry]:
+        """Önce sabitlenenler, sonra en çok kullanılanlar."""
+        return sorted(self._entries.values(), key=lambda e: (not e.pinned, -e.hits, e.id))
+
+    def _index(self, entry: FaqEntry) -> None:
+        entry.terms = terms(entry.question)
+        self._entries[entry.id] = entry
+        for term in entry.terms:
+            self._postings.setdefault(term, set()).add(entry.id)
+
+    def _unindex(self, entry: FaqEntry) -> None:
+        self._entries.pop(entry.id, None)
+        for term in entry.terms:
+            ids = self._postings.get(term)
+            if ids is not None:
+                ids.discard(entry.id)
+                if not ids:
+                    del self._postings[term]
+
+    def _idf(self, term: str) -> float:
+        return math.log((len(self._entries) + 1) / (len(self._postings.get(term, ())) + 1)) + 1.0
+
+    def _vector(self, counts: Counter) -> Dict[str, float]:
+        vector = {term: (1.0 + math.log(count)) * self._idf(term) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def match(self, text: str) -> Optional[Tuple[FaqEntry, float]]:
+        """Eşiği geçen en benzer kaydı ve benzerliğini döndürür; yoksa None.
+
+        Kayıt henüz aday olsa da döner; yanıt olarak kullanmadan önce `servable` ile bakılmalıdır.
+        """
+        best = self.best(text)
+        if best is None or best[1] < self.threshold:
+            self.misses += 1
+            return None
+        if self.servable(best[0]):
+            self.hits += 1
+        else:
+            self.misses += 1
+        return best
+
+    def best(self, text: str) -> Optional[Tuple[FaqEntry, float]]:
+        """Eşikten bağımsız en benzer kayıt (yalnızca ortak kökü olan adaylar puanlanır)."""
+        query = self._vector(terms(text))
+        candidates = set()
+        for term in query:
+            candidates.update(self._postings.get(term, ()))
+        best = None
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            document = self._vector(entry.terms)
+            score = sum(weight * document.get(term, 0.0) for term, weight in query.items())
+            if best is None or score > best[1] or (score == best[1] and entry.pinned):
+                best = (entry, score)
+        return best
+
+    def _db_insert(self, question: str, answer: str, pinned: bool, now: float) -> int:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute("INSERT INTO faq_entries (question, answer, pinned, hits, created_at, last_hit_at) VALUES (?, ?, ?, 0, ?, ?)",
+                                  (question, answer, int(pinned), now, now))
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def _db_execute(self, sql: str, params: tuple) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def add(self, question: str, answer: str, pinned: bool = False, asker: Optional[int] = None) -> Optional[FaqEntry]:
+        """Yeni bir soru → yanıt çifti ekler; çok uzun ya da anlamlı kökü olmayan sorular eklenmez.
+
+        Sabitlenmeyen kayıt aday olarak eklenir; soran kullanıcı ilk soran olarak sayılır.
+        """
+        question, answer = question.strip(), answer.strip()
+        if not self.enabled or not answer or len(question) > self.max_question_chars or not terms(question):
+            return None
+        now = time.time()
+        entry_id = await asyncio.to_thread(self._db_insert, question, answer, pinned, now)
+        entry = FaqEntry(entry_id, question, answer, pinned, 0, now, now)
+        if asker is not None:
+            entry.askers.add(asker)
+        self._index(entry)
+        await self._trim()
+        return entry
+
+    async def _trim(self) -> None:
+        # Kapasite aşılırsa sabitlenmemiş kayıtlardan en uzun süredir kullanılmayanlar silinir.
+        overflow = len(self._entries) - self.max_entries
+        if overflow <= 0:
+            return
+        victims = sorted((e for e in self._entries.values() if not e.pinned), key=lambda e: e.last_hit_at)[:overflow]
+        for entry in victims:
+            await self.evict(entry.id)
+
+    async def record_hit(self, entry: FaqEntry) -> None:
+        entry.hits += 1
+        entry.last_hit_at = time.time()
+        await asyncio.to_thread(self._db_execute, "UPDATE faq_entries SET hits = ?, last_hit_at = ? WHERE id = ?",
+                                (entry.hits, entry.last_hit_at, entry.id))
+
+    async def record_ask(self, entry: FaqEntry, asker: int) -> bool:
+        """Aday kayda benzeyen soruyu farklı bir kullanıcıdan geldiyse sayar; kayıt verilebilir hale geldiyse True."""
+        if self.servable(entry) or asker in entry.askers:
+            return False
+        entry.askers.add(asker)
+        entry.asks += 1
+        await asyncio.to_thread(self._db_execute, "UPDATE faq_entries SET asks = ? WHERE id = ?", (entry.asks, entry.id))
+        if self.servable(entry):
+            logger.info(f"SSS #{entry.id} {entry.asks} farklı kullanıcı tarafından soruldu, artık yanıt olarak verilecek.")
+            return True
+        return False
+
+    async def pin(self, entry_id: int, pinned: bool = True) -> bool:
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return False
+        entry.pinned = pinned
+        await asyncio.to_thread(self._db_execute, "UPDATE faq_entries SET pinned = ? WHERE id = ?", (int(pinned), entry_id))
+        return True
+
+    async def evict(self, entry_id: int) -> bool:
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return False
+        self._unindex(entry)
+        await asyncio.to_thread(self._db_execute, "DELETE FROM faq_entries WHERE id = ?", (entry_id,))
+        return True
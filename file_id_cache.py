@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Filigranlı Görsel file_id Önbelleği
+Kaynak görselin `file_unique_id` değeri ve filigran ayarlarından üretilen anahtarla,
+Telegram'a bir kez yüklenmiş filigranlı görselin `file_id` değerini saklar. Önde boyutu
+sınırlı bir bellek içi LRU, arkada satır sayısı sınırlı bir SQLite tablosu bulunur.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class FileIdCache:
+    """Bellek içi LRU önünde SQLite ile kalıcı tutulan file_id önbelleği."""
+
+    def __init__(self, db_path: str = 'bot_data.db', memory_size: int = 1024, max_rows: int = 20000, evict_every: int = 100):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self.evict_every = evict_every
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._writes = 0
+
+    def ensure_schema(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE IF NOT EXISTS photo_file_cache (cache_key TEXT PRIMARY KEY, file_id TEXT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def make_key(file_unique_id: str, watermark_config: Dict) -> str:
+        """Filigran ayarı değiştiğinde eski yüklemeler kullanılmasın diye ayarlar da anahtara katılır."""
+        wm_hash = hashlib.sha1(json.dumps(watermark_config, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+        return f"{file_unique_id}:{wm_hash}"
+
+    def _db_get(self, key: str) -> Optional[str]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT file_id FROM photo_file_cache WHERE cache_key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def _db_set(self, key: str, file_id: str, evict: bool) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("INSERT OR REPLACE INTO photo_file_cache (cache_key, file_id) VALUES (?, ?)", (key, file_id))
+            if evict:
+                # En eski eklenen kayıtlardan (rowid sırası) başlanarak boyut sınırına inilir.
+                conn.execute("DELETE FROM photo_file_cache WHERE cache_key IN (SELECT cache_key FROM photo_file_cache ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                             (self.max_rows,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _remember(self, key: str, file_id: str) -> None:
+        self._memory[key] = file_id
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        file_id = self._memory.get(key)
+        if file_id is None:
+            file_id = await asyncio.to_thread(self._db_get, key)
+        if file_id:
+            self._remember(key, file_id)
+        return file_id
+
+    async def set(self, key: str, file_id: str) -> None:
+        self._remember(key, file_id)
+        self._writes += 1
+        await asyncio.to_thread(self._db_set, key, file_id, self._writes % self.evict_every == 0)
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Paylaşımlı Gemini İstemcisi
+Tek bir kalıcı bağlantı havuzu, eşzamanlılık sınırı, token-bucket hız sınırlayıcı
+ve jitter'lı üstel geri çekilme ile Gemini API'ye istek gönderir; yanıtı parça parça
+(SSE) okumak için `stream_generate_content` kullanılır.
+"""
+
+import asyncio
+import base64
+import importlib.util
+import json
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from metrics import registry
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+GEMINI_SECONDS = registry.histogram("krbrz_gemini_request_seconds", "Gemini çağrısının toplam süresi (yeniden denemeler ve beklemeler dahil).", ["outcome"])
+GEMINI_ATTEMPTS = registry.counter("krbrz_gemini_attempts_total", "Gemini'ye yapılan HTTP denemeleri.", ["status"])
+RATE_LIMITED = registry.counter("krbrz_rate_limited_total", "Karşılaşılan hız sınırı (429 / RetryAfter) yanıtları.", ["service"])
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Görsel verisinin istek gövdesine akıtılacağı yeri işaretleyen yer tutucu.
+INLINE_DATA_PLACEHOLDER = "__KRBRZ_INLINE_DATA__"
+# 3'ün katı olduğu için her parça bağımsız olarak (dolgu olmadan) base64'e çevrilebilir.
+BASE64_CHUNK = 3 * 16 * 1024
+
+
+class GeminiStreamError(Exception):
+    """Akış başlatılamadı ya da yarıda kesildi; çağıran akışsız isteğe dönebilir."""
+
+
+class GeminiRequestError(GeminiStreamError):
+    """İstek API tarafından reddedildi (429 dışındaki 4xx); model sağlıklıdır, aynı istek tekrar denenmez."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"İstek reddedildi (HTTP {status_code}).")
+        self.status_code = status_code
+
+
+def is_client_error(status_code: int) -> bool:
+    return 400 <= status_code < 500 and status_code != 429
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """`Retry-After` başlığını saniyeye çevirir (yalnızca saniye biçimi desteklenir)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def streaming_json_body(payload: Dict, data: memoryview):
+    """`payload`'daki yer tutucunun yerine `data`'nın base64'ünü akıtan gövde üretir.
+
+    Görselin tam base64 kopyası ve onu içeren JSON metni hiç oluşturulmaz; (uzunluk,
+    her denemede yeniden çağrılabilen asenkron üreteç) döndürür.
+    """
+    encoded = json.dumps(payload).encode("utf-8")
+    prefix, suffix = encoded.split(f'"{INLINE_DATA_PLACEHOLDER}"'.encode("utf-8"), 1)
+    prefix += b'"'
+    suffix = b'"' + suffix
+    length = len(prefix) + 4 * ((len(data) + 2) // 3) + len(suffix)
+
+    async def body() -> AsyncIterator[bytes]:
+        yield prefix
+        for offset in range(0, len(data), BASE64_CHUNK):
+            yield base64.b64encode(data[offset:offset + BASE64_CHUNK])
+        yield suffix
+
+    return length, body
+
+
+def candidate_text(chunk: Dict) -> str:
+    """Yanıttaki ilk adayın metin parçalarını birleştirir."""
+    candidates = chunk.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+class GeminiClient:
+    """Bot açılışında başlatılıp kapanışta kapatılan, uzun ömürlü Gemini istemcisi."""
+
+    def __init__(self, api_key: Optional[str], max_concurrency: int = 4, requests_per_minute: int = 60,
+                 burst: int = 5, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 32.0,
+                 timeout: float = 60.0, base_url: str = GEMINI_BASE_URL):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+
+    @property
+    def http2_available(self) -> bool:
+        return importlib.util.find_spec("h2") is not None
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            http2=self.http2_available,
+            limits=httpx.Limits(max_connections=self.max_concurrency * 2,
+                                max_keepalive_connections=self.max_concurrency,
+                                keepalive_expiry=120.0),
+            headers={"x-goog-api-key": self.api_key or ""},
+        )
+        logger.info(f"Gemini istemcisi başlatıldı (HTTP/2: {self.http2_available}, eşzamanlılık: {self.max_concurrency}).")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Gemini istemcisi kapatıldı.")
+
+    def bucket(self, model_name: str) -> TokenBucket:
+        """Kota model başına olduğundan her modelin kendi sınırlayıcısı vardır; 429 yalnızca o modeli durdurur."""
+        bucket = self._buckets.get(model_name)
+        if bucket is None:
+            bucket = self._buckets[model_name] = TokenBucket(rate=self.requests_per_minute / 60.0, capacity=self.burst)
+        return bucket
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """'Full jitter' stratejisi: [0, min(max_delay, base * 2^attempt)] aralığında rastgele bekleme."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def generate_content(self, model_name: str, payload: Dict, inline_data: Optional[memoryview] = None,
+                               max_retries: Optional[int] = None) -> Dict:
+        """`generateContent` çağrısı yapar; başarısız olursa boş sözlük döner, istek reddedilirse `GeminiRequestError` fırlatır.
+
+        `inline_data` verilirse payload'daki `INLINE_DATA_PLACEHOLDER` yerine base64 olarak akıtılır.
+        `max_retries` verilirse istemcinin varsayılan deneme sayısı yerine kullanılır.
+        """
+        return await self.post(model_name, f"/models/{model_name}:generateContent", payload, inline_data, max_retries)
+
+    def _retry_delay(self, response: httpx.Response, attempt: int, bucket: TokenBucket) -> float:
+        """Yeniden denenebilir yanıt için bekleme süresi; 429'da bucket da duraklatılır."""
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+        if response.status_code == 429:
+            RATE_LIMITED.inc(service="gemini")
+            bucket.pause(delay)
+            logger.warning(f"API Rate limit aşıldı. {delay:.1f} saniye bekleniyor...")
+        else:
+            logger.warning(f"API {response.status_code} döndürdü. {delay:.1f} saniye sonra tekrar denenecek...")
+        return delay
+
+    async def stream_generate_content(self, model_name: str, payload: Dict) -> AsyncIterator[str]:
+        """`streamGenerateContent` (SSE) çağrısı yapar ve gelen metin parçalarını sırayla verir.
+
+        Yeniden deneme yalnızca ilk parça gelmeden önce yapılır; başarısızlıkta `GeminiStreamError` fırlatılır.
+        """
+        if self._client is None:
+            await self.start()
+        started = time.perf_counter()
+        outcome = "error"
+        received = False
+        bucket = self.bucket(model_name)
+        self.in_flight += 1
+        try:
+            for attempt in range(self.max_retries):
+                await bucket.acquire()
+                delay = None
+                try:
+                    async with self._semaphore:
+                        async with self._client.stream("POST", f"/models/{model_name}:streamGenerateContent",
+                                                       params={"alt": "sse"}, json=payload) as response:
+                            GEMINI_ATTEMPTS.inc(status=response.status_code)
+                            if response.status_code in RETRYABLE_STATUS_CODES:
+                                delay = self._retry_delay(response, attempt, bucket)
+                            else:
+                                response.raise_for_status()
+                                async for line in response.aiter_lines():
+                                    if not line.startswith("data:"):
+                                        continue
+                                    text = candidate_text(json.loads(line[5:]))
+                                    if text:
+                                        received = True
+                                        yield text
+                                outcome = "ok"
+                                return
+                except httpx.HTTPStatusError as e:
+                    if is_client_error(e.response.status_code):
+                        raise GeminiRequestError(e.response.status_code) from e
+                    raise GeminiStreamError(f"HTTP hatası: {e.response.status_code}") from e
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    GEMINI_ATTEMPTS.inc(status=type(e).__name__)
+                    if received:
+                        raise GeminiStreamError(f"Akış yarıda kesildi ({type(e).__name__}).") from e
+                    delay = self._backoff_delay(attempt)
+                    logger.warning(f"API akış bağlantı hatası ({type(e).__name__}). {delay:.1f} saniye sonra tekrar denenecek...")
+                except json.JSONDecodeError as e:
+                    raise GeminiStreamError("Akış parçası çözümlenemedi.") from e
+                await asyncio.sleep(delay)
+            raise GeminiStreamError("Maksimum deneme sayısına ulaşıldı.")
+        finally:
+            self.in_flight -= 1
+            GEMINI_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+    def _request_kwargs(self, payload: Dict, inline_data: Optional[memoryview]) -> Dict[str, Any]:
+        if inline_data is None:
+            return {"json": payload}
+        length, body = streaming_json_body(payload, inline_data)
+        return {"content": body(), "headers": {"Content-Type": "application/json", "Content-Length": str(length)}}
+
+    async def post(self, model_name: str, path: str, payload: Dict, inline_data: Optional[memoryview] = None,
+                   max_retries: Optional[int] = None) -> Dict:
+        if self._client is None:
+            await self.start()
+        started = time.perf_counter()
+        outcome = "error"
+        self.in_flight += 1
+        try:
+            result = await self._post_with_retries(self.bucket(model_name), path, payload, inline_data, max_retries or self.max_retries)
+            outcome = "ok" if result else "error"
+            return result
+        except GeminiRequestError:
+            outcome = "rejected"
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            self.in_flight -= 1
+            GEMINI_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+    async def _post_with_retries(self, bucket: TokenBucket, path: str, payload: Dict, inline_data: Optional[memoryview],
+                                 max_retries: int) -> Dict:
+        for attempt in range(max_retries):
+            await bucket.acquire()
+            try:
+                async with self._semaphore:
+                    response = await self._client.post(path, **self._request_kwargs(payload, inline_data))
+                GEMINI_ATTEMPTS.inc(status=response.status_code)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    delay = self._retry_delay(response, attempt, bucket)
+                    # Son denemeden sonra beklenmez; çağıran (örn. model yönlendirici) hemen karar verebilir.
+                    if attempt + 1 < max_retries:
+                        await asyncio.sleep(delay)
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPStatusError as e:
+                logger.error(f"API'ye istekte HTTP hatası: {e}")
+                if is_client_error(e.response.status_code):
+                    raise GeminiRequestError(e.response.status_code) from e
+                return {}
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                GEMINI_ATTEMPTS.inc(status=type(e).__name__)
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"API bağlantı hatası ({type(e).__name__}). {delay:.1f} saniye sonra tekrar denenecek...")
+                if attempt + 1 < max_retries:
+                    await asyncio.sleep(delay)
+            except Exception as e:
+                logger.error(f"API'ye istekte beklenmedik hata: {e}")
+                return {}
+        logger.error("Maksimum deneme sayısına ulaşıldı, API isteği başarısız.")
+        return {}
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Uyarlanabilir Yük Atma
+Bekleyen gönderi sayısını ve olay döngüsü gecikmesini düzenli olarak ölçer. Eşikler
+aşıldığında önce görsel analizi, ardından metin geliştirmeyi kapatır; başlıklar AI'ye
+gitmeden sabit ek ile üretilir. Kuyruk boşalınca AI, sinyaller eşiklerin belirli bir
+oranının altında `restore_after` saniye kaldıktan sonra kademe kademe geri açılır
+(histerezis). Her mod değişikliği loglanır ve sayılır.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DEGRADATION_LEVEL = registry.gauge("krbrz_degradation_level", "AI yük atma seviyesi (0 normal, 1 görsel AI kapalı, 2 tüm AI kapalı).")
+DEGRADATION_CHANGES = registry.counter("krbrz_degradation_changes_total", "Yük atma modu değişiklikleri (girilen seviyeye göre).", ["level"])
+AI_SHED = registry.counter("krbrz_ai_shed_total", "Yük nedeniyle AI'ye gönderilmeyen başlıklar.", ["kind"])
+
+NORMAL, NO_IMAGE_AI, NO_AI = 0, 1, 2
+LEVEL_NAMES = {NORMAL: "normal", NO_IMAGE_AI: "görsel AI kapalı", NO_AI: "tüm AI kapalı"}
+
+
+class DegradationController:
+    """Kuyruk derinliği ve döngü gecikmesine göre AI aşamalarını açıp kapatan denetleyici."""
+
+    def __init__(self, measure_depth: Callable[[], Awaitable[int]], enabled: bool = True, interval: float = 1.0,
+                 image_depth: int = 15, text_depth: int = 40, image_lag: float = 0.25, text_lag: float = 0.5,
+                 restore_ratio: float = 0.5, restore_after: float = 30.0, lag_smoothing: float = 0.3):
+        self.measure_depth = measure_depth
+        self.enabled = enabled
+        self.interval = interval
+        # Seviye başına (derinlik, gecikme) eşikleri.
+        self.thresholds = {NO_IMAGE_AI: (image_depth, image_lag), NO_AI: (text_depth, text_lag)}
+        self.restore_ratio = restore_ratio
+        self.restore_after = restore_after
+        self.lag_smoothing = lag_smoothing
+        self.level = NORMAL
+        self.depth = 0
+        self.lag = 0.0
+        self.changes = 0
+        self._calm_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        DEGRADATION_LEVEL.set_function(lambda: self.level)
+
+    @property
+    def level_name(self) -> str:
+        return LEVEL_NAMES[self.level]
+
+    @property
+    def image_ai_allowed(self) -> bool:
+        return self.level < NO_IMAGE_AI
+
+    @property
+    def text_ai_allowed(self) -> bool:
+        return self.level < NO_AI
+
+    def _required_level(self, depth: int, lag: float, ratio: float = 1.0) -> int:
+        required = NORMAL
+        for level, (depth_limit, lag_limit) in self.thresholds.items():
+            if depth >= depth_limit * ratio or lag >= lag_limit * ratio:
+                required = max(required, level)
+        return required
+
+    def evaluate(self, depth: int, lag: float, now: Optional[float] = None) -> int:
+        """Yeni ölçümle seviyeyi günceller: yükselme hemen, düşme sakin geçen süreden sonra ve tek kademe."""
+        now = time.monotonic() if now is None else now
+        self.depth = depth
+        self.lag = lag
+        required = self._required_level(depth, lag)
+        if required > self.level:
+            self._set_level(required, depth, lag)
+            self._calm_since = None
+        elif self.level > NORMAL and self._required_level(depth, lag, self.restore_ratio) < self.level:
+            # Sinyaller geri açma eşiğinin altında; yeterince uzun süre sakin kalırsa bir kademe inilir.
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.restore_after:
+                self._set_level(self.level - 1, depth, lag)
+                self._calm_since = now
+        else:
+            self._calm_since = None
+        return self.level
+
+    def _set_level(self, level: int, depth: int, lag: float) -> None:
+        previous = self.level
+        self.level = level
+        self.changes += 1
+        DEGRADATION_CHANGES.inc(level=LEVEL_NAMES[level])
+        message = (f"Yük atma modu: {LEVEL_NAMES[previous]} → {LEVEL_NAMES[level]} "
+                   f"(bekleyen gönderi: {depth}, döngü gecikmesi: {lag * 1000:.0f} ms)")
+        if level > previous:
+            logger.warning(message)
+        else:
+            logger.info(message)
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            overshoot = max(0.0, time.perf_counter() - started - self.interval)
+            lag = self.lag + self.lag_smoothing * (overshoot - self.lag)
+            try:
+                depth = await self.measure_depth()
+            except Exception as e:
+                logger.error(f"Kuyruk derinliği ölçülemedi: {e}")
+                continue
+            self.evaluate(depth, lag)
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
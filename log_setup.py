@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Engellemeyen Loglama
+Log kayıtları bir `QueueHandler` ile kuyruğa bırakılır ve diske/konsola yazma işi
+ayrı bir iş parçacığındaki `QueueListener` tarafından yapılır. Log dosyası boyuta
+göre döndürülür; istenirse her satır JSON olarak yazılır. `/loglar` için dosyanın
+sonundan geriye doğru okuyan bir kuyruk (tail) fonksiyonu da burada bulunur.
+"""
+
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Her kaydı tek satırlık bir JSON nesnesi olarak biçimlendirir."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(log_file: str, level: int = logging.INFO, json_format: bool = False,
+                  max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3) -> QueueListener:
+    """Kök logger'ı kuyruğa yönlendirir ve yazıcı iş parçacığını başlatır."""
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(JsonLineFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def _line_level(line: str) -> Optional[str]:
+    if line.startswith("{"):
+        try:
+            return json.loads(line).get("level")
+        except ValueError:
+            return None
+    parts = line.split(" - ", 3)
+    return parts[2] if len(parts) == 4 else None
+
+
+def tail_lines(path: str, count: int = 20, level: Optional[str] = None, block_size: int = 8192) -> List[str]:
+    """Dosyanın tamamını okumadan, sondan geriye doğru bloklar halinde son `count` satırı döndürür.
+
+    `level` verilirse yalnızca o seviyedeki satırlar sayılır.
+    """
+    level = level.upper() if level else None
+    matched: List[str] = []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        while position > 0 and len(matched) < count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            chunk = f.read(read_size) + remainder
+            lines = chunk.split(b"\n")
+            # İlk parça bir önceki bloğun devamı olabilir; bir sonraki tura saklanır.
+            remainder = lines.pop(0) if position > 0 else b""
+            for raw in reversed(lines):
+                line = raw.decode('utf-8', errors='replace').rstrip("\r")
+                if not line or (level and _line_level(line) != level):
+                    continue
+                matched.append(line)
+                if len(matched) >= count:
+                    break
+    return list(reversed(matched))
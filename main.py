@@ -12,12 +12,16 @@ import io
 import base64
 import sqlite3
 import asyncio
+import atexit
+import secrets
+import re
+from contextlib import asynccontextmanager
 from datetime import datetime
 from threading import Lock
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 import httpx
 from PIL import Image, ImageDraw, ImageFont
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ForceReply
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ForceReply, InputMediaPhoto, InputMediaVideo
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, filters, ContextTypes,
     CallbackQueryHandler
@@ -28,6 +32,30 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import time
 from flask import Flask, render_template_string, request, redirect, url_for, flash
 from threading import Thread
+from log_setup import setup_logging, tail_lines
+from gemini_client import GeminiClient, GeminiStreamError, INLINE_DATA_PLACEHOLDER
+from fanout import FanoutDispatcher, DeliveryResult
+from file_id_cache import FileIdCache
+from watermark import WatermarkRenderer
+from media_pipeline import MediaPipeline
+from ai_cache import AICache
+from dedup import DuplicateDetector
+from stats_recorder import StatsRecorder
+from config_store import ConfigStore
+from album import MediaGroupAggregator
+from batcher import MicroBatcher
+from outbox import Outbox, with_retries
+from metrics import registry as metrics_registry
+from media_buffer import MediaDownloader
+from vision import VisionPreprocessor, pick_photo_size
+from progressive_reply import ProgressiveReply
+from faq_index import FaqIndex
+from rate_limit import UserRateLimiter
+from coalescer import MessageCoalescer
+from model_router import ModelRouter
+from load_shedding import DegradationController, AI_SHED
+from auto_post import AutoPostScheduler, parse_time
+from caption_templates import TemplateEngine, VARIABLES
 
 # --- Güvenli Ortam Değişkenleri ---
 try:
@@ -36,22 +64,35 @@ try:
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
     PORT = int(os.environ.get('PORT', 5000))
     FLASK_SECRET_KEY = os.environ.get('FLASK_SECRET_KEY', 'varsayilan_cok_guvenli_bir_anahtar_:)')
+    # Güncelleme alma modu: "webhook" veya "polling" (varsayılan).
+    BOT_MODE = os.environ.get('BOT_MODE', 'polling').strip().lower()
+    WEBHOOK_URL = os.environ.get('WEBHOOK_URL') or (f"https://{os.environ['RAILWAY_PUBLIC_DOMAIN']}" if os.environ.get('RAILWAY_PUBLIC_DOMAIN') else None)
+    WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET') or secrets.token_urlsafe(32)
 except (KeyError, ValueError) as e:
     print(f"!!! HATA: Gerekli environment variable bulunamadı: {e}")
     exit()
 
 # --- Gelişmiş Loglama ---
 LOG_FILE = "bot.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+# Disk yazımı ayrı bir iş parçacığında yapılır; olay döngüsü log yüzünden beklemez.
+log_listener = setup_logging(
+    LOG_FILE,
+    json_format=os.environ.get('LOG_FORMAT', 'text').lower() == 'json',
+    max_bytes=int(os.environ.get('LOG_MAX_BYTES', 5 * 1024 * 1024)),
+    backup_count=int(os.environ.get('LOG_BACKUP_COUNT', 3)),
 )
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
+# --- Metrikler ---
+STAGE_SECONDS = metrics_registry.histogram("krbrz_stage_seconds", "Gönderi zincirindeki her aşamanın süresi.", ["stage"])
+MESSAGES_TOTAL = metrics_registry.counter("krbrz_messages_total", "İşlenen gönderiler (tür bazında).", ["type"])
+AI_FALLBACKS = metrics_registry.counter("krbrz_ai_fallbacks_total", "AI yanıtı alınamadığı için varsayılan metnin kullanıldığı durumlar.", ["kind"])
+FAQ_LOOKUPS = metrics_registry.counter("krbrz_faq_lookups_total", "Özel mesajlarda SSS indeksi aramaları.", ["result"])
+DM_RATE_LIMITED = metrics_registry.counter("krbrz_dm_rate_limited_total", "Kullanıcı başına hız sınırı nedeniyle AI'ye gönderilmeyen özel mesajlar.")
+VISION_BYTES = metrics_registry.counter("krbrz_vision_bytes_total", "Görsel analiz için orijinal ve Gemini'ye gönderilen baytlar.", ["kind"])
+IN_FLIGHT = metrics_registry.gauge("krbrz_in_flight", "Şu anda devam eden işler.", ["component"])
+
 # --- Veritabanı Kurulumu ---
 def init_database():
     conn = sqlite3.connect('bot_data.db', check_same_thread=False)
@@ -59,6 +100,13 @@ def init_database():
     cursor.execute('CREATE TABLE IF NOT EXISTS message_stats (id INTEGER PRIMARY KEY, channel_id TEXT, message_type TEXT, ai_enhanced BOOLEAN, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)')
     conn.commit()
     conn.close()
+    file_id_cache.ensure_schema()
+    ai_cache.ensure_schema()
+    stats_recorder.ensure_schema()
+    outbox.ensure_schema()
+    faq_index.ensure_schema()
+    faq_index.load()
+    auto_poster.ensure_schema()
 
 # --- Konfigürasyon Yönetimi ---
 CONFIG_FILE = "bot_config.json"
@@ -77,155 +125,336 @@ def load_config():
                 "Eğlenceli Oyuncu": "Sen KRBRZ VIP BYPASS kullanan yetenekli ve eğlenceli bir oyuncusun. Samimi bir dil kullan. Cümlelerin sonunda mutlaka '@KRBRZ063 #KRBRZVipBypass #PUBG' etiketleri bulunsun."
             },
             "watermark": {"text": "KRBRZ_VIP", "position": "sag-alt", "color": "beyaz", "enabled": True},
-            "admin_ids": [], "auto_post_enabled": True, "auto_post_time": "19:00"
+            "admin_ids": [], "auto_post_enabled": True, "auto_post_time": "19:00",
+            "gemini_client": {"max_concurrency": 4, "requests_per_minute": 60, "burst": 5, "max_retries": 5},
+            "fanout": {"max_concurrency": 8, "global_rate": 25, "per_chat_rate": 0.33, "per_chat_burst": 3, "max_retries": 3},
+            "watermark_renderer": {"max_workers": 2, "quality": 95},
+            "media_pipeline": {"enabled": True, "workers": 2, "quality": 95, "queue_size": 8},
+            "ai_cache": {"memory_size": 256, "ttl_seconds": 604800, "max_rows": 5000},
+            "dedup": {"enabled": True, "window_seconds": 3600, "max_distance": 6, "text_max_distance": 3},
+            "stats_recorder": {"batch_size": 100, "flush_interval": 2.0, "retention_days": 30},
+            "album": {"window": 1.5},
+            "text_batcher": {"max_batch_size": 8, "max_wait": 0.03},
+            "outbox": {"workers": 3, "max_attempts": 5, "base_delay": 5.0},
+            "media_buffer": {"budget_mb": 64, "spool_threshold_mb": 8, "pool_size": 4},
+            "vision": {"enabled": True, "max_edge": 768, "quality": 80},
+            "user_reply_stream": {"enabled": True, "edit_interval": 1.0, "min_chars": 20},
+            "faq_index": {"enabled": True, "threshold": 0.75, "max_entries": 500, "min_asks": 3},
+            "user_rate_limit": {"per_minute": 6, "burst": 3},
+            "dm_coalescer": {"window": 0.4, "max_chars": 1000},
+            "model_router": {"models": ["gemini-1.5-flash-latest", "gemini-1.5-pro-latest"], "deadline": 20.0, "attempt_retries": 2,
+                             "hedge": True, "hedge_min_delay": 2.0, "hedge_max_delay": 6.0, "error_threshold": 0.5, "min_requests": 4, "cooldown": 30.0},
+            "auto_post": {"warm_minutes": 10, "misfire_grace": 3600},
+            "template_engine": {"enabled": True, "min_confidence": 0.6, "max_chars": 400},
+            "templates": {
+                "guncelleme": {"text": "🚀 KRBRZ VIP BYPASS {surum} güncellemesi yayında! ({tarih})\n\nHemen güncelleyin, farkı ilk maçta hissedin. {etiketler}",
+                               "keywords": ["güncelleme", "güncellendi", "update", "sürüm", "versiyon", "yama", "patch"]},
+                "bakim": {"text": "🛠️ KRBRZ VIP BYPASS kısa bir bakım çalışmasında ({tarih} {saat}).\n\nÇok yakında daha güçlü dönüyoruz! {etiketler}",
+                          "keywords": ["bakım", "maintenance", "geçici olarak", "kapalı", "erişilemiyor", "çalışma yapıl"]}
+            },
+            "load_shedding": {"enabled": True, "interval": 1.0, "image_depth": 15, "text_depth": 40, "image_lag": 0.25, "text_lag": 0.5,
+                              "restore_ratio": 0.5, "restore_after": 30.0}
         }
         if os.path.exists(CONFIG_FILE):
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
                 config = json.load(f)
                 defaults.update(config)
+        # Eski tek saatli ayar, ilk açılışta varsayılan slota dönüştürülür. Eski zamanlayıcı son gönderimi
+        # zaten yaptığından slot "migrated" olarak işaretlenir; açılışta son çalıştırması yapılmış sayılır.
+        if "auto_post_slots" not in defaults:
+            defaults["auto_post_slots"] = [{"id": "varsayilan", "time": defaults["auto_post_time"], "persona": None, "channels": [],
+                                            "enabled": True, "migrated": True}]
         if ADMIN_USER_ID not in defaults['admin_ids']:
             defaults['admin_ids'].append(ADMIN_USER_ID)
         return defaults
 
 bot_config = load_config()
+config_store = ConfigStore(CONFIG_FILE, bot_config, lock=config_lock)
 
 def save_config():
-    with config_lock:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(bot_config, f, indent=4, ensure_ascii=False)
+    """Kaydı zamanlar; art arda gelen değişiklikler tek bir atomik yazımda birleşir."""
+    config_store.schedule_save()
 
 # --- YAPAY ZEKA FONKSİYONLARI ---
 
-async def api_request_with_backoff(api_url: str, payload: Dict) -> Dict:
-    """API'ye üstel geri çekilme ile istek gönderir."""
-    max_retries = 5
-    base_delay = 2
-    for attempt in range(max_retries):
-        try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(api_url, json=payload)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 429:
-                delay = base_delay * (2 ** attempt)
-                logger.warning(f"API Rate limit aşıldı. {delay} saniye bekleniyor...")
-                await asyncio.sleep(delay)
-            else:
-                logger.error(f"API'ye istekte HTTP hatası: {e}")
-                return {}
-        except Exception as e:
-            logger.error(f"API'ye istekte beklenmedik hata: {e}")
-            return {}
-    logger.error("Maksimum deneme sayısına ulaşıldı, API isteği başarısız.")
-    return {}
+gemini_client = GeminiClient(GEMINI_API_KEY, **bot_config.get("gemini_client", {}))
+model_router = ModelRouter(gemini_client, **bot_config.get("model_router", {}))
+ai_cache = AICache('bot_data.db', **bot_config.get("ai_cache", {}))
+# Prompt metinleri değiştiğinde artırılır; böylece eski önbellek kayıtları kullanılmaz.
+PROMPT_VERSION = 1
+
+async def api_request_with_backoff(model_name: str, payload: Dict, inline_data: Optional[memoryview] = None) -> Dict:
+    """İsteği model yönlendirici üzerinden gönderir: bozuk modeli atlar, yavaş isteğe yedek ekler, süre sınırını uygular."""
+    return await model_router.generate_content(model_name, payload, inline_data)
 
 def get_ai_persona_prompt(persona: str) -> str:
     return bot_config.get("personas", {}).get(persona, "Normal bir şekilde yaz.")
 
-async def enhance_text_with_gemini_smarter(original_text: str) -> str:
-    """Metin tabanlı AI geliştirmesi için fonksiyon."""
-    if not GEMINI_API_KEY or not original_text: return original_text + " @KRBRZ063 #KRBRZVipBypass"
-    model_name = bot_config.get("ai_model", "gemini-1.5-flash-latest")
-    persona_prompt = get_ai_persona_prompt(bot_config.get("ai_persona", "Agresif Pazarlamacı"))
+def text_payload(original_text: str, persona_prompt: str) -> Dict:
+    """Tek metin için istek gövdesi; akışlı ve akışsız çağrılar aynı gövdeyi kullanır."""
     user_prompt = f"Senin ürünün 'KRBRZ VIP BYPASS' adlı bir emülatör bypass'ı. Sana verilen '{original_text}' metnini analiz et. Bu metnin ana fikrine (örn: güncelleme, bakım, satış) uygun olarak, seçtiğim kişiliğe göre kısa ve dikkat çekici bir sosyal medya başlığı oluştur. Sadece oluşturduğun başlığı yaz."
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={GEMINI_API_KEY}"
-    payload = {"contents": [{"parts": [{"text": user_prompt}]}],"systemInstruction": {"parts": [{"text": persona_prompt}]},"generationConfig": {"maxOutputTokens": 80,"temperature": 0.8,"topP": 0.9,"topK": 40}}
-    result = await api_request_with_backoff(api_url, payload)
+    return {"contents": [{"parts": [{"text": user_prompt}]}],"systemInstruction": {"parts": [{"text": persona_prompt}]},"generationConfig": {"maxOutputTokens": 80,"temperature": 0.8,"topP": 0.9,"topK": 40}}
+
+async def _enhance_single(key: Tuple[str, str], original_text: str) -> Optional[str]:
+    """Tek bir metin için Gemini isteği; API hatasında None döner."""
+    model_name, persona_prompt = key
+    payload = text_payload(original_text, persona_prompt)
+    result = await api_request_with_backoff(model_name, payload)
     if not result:
-        return original_text + " @KRBRZ063 #KRBRZVipBypass"
+        return None
     try:
-        return result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "").strip() or original_text
+        return result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "").strip()
     except IndexError:
         logger.error(f"AI Metin çıktısı işlenemedi.")
+        return None
+
+async def _enhance_batch(key: Tuple[str, str], texts: List[str]) -> List[Optional[str]]:
+    """Birden fazla metni tek istekte işler; yanıt JSON dizisi olarak ayrıştırılamazsa hata fırlatır."""
+    model_name, persona_prompt = key
+    numbered = "\n".join(f"{i + 1}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(texts))
+    user_prompt = (f"Senin ürünün 'KRBRZ VIP BYPASS' adlı bir emülatör bypass'ı. Aşağıda numaralı {len(texts)} metin var. "
+                   "Her metni ayrı ayrı analiz et ve ana fikrine (örn: güncelleme, bakım, satış) uygun olarak, seçtiğim kişiliğe göre kısa ve dikkat çekici bir sosyal medya başlığı oluştur. "
+                   f"Yanıt olarak sadece, sırası metinlerle aynı olan {len(texts)} elemanlı bir JSON string dizisi döndür.\n\n{numbered}")
+    payload = {"contents": [{"parts": [{"text": user_prompt}]}],"systemInstruction": {"parts": [{"text": persona_prompt}]},
+               "generationConfig": {"maxOutputTokens": 80 * len(texts),"temperature": 0.8,"topP": 0.9,"topK": 40,"responseMimeType": "application/json"}}
+    result = await api_request_with_backoff(model_name, payload)
+    if not result:
+        return [None] * len(texts)
+    raw = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+    captions = json.loads(raw)
+    if not isinstance(captions, list) or len(captions) != len(texts) or not all(isinstance(c, str) for c in captions):
+        raise ValueError("Beklenen biçimde JSON dizisi gelmedi.")
+    return [caption.strip() for caption in captions]
+
+text_batcher = MicroBatcher(_enhance_batch, _enhance_single, **bot_config.get("text_batcher", {}))
+
+async def enhance_text_with_gemini_smarter(original_text: str, use_cache: bool = True) -> str:
+    """Metin tabanlı AI geliştirmesi için fonksiyon."""
+    if not GEMINI_API_KEY or not original_text: return original_text + " @KRBRZ063 #KRBRZVipBypass"
+    model_name = bot_config.get("ai_model", "gemini-1.5-flash-latest")
+    persona_prompt = get_ai_persona_prompt(bot_config.get("ai_persona", "Agresif Pazarlamacı"))
+    cache_key = ai_cache.make_key("text", original_text, persona_prompt, model_name, PROMPT_VERSION)
+    if use_cache:
+        cached = await ai_cache.get(cache_key)
+        if cached:
+            return cached
+    text = await text_batcher.submit((model_name, persona_prompt), original_text)
+    if text is None:
+        AI_FALLBACKS.inc(kind="text")
         return original_text + " @KRBRZ063 #KRBRZVipBypass"
+    if not text:
+        return original_text
+    if use_cache:
+        await ai_cache.set(cache_key, text)
+    return text
 
-async def generate_caption_from_image(image_bytes: bytes) -> str:
-    """Bir görsel için tek, akıllı bir başlık üretir."""
+vision_preprocessor = VisionPreprocessor(**bot_config.get("vision", {}))
+
+async def generate_caption_from_image(photo: Dict, bot, photo_bytes: Optional[memoryview] = None) -> str:
+    """Bir görsel için tek, akıllı bir başlık üretir.
+
+    Tam boyutlu görsel zaten indirilmişse o küçültülür; değilse yalnızca analize yeten PhotoSize indirilir.
+    """
     if not GEMINI_API_KEY: return "Zirve bizimdir! 👑 @KRBRZ063 #KRBRZVipBypass"
     model_name = bot_config.get("ai_model", "gemini-1.5-flash-latest")
     persona_prompt = get_ai_persona_prompt(bot_config.get("ai_persona", "Agresif Pazarlamacı"))
-    image_b64 = base64.b64encode(image_bytes).decode('utf-8')
-    user_prompt = ("Bu bir PUBG Mobile emülatör oyununa ait ekran görüntüsü. Sattığımız ürünün adı 'KRBRZ VIP BYPASS'. "
-                   "Görüntüyü analiz et ve içeriğine (zafer, çatışma vb.) uygun olarak, seçtiğim kişiliğe göre kısa, satış odaklı ve etkileyici tek bir sosyal medya başlığı oluştur. "
-                   "Sadece oluşturduğun başlığı yaz, başka bir şey ekleme.")
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={GEMINI_API_KEY}"
-    payload = {"contents": [{"parts": [{"text": user_prompt}, {"inline_data": {"mime_type": "image/jpeg", "data": image_b64}}]}],"systemInstruction": {"parts": [{"text": persona_prompt}]},"generationConfig": {"maxOutputTokens": 80,"temperature": 0.8}}
-    result = await api_request_with_backoff(api_url, payload)
-    if not result:
-        return "Zirve bizimdir! 👑 @KRBRZ063 #KRBRZVipBypass"
-    try:
-        return result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "").strip() or "Zirve bizimdir! 👑"
-    except IndexError:
-        logger.error(f"AI Görsel başlık çıktısı işlenemedi.")
+    # Anahtar dosya kimliği + ön işleme ayarlarıdır; önbellekte varsa görsel hiç indirilmez.
+    cache_key = ai_cache.make_key("image", f"{photo['file_unique_id']}:{vision_preprocessor.cache_tag}", persona_prompt, model_name, PROMPT_VERSION)
+    cached = await ai_cache.get(cache_key)
+    if cached:
+        return cached
+
+    async def request_caption(data: memoryview) -> Optional[str]:
+        with STAGE_SECONDS.time(stage="vision"):
+            image = await vision_preprocessor.prepare(data)
+        VISION_BYTES.inc(image.original_bytes, kind="original")
+        VISION_BYTES.inc(image.sent_bytes, kind="sent")
+        user_prompt = ("Bu bir PUBG Mobile emülatör oyununa ait ekran görüntüsü. Sattığımız ürünün adı 'KRBRZ VIP BYPASS'. "
+                       "Görüntüyü analiz et ve içeriğine (zafer, çatışma vb.) uygun olarak, seçtiğim kişiliğe göre kısa, satış odaklı ve etkileyici tek bir sosyal medya başlığı oluştur. "
+                       "Sadece oluşturduğun başlığı yaz, başka bir şey ekleme.")
+        payload = {"contents": [{"parts": [{"text": user_prompt}, {"inline_data": {"mime_type": image.mime_type, "data": INLINE_DATA_PLACEHOLDER}}]}],"systemInstruction": {"parts": [{"text": persona_prompt}]},"generationConfig": {"maxOutputTokens": 80,"temperature": 0.8}}
+        # Görsel, base64 kopyası oluşturulmadan istek gövdesine akıtılır.
+        result = await api_request_with_backoff(model_name, payload, inline_data=image.data)
+        if not result:
+            return None
+        try:
+            return result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "").strip()
+        except IndexError:
+            logger.error(f"AI Görsel başlık çıktısı işlenemedi.")
+            return None
+
+    if photo_bytes is not None:
+        text = await request_caption(photo_bytes)
+    else:
+        async with downloaded_media(bot, [photo.get("vision_file_id", photo["file_id"])]) as downloads:
+            text = await request_caption(downloads[0])
+    if text is None:
+        AI_FALLBACKS.inc(kind="image")
         return "Zirve bizimdir! 👑 @KRBRZ063 #KRBRZVipBypass"
+    if not text:
+        return "Zirve bizimdir! 👑"
+    await ai_cache.set(cache_key, text)
+    return text
 
+AUTO_POST_PROMPT = "KRBRZ VIP BYPASS ürününü tanıtmak için, insanları satın almaya teşvik eden, kısa ve güçlü bir reklam metni yaz. FOMO (kaçırma korkusu) veya ayrıcalık gibi satış taktikleri kullan."
 
-async def generate_automated_post(application: Application) -> None:
-    logger.info("Otomatik gönderi zamanı geldi, AI içerik üretiyor...")
-    if not GEMINI_API_KEY: 
+async def generate_auto_post_text(slot: Dict) -> Optional[str]:
+    """Slotun personasıyla reklam metni üretir; AI yanıt vermezse None döner (istem metni gönderilmez)."""
+    if not GEMINI_API_KEY:
         logger.warning("Otomatik gönderi için Gemini API anahtarı bulunamadı.")
-        return
+        return None
+    model_name = bot_config.get("ai_model", "gemini-1.5-flash-latest")
+    persona_prompt = get_ai_persona_prompt(slot.get("persona") or bot_config.get("ai_persona", "Agresif Pazarlamacı"))
+    # Her gün farklı bir metin üretilsin diye otomatik gönderi önbelleği kullanmaz.
+    with STAGE_SECONDS.time(stage="auto_post_generate"):
+        return await text_batcher.submit((model_name, persona_prompt), AUTO_POST_PROMPT) or None
+
+def auto_post_destinations(slot: Dict) -> List[str]:
+    """Slotun kanalları; boşsa tüm hedef kanallar."""
+    return slot.get("channels") or bot_config["destination_channels"]
+
+async def deliver_auto_post(bot, slot: Dict, post_text: str, destinations: List[str]) -> List[str]:
+    """Hazır metni verilen kanallara eşzamanlı gönderir; ulaşılan kanalları döndürür."""
+    with STAGE_SECONDS.time(stage="auto_post_send"):
+        results = await fanout.dispatch(destinations, lambda dest: bot.send_message(chat_id=dest, text=post_text))
+    log_delivery_results(results)
+    return [dest for dest, result in results.items() if result.ok]
+
+def user_reply_prompt(user_message: str) -> str:
+    return f"Bir müşteri sana şu soruyu sordu: '{user_message}'. Ona KRBRZ VIP BYPASS ürününü tanıtan, ana kanala yönlendiren, kibar ve profesyonel bir yanıt yaz."
 
-    user_prompt = "KRBRZ VIP BYPASS ürününü tanıtmak için, insanları satın almaya teşvik eden, kısa ve güçlü bir reklam metni yaz. FOMO (kaçırma korkusu) veya ayrıcalık gibi satış taktikleri kullan."
-    
-    post_text = await enhance_text_with_gemini_smarter(user_prompt)
-    if not post_text:
-        logger.error("Otomatik gönderi için AI içerik üretemedi.")
-        return
-    
-    for dest in bot_config["destination_channels"]:
-        try:
-            await application.bot.send_message(chat_id=dest, text=post_text)
-            logger.info(f"Otomatik gönderi {dest} kanalına gönderildi.")
-        except Exception as e:
-            logger.error(f"Otomatik gönderi hatası ({dest}): {e}")
 async def generate_user_reply(user_message: str) -> str:
     if not GEMINI_API_KEY: return "Merhaba, KRBRZ VIP BYPASS ile ilgilendiğiniz için teşekkürler. Detaylar için ana kanalımızı takip edin."
     persona = get_ai_persona_prompt("Profesyonel Satıcı")
-    user_prompt = f"Bir müşteri sana şu soruyu sordu: '{user_message}'. Ona KRBRZ VIP BYPASS ürününü tanıtan, ana kanala yönlendiren, kibar ve profesyonel bir yanıt yaz."
+    user_prompt = user_reply_prompt(user_message)
     
     return await enhance_text_with_gemini_smarter(user_prompt)
-async def apply_watermark(photo_bytes: bytes) -> bytes:
+
+async def stream_user_reply(message, user_message: str) -> Optional[str]:
+    """Yanıtı Gemini'den akıtarak gönderir; ilk parça gelir gelmez mesaj görünür.
+
+    Akış kurulamaz ya da yarıda kesilirse akışsız çağrının sonucu aynı mesaja yazılır.
+    Yanıt Gemini'den (ya da önbellekten) geldiyse metni, varsayılan metne dönüldüyse None döner.
+    """
+    stream_config = bot_config.get("user_reply_stream", {})
+    started = time.perf_counter()
+    if not GEMINI_API_KEY or not stream_config.get("enabled", True):
+        await message.reply_text(await generate_user_reply(user_message), parse_mode='Markdown')
+        for stage in ("reply_first_text", "reply"):
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        return None
+    model_name = bot_config.get("ai_model", "gemini-1.5-flash-latest")
+    persona_prompt = get_ai_persona_prompt(bot_config.get("ai_persona", "Agresif Pazarlamacı"))
+    user_prompt = user_reply_prompt(user_message)
+    # Akışsız yol ile aynı anahtar; iki yol da birbirinin önbelleğinden yararlanır.
+    cache_key = ai_cache.make_key("text", user_prompt, persona_prompt, model_name, PROMPT_VERSION)
+    reply = ProgressiveReply(message, edit_interval=stream_config.get("edit_interval", 1.0),
+                             min_chars=stream_config.get("min_chars", 20))
+    cached = await ai_cache.get(cache_key)
+    if cached:
+        await reply.finish(cached)
+        for stage in ("reply_first_text", "reply"):
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        return cached
+    text = ""
+    first_text_seen = False
+    try:
+        async for chunk in model_router.stream_generate_content(model_name, text_payload(user_prompt, persona_prompt)):
+            await reply.append(chunk)
+            # İlk metnin kullanıcıya göründüğü an bir kez ölçülür.
+            if not first_text_seen and reply.started:
+                first_text_seen = True
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage="reply_first_text")
+        text = reply.text.strip()
+    except GeminiStreamError as e:
+        logger.warning(f"Yanıt akışı başarısız, akışsız isteğe dönülüyor: {e}")
+    if text:
+        await ai_cache.set(cache_key, text)
+        await reply.finish(text)
+    else:
+        AI_FALLBACKS.inc(kind="stream")
+        await reply.finish(await generate_user_reply(user_message))
+    if not first_text_seen:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="reply_first_text")
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage="reply")
+    return text or None
+
+# --- Özel Mesajlar: SSS İndeksi, Hız Sınırı ve Birleştirme ---
+faq_index = FaqIndex('bot_data.db', **bot_config.get("faq_index", {}))
+user_rate_limiter = UserRateLimiter(**bot_config.get("user_rate_limit", {}))
+RATE_LIMIT_NOTICE = "⏳ Çok hızlı mesaj gönderiyorsunuz. Lütfen biraz bekleyip tekrar yazın."
+
+async def answer_user_messages(messages: List) -> None:
+    """Bir kullanıcının art arda gelen mesajlarını tek soru olarak yanıtlar.
+
+    Önce SSS indeksine bakılır; verilebilir bir eşleşme yoksa ve kullanıcının kotası varsa Gemini'ye gidilir.
+    Gemini yanıtı indekse aday olarak girer; başka kullanıcılar da sorana kadar kimseye verilmez.
+    """
+    message = messages[-1]
+    user_id = message.from_user.id
+    user_text = "\n".join(m.text for m in messages if m.text)
+    started = time.perf_counter()
+    match = faq_index.match(user_text) if faq_index.enabled else None
+    if match and faq_index.servable(match[0]):
+        entry, score = match
+        FAQ_LOOKUPS.inc(result="hit")
+        logger.info(f"SSS #{entry.id} ile yanıtlandı (benzerlik {score:.2f}).")
+        await ProgressiveReply(message).finish(entry.answer)
+        await faq_index.record_hit(entry)
+        for stage in ("reply_first_text", "reply"):
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        return
+    if match:
+        # Aday kayda benzeyen soru tekrar olarak sayılır; yeni aday eklenmez.
+        FAQ_LOOKUPS.inc(result="candidate")
+        await faq_index.record_ask(match[0], user_id)
+    else:
+        FAQ_LOOKUPS.inc(result="miss")
+    if not user_rate_limiter.allow(user_id):
+        DM_RATE_LIMITED.inc()
+        if user_rate_limiter.should_notify(user_id):
+            await message.reply_text(RATE_LIMIT_NOTICE)
+        return
+    await message.reply_chat_action('typing')
+    answer = await stream_user_reply(message, user_text)
+    if answer and not match:
+        await faq_index.add(user_text, answer, asker=user_id)
+
+message_coalescer = MessageCoalescer(answer_user_messages, **bot_config.get("dm_coalescer", {}))
+watermark_renderer = WatermarkRenderer(**bot_config.get("watermark_renderer", {}))
+media_pipeline = MediaPipeline(**bot_config.get("media_pipeline", {}))
+
+async def apply_watermark(photo_bytes: memoryview) -> bytes:
     wm_config = bot_config.get("watermark", {})
-    if not wm_config.get("enabled"): return photo_bytes
+    # Telegram'a yüklenecek veri, tampon kapanmadan önce bytes'a çevrilir.
+    if not wm_config.get("enabled"): return bytes(photo_bytes)
     try:
-        with Image.open(io.BytesIO(photo_bytes)).convert("RGBA") as base:
-            txt = Image.new("RGBA", base.size, (255, 255, 255, 0))
-            font_size = max(15, base.size[1] // 25)
-            font = None
-            font_paths = ['/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 'arial.ttf', '/System/Library/Fonts/Supplemental/Arial.ttf']
-            for path in font_paths:
-                try:
-                    font = ImageFont.truetype(path, size=font_size)
-                    break
-                except IOError:
-                    continue
-            if not font:
-                font = ImageFont.load_default()
-            d = ImageDraw.Draw(txt)
-            colors = {"beyaz": (255, 255, 255, 180),"siyah": (0, 0, 0, 180),"kirmizi": (255, 0, 0, 180)}
-            fill_color = colors.get(wm_config.get("color", "beyaz").lower(), (255, 255, 255, 180))
-            text = wm_config.get("text", "KRBRZ_VIP")
-            text_bbox = d.textbbox((0, 0), text, font=font)
-            text_width, text_height = text_bbox[2] - text_bbox[0], text_bbox[3] - text_bbox[1]
-            margin = 15
-            positions = {'sag-alt': (base.width - text_width - margin, base.height - text_height - margin),'sol-ust': (margin, margin)}
-            x, y = positions.get(wm_config.get("position", "sag-alt"), positions['sag-alt'])
-            d.text((x, y), text, font=font, fill=fill_color)
-            out = Image.alpha_composite(base, txt)
-            buffer = io.BytesIO()
-            out.convert("RGB").save(buffer, format="JPEG", quality=95)
-            buffer.seek(0)
-            return buffer.getvalue()
+        # Süreç havuzu çalışıyorsa CPU yoğun iş oraya, değilse iş parçacığı havuzuna gider.
+        with STAGE_SECONDS.time(stage="watermark"):
+            if media_pipeline.running:
+                return await media_pipeline.submit(photo_bytes, wm_config)
+            return await watermark_renderer.apply(photo_bytes, wm_config)
     except Exception as e:
         logger.error(f"Filigran hatası: {e}")
-        return photo_bytes
+        return bytes(photo_bytes)
+
+# --- Hedef Kanallara Dağıtım ---
+fanout = FanoutDispatcher(**bot_config.get("fanout", {}))
+file_id_cache = FileIdCache('bot_data.db', **bot_config.get("file_id_cache", {}))
+stats_recorder = StatsRecorder('bot_data.db', **bot_config.get("stats_recorder", {}))
+
+def log_delivery_results(results: Dict[str, DeliveryResult]) -> None:
+    """Her hedef için gönderim sonucunu ve gecikmesini loglar."""
+    for dest, result in results.items():
+        if result.ok:
+            logger.info(f"Mesaj {dest} kanalına başarıyla yönlendirildi ({result.latency * 1000:.0f} ms, {result.attempts} deneme).")
+        else:
+            logger.error(f"{dest} kanalına yönlendirme hatası ({result.latency * 1000:.0f} ms): {result.error}")
 
 # --- Admin ve Ayar Komutları (Telegram) ---
 def admin_only(func):
     async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
-        if update.effective_user.id not in bot_config.get('admin_ids', [ADMIN_USER_ID]):
+        if not config_store.is_admin(update.effective_user.id):
             return
         return await func(update, context, *args, **kwargs)
     return wrapped
@@ -256,7 +485,7 @@ async def get_main_menu_content():
         [InlineKeyboardButton("👥 Admin Yönetimi", callback_data='menu_admins')],
         [InlineKeyboardButton(f"{text_ai_status} Akıllı Metin", callback_data='toggle_text_ai'), InlineKeyboardButton(f"{image_ai_status} Akıllı Görüntü", callback_data='toggle_image_ai')],
         [InlineKeyboardButton("🧠 AI Ayarları", callback_data='menu_ai_settings'), InlineKeyboardButton(f"{wm_status} Filigran", callback_data='toggle_watermark')],
-        [InlineKeyboardButton(f"{auto_post_status} Oto. Gönderi ({bot_config['auto_post_time']})", callback_data='toggle_auto_post')],
+        [InlineKeyboardButton(f"{auto_post_status} Oto. Gönderi", callback_data='toggle_auto_post'), InlineKeyboardButton("⏰ Gönderi Saatleri", callback_data='menu_auto_post')],
         [InlineKeyboardButton("✅ Menüyü Kapat", callback_data='menu_close')],
     ]
     return text, InlineKeyboardMarkup(keyboard)
@@ -293,12 +522,35 @@ async def get_persona_menu_content():
     return text, InlineKeyboardMarkup(keyboard)
 async def get_model_menu_content():
     text = "🤖 Kullanılacak AI modelini seçin:"
-    models = ["gemini-1.5-flash-latest", "gemini-1.5-pro-latest"]
+    models = model_router.models
     keyboard = [
         [InlineKeyboardButton(f"{'➡️ ' if bot_config['ai_model'] == m else ''}{m}", callback_data=f'set_model_{m}')] for m in models
     ]
     keyboard.append([InlineKeyboardButton("⬅️ Geri", callback_data='menu_ai_settings')])
     return text, InlineKeyboardMarkup(keyboard)
+def apply_auto_post_schedule() -> None:
+    """Menüdeki değişiklikleri yeniden başlatma gerektirmeden zamanlayıcıya işler."""
+    auto_poster.reschedule(bot_config["auto_post_slots"] if bot_config["auto_post_enabled"] else [])
+def find_slot(slot_id: str) -> Optional[Dict]:
+    return next((slot for slot in bot_config["auto_post_slots"] if slot["id"] == slot_id), None)
+async def get_auto_post_menu_content():
+    status = "açık" if bot_config["auto_post_enabled"] else "kapalı"
+    next_runs = {slot["id"]: when for slot, when in auto_poster.next_runs()}
+    lines = []
+    for slot in sorted(bot_config["auto_post_slots"], key=lambda s: s["time"]):
+        channels = ", ".join(slot.get("channels") or []) or "tüm hedefler"
+        when = f", sonraki: `{next_runs[slot['id']]:%d.%m %H:%M}`" if slot["id"] in next_runs else ""
+        lines.append(f"{'✅' if slot.get('enabled', True) else '❌'} `{slot['time']}` — {slot.get('persona') or 'Genel persona'} ({channels}){when}")
+    text = f"⏰ **Otomatik Gönderi Saatleri** (genel: {status})\n\n" + ("\n".join(lines) or "_Boş_")
+    text += f"\n\nİçerik gönderimden `{auto_poster.warm_minutes}` dk önce hazırlanır."
+    keyboard = []
+    for slot in sorted(bot_config["auto_post_slots"], key=lambda s: s["time"]):
+        keyboard.append([InlineKeyboardButton(f"{'⏸️' if slot.get('enabled', True) else '▶️'} {slot['time']}", callback_data=f"slot_toggle_{slot['id']}"),
+                         InlineKeyboardButton("🎭 Persona", callback_data=f"slot_persona_{slot['id']}"),
+                         InlineKeyboardButton("🗑️ Sil", callback_data=f"slot_delete_{slot['id']}")])
+    keyboard.append([InlineKeyboardButton("➕ Yeni Saat Ekle", callback_data='add_slot')])
+    keyboard.append([InlineKeyboardButton("⬅️ Ana Menüye Dön", callback_data='menu_main')])
+    return text, InlineKeyboardMarkup(keyboard)
 @admin_only
 async def setup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if 'menu_message_id' in context.user_data:
@@ -322,6 +574,8 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
         status = "açıldı" if target_dict[config_key] else "kapatıldı"
         await query.answer(f"✅ {toggle_map[data]} {status}", show_alert=True)
         save_config()
+        if data == 'toggle_auto_post':
+            apply_auto_post_schedule()
         text, reply_markup = await get_main_menu_content()
     elif data == 'menu_main':
         await query.answer()
@@ -355,11 +609,36 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
         save_config()
         await query.answer(f"✅ Model '{model}' olarak ayarlandı", show_alert=True)
         text, reply_markup = await get_ai_settings_menu_content()
+    elif data == 'menu_auto_post':
+        await query.answer()
+        text, reply_markup = await get_auto_post_menu_content()
+    elif data.startswith('slot_'):
+        _, action, slot_id = data.split('_', 2)
+        slot = find_slot(slot_id)
+        if slot is None:
+            await query.answer("Bu gönderi saati artık yok.")
+        elif action == 'toggle':
+            slot["enabled"] = not slot.get("enabled", True)
+            await query.answer(f"✅ {slot['time']} {'açıldı' if slot['enabled'] else 'kapatıldı'}")
+        elif action == 'persona':
+            # Genel persona → tanımlı personalar → genel persona döngüsü.
+            options = [None] + list(bot_config['personas'])
+            slot["persona"] = options[(options.index(slot.get("persona")) + 1) % len(options)] if slot.get("persona") in options else None
+            await query.answer(f"🎭 {slot['time']}: {slot['persona'] or 'Genel persona'}")
+        elif action == 'delete':
+            bot_config["auto_post_slots"].remove(slot)
+            await query.answer(f"🗑️ {slot['time']} silindi.", show_alert=True)
+        save_config()
+        apply_auto_post_schedule()
+        text, reply_markup = await get_auto_post_menu_content()
     elif data.startswith('add_'):
         await query.answer()
         item_type = data.replace('add_', '')
         context_map = {'source': 'Kaynak Kanalı', 'destination': 'Hedef Kanalı', 'admin': 'Admin ID'}
-        prompt_text = f"➕ Eklenecek yeni **{context_map[item_type]}** adını/ID'sini yazıp bu mesaja yanıt verin."
+        if item_type == 'slot':
+            prompt_text = "➕ Yeni gönderi saatini `SS:DD` biçiminde yazıp bu mesaja yanıt verin. İsterseniz ardından kanalları ekleyin (örn. `09:30 @kanal1 @kanal2`); kanal yazılmazsa tüm hedeflere gönderilir."
+        else:
+            prompt_text = f"➕ Eklenecek yeni **{context_map[item_type]}** adını/ID'sini yazıp bu mesaja yanıt verin."
         await query.message.delete()
         context.user_data.pop('menu_message_id', None)
         sent_reply_message = await query.message.reply_text(prompt_text, reply_markup=ForceReply(selective=True), parse_mode='Markdown')
@@ -374,9 +653,7 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
         else:
             config_key = "admin_ids"
             item_id = int(item_id_str)
-        if item_id in bot_config[config_key]:
-            bot_config[config_key].remove(item_id)
-            save_config()
+        if config_store.remove_item(config_key, item_id):
             await query.answer(f"🗑️ {item_id} silindi.", show_alert=True)
         if item_type in ["source", "destination"]:
              text, reply_markup = await get_channels_menu_content(item_type)
@@ -403,85 +680,324 @@ async def reply_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         config_key = f"{item_type}_channels"
         if not item_value.startswith("@") and not item_value.startswith("-100"):
             item_value = f"@{item_value}"
-        if item_value not in bot_config[config_key]:
-            bot_config[config_key].append(item_value)
-            save_config()
+        config_store.add_item(config_key, item_value)
     elif item_type == 'admin':
         try:
             admin_id = int(item_value)
-            if admin_id not in bot_config['admin_ids']:
-                bot_config['admin_ids'].append(admin_id)
-                save_config()
+            config_store.add_item('admin_ids', admin_id)
         except ValueError:
             pass
+    elif item_type == 'slot':
+        parts = item_value.split()
+        if parts and parse_time(parts[0]):
+            hour, minute = parse_time(parts[0])
+            channels = [ch if ch.startswith("@") or ch.startswith("-100") else f"@{ch}" for ch in parts[1:]]
+            bot_config["auto_post_slots"].append({"id": uuid.uuid4().hex[:8], "time": f"{hour:02d}:{minute:02d}", "persona": None,
+                                                  "channels": channels, "enabled": True})
+            save_config()
+            apply_auto_post_schedule()
+        else:
+            await update.message.reply_text("⚠️ Geçersiz saat. Örnek: `19:00` ya da `09:30 @kanal1`", parse_mode='Markdown')
     await context.bot.delete_message(chat_id=update.effective_chat.id, message_id=reply_info['message_id'])
     await update.message.delete()
     del context.user_data['force_reply_info']
     await setup_command(update, context)
 
+duplicate_detector = DuplicateDetector(**bot_config.get("dedup", {}))
+outbox = Outbox('bot_data.db', **bot_config.get("outbox", {}))
+# Kuyruk birikince AI aşamalarını geçici olarak kapatır; başlıklar sabit ekle üretilir.
+degradation = DegradationController(outbox.backlog, **bot_config.get("load_shedding", {}))
+
+async def _resolved(value=None):
+    return value
+
+def source_identifier(message) -> str:
+    return f"@{message.chat.username}" if message.chat.username else str(message.chat.id)
+
+def photo_ref(message) -> Optional[Dict]:
+    if not message.photo:
+        return None
+    sizes = [{"file_id": size.file_id, "width": size.width, "height": size.height} for size in message.photo]
+    return {"file_id": message.photo[-1].file_id, "file_unique_id": message.photo[-1].file_unique_id, "thumb_file_id": message.photo[0].file_id,
+            "vision_file_id": pick_photo_size(sizes, vision_preprocessor.max_edge)["file_id"]}
+
+def job_from_message(message) -> Dict:
+    """Mesajdan, Message nesnesine ihtiyaç duymadan yeniden işlenebilen kalıcı bir iş kaydı üretir."""
+    if message.photo: kind = 'photo'
+    elif message.video: kind = 'video'
+    elif message.text: kind = 'text'
+    else: kind = 'other'
+    return {"kind": kind, "chat_id": message.chat.id, "chat_identifier": source_identifier(message), "message_id": message.message_id,
+            "text": message.text, "caption": message.caption, "photo": photo_ref(message),
+            "video_file_id": message.video.file_id if message.video else None}
+
+def album_job_from_messages(messages: List) -> Dict:
+    items = [m for m in messages if m.photo or m.video]
+    first_message = messages[0]
+    job = job_from_message(first_message)
+    job.update({"kind": 'album', "media_group_id": first_message.media_group_id, "text": None,
+                "caption": next((m.caption for m in items if m.caption), None),
+                "photo": next((photo_ref(m) for m in items if m.photo), None),
+                "items": [{"type": 'photo', "photo": photo_ref(m)} if m.photo else {"type": 'video', "video_file_id": m.video.file_id} for m in items]})
+    return job
+
+media_downloader = MediaDownloader(**bot_config.get("media_buffer", {}))
+
+async def download_file(bot, file_id: str) -> bytearray:
+    """Küçük bir Telegram dosyasını (ör. küçük resim), geçici hatalarda tekrar deneyerek indirir."""
+    async def attempt():
+        file = await bot.get_file(file_id)
+        return await file.download_as_bytearray()
+    with STAGE_SECONDS.time(stage="download"):
+        return await with_retries(attempt)
+
+@asynccontextmanager
+async def downloaded_media(bot, file_ids: List[str]):
+    """Dosyaları medya bayt bütçesinden tek seferde yer ayırarak indirir ve `memoryview` listesi verir.
+
+    Tamponlar (bellek ya da geçici dosya) ve ayrılan bütçe blok bitince serbest bırakılır. Blok içinden
+    yeniden çağrılmamalıdır: bütçeyi tutarken tekrar yer istemek büyük işlerde kilitlenmeye yol açar.
+    """
+    if not file_ids:
+        yield []
+        return
+    files = await asyncio.gather(*(with_retries(lambda file_id=file_id: bot.get_file(file_id)) for file_id in file_ids))
+    # İşin tüm dosyaları için tek seferde yer ayrılır; parça parça yer ayıran işler birbirini kilitleyebilirdi.
+    reserved = await media_downloader.budget.acquire(sum(media_downloader.estimate_size(file) for file in files))
+    buffers = [media_downloader.new_buffer(getattr(file, "file_size", None)) for file in files]
+    try:
+        with STAGE_SECONDS.time(stage="download"):
+            await asyncio.gather(*(with_retries(lambda file=file, buffer=buffer: media_downloader.fetch(file, buffer))
+                                   for file, buffer in zip(files, buffers)))
+        yield [buffer.view() for buffer in buffers]
+    finally:
+        for buffer in buffers:
+            buffer.close()
+        await media_downloader.budget.release(reserved)
+
+async def is_duplicate_job(job: Dict, bot) -> bool:
+    """Gönderi yakın zamanda başka bir kaynakta görüldüyse True döner (AI ve indirmeden önce)."""
+    if not duplicate_detector.enabled:
+        return False
+    try:
+        if job.get("photo"):
+            # Algısal hash için en küçük PhotoSize yeterlidir; büyük görsel indirilmez.
+            return duplicate_detector.check_photo(await download_file(bot, job["photo"]["thumb_file_id"]), job.get("caption"))
+        if job.get("text") or job.get("caption"):
+            return duplicate_detector.check_text(job.get("text") or job.get("caption"))
+    except Exception as e:
+        logger.error(f"Yinelenen gönderi kontrolü hatası: {e}")
+    return False
+
+template_engine = TemplateEngine(bot_config["templates"], clock=lambda: datetime.now(scheduler.timezone), **bot_config.get("template_engine", {}))
+
+async def compose_caption(job: Dict, photo_bytes: Optional[memoryview], bot) -> Tuple[str, bool]:
+    """Gönderi için son başlığı üretir; (başlık, AI kullanıldı mı) döndürür."""
+    source_text = job.get("text") or job.get("caption")
+    image_ai = bool(job.get("photo")) and bot_config["ai_image_analysis_enabled"]
+    if source_text and (image_ai or bot_config["ai_text_enhancement_enabled"]):
+        # Bilinen duyuru türleri AI'ye gitmeden şablondan yazılır.
+        match = template_engine.render(source_text, get_ai_persona_prompt(bot_config.get("ai_persona", "Agresif Pazarlamacı")))
+        if match:
+            return match.caption, False
+    started = time.perf_counter()
+    if image_ai:
+        if degradation.image_ai_allowed:
+            caption = await generate_caption_from_image(job["photo"], bot, photo_bytes)
+            template_engine.observe_ai_latency(time.perf_counter() - started)
+            return caption, True
+        AI_SHED.inc(kind="image")
+    if source_text and bot_config["ai_text_enhancement_enabled"]:
+        if degradation.text_ai_allowed:
+            caption = await enhance_text_with_gemini_smarter(source_text)
+            template_engine.observe_ai_latency(time.perf_counter() - started)
+            return caption, True
+        AI_SHED.inc(kind="text")
+    final_caption = job.get("caption") or job.get("text") or ""
+    if "@KRBRZ063" not in final_caption:
+        final_caption += "\n\n@KRBRZ063 #KRBRZ"
+    return final_caption, False
+
+async def job_caption(job_id: str, job: Dict, photo_bytes: Optional[memoryview], bot) -> str:
+    """Başlığı bir kez üretip işe kaydeder; yeniden denemelerde aynı başlık kullanılır."""
+    if "final_caption" not in job:
+        with STAGE_SECONDS.time(stage="caption"):
+            job["final_caption"], ai_used = await compose_caption(job, photo_bytes, bot)
+        await outbox.save_payload(job_id, job)
+        message_type = 'album' if job["kind"] == 'album' else ('photo' if job.get("photo") else 'text')
+        stats_recorder.record(job["chat_identifier"], message_type, ai_used)
+        MESSAGES_TOTAL.inc(type=message_type)
+    return job["final_caption"]
+
+async def pending_destinations(job_id: str) -> List[str]:
+    """Bu iş için henüz gönderim yapılmamış hedefler (idempotency)."""
+    delivered = await outbox.delivered_destinations(job_id)
+    return [dest for dest in dict.fromkeys(bot_config["destination_channels"]) if dest not in delivered]
+
+async def deliver(job_id: str, destinations: List[str], send) -> Dict[str, DeliveryResult]:
+    with STAGE_SECONDS.time(stage="send"):
+        results = await fanout.dispatch(destinations, send)
+    for dest, result in results.items():
+        if result.ok:
+            await outbox.mark_delivered(job_id, dest)
+    return results
+
+async def send_first_upload(job_id: str, destinations: List[str], upload) -> Tuple[Any, Dict[str, DeliveryResult]]:
+    """Hedefleri sırayla dener ve ilk başarılı yüklemenin sonucunu döndürür.
+
+    Denenen hedefler `destinations` listesinden çıkarılır; kalanlar dönen file_id'lerle gönderilir.
+    """
+    results = {}
+    while destinations:
+        first = destinations.pop(0)
+        results.update(await deliver(job_id, [first], upload))
+        if results[first].ok:
+            return results[first].result, results
+    return None, results
+
+def raise_for_failures(results: Dict[str, DeliveryResult]) -> None:
+    failed = [dest for dest, result in results.items() if not result.ok]
+    if failed:
+        raise RuntimeError(f"{len(failed)} hedefe gönderilemedi: {', '.join(failed)}")
+
+async def forward_single(job_id: str, job: Dict, bot) -> None:
+    destinations = await pending_destinations(job_id)
+    if not destinations:
+        return
+    photo = job.get("photo")
+    photo_file_id = None
+    photo_cache_key = None
+    download_ids = []
+    if photo:
+        photo_cache_key = file_id_cache.make_key(photo["file_unique_id"], bot_config.get("watermark", {}))
+        photo_file_id = await file_id_cache.get(photo_cache_key)
+        # Tam boyutlu görsel yalnızca filigran için indirilir; AI analizi gerekirse küçük PhotoSize'ı kendisi indirir.
+        if not photo_file_id:
+            download_ids.append(photo["file_id"])
+
+    # İndirilen görsel, iş bitene kadar medya bütçesinde tutulur.
+    async with downloaded_media(bot, download_ids) as downloads:
+        photo_bytes = downloads[0] if downloads else None
+        final_caption = await job_caption(job_id, job, photo_bytes, bot)
+
+        results = {}
+        if photo and not photo_file_id:
+            # Filigran bir kez uygulanır; ilk başarılı yüklemenin file_id'si diğer hedeflerde kullanılır.
+            watermarked_photo = await apply_watermark(photo_bytes)
+            sent, results = await send_first_upload(job_id, destinations, lambda dest: bot.send_photo(chat_id=dest, photo=watermarked_photo, caption=final_caption))
+            if sent:
+                photo_file_id = sent.photo[-1].file_id
+                await file_id_cache.set(photo_cache_key, photo_file_id)
+
+    async def send_to(dest: str):
+        if job["kind"] == 'photo':
+            return await bot.send_photo(chat_id=dest, photo=photo_file_id, caption=final_caption)
+        elif job["kind"] == 'video':
+            return await bot.send_video(chat_id=dest, video=job["video_file_id"], caption=final_caption)
+        elif job["kind"] == 'text':
+            return await bot.send_message(chat_id=dest, text=final_caption)
+        else:
+            return await bot.copy_message(chat_id=dest, from_chat_id=job["chat_id"], message_id=job["message_id"])
+
+    if destinations:
+        results.update(await deliver(job_id, destinations, send_to))
+    log_delivery_results(results)
+    raise_for_failures(results)
+
+async def forward_album(job_id: str, job: Dict, bot) -> None:
+    """Bir albümü tek AI başlığı ve hedef başına tek `send_media_group` ile iletir."""
+    destinations = await pending_destinations(job_id)
+    items = job["items"]
+    if not destinations or not items:
+        return
+    wm_config = bot_config.get("watermark", {})
+    cache_keys = [file_id_cache.make_key(item["photo"]["file_unique_id"], wm_config) if item["type"] == 'photo' else None for item in items]
+    file_ids = list(await asyncio.gather(*(file_id_cache.get(key) if key else _resolved(item["video_file_id"]) for key, item in zip(cache_keys, items))))
+
+    # Yalnızca önbellekte olmayan görseller indirilir. İlk görsel önbellekteyse ve başlık için görsel analiz
+    # gerekecekse küçük PhotoSize aynı indirmeye eklenir; başlık yolu bütçe tutulurken yeniden yer istemez.
+    first_photo = next((index for index, item in enumerate(items) if item["type"] == 'photo'), None)
+    download_indexes = [index for index, (item, file_id) in enumerate(zip(items, file_ids)) if item["type"] == 'photo' and not file_id]
+    download_ids = [items[index]["photo"]["file_id"] for index in download_indexes]
+    needs_vision = (first_photo is not None and first_photo not in download_indexes and "final_caption" not in job
+                    and bot_config["ai_image_analysis_enabled"] and degradation.image_ai_allowed)
+    if needs_vision:
+        photo = items[first_photo]["photo"]
+        download_ids.append(photo.get("vision_file_id", photo["file_id"]))
+
+    def build_media(sources) -> List:
+        media = []
+        for index, (item, source) in enumerate(zip(items, sources)):
+            caption = final_caption if index == 0 else None
+            media.append(InputMediaPhoto(media=source, caption=caption) if item["type"] == 'photo' else InputMediaVideo(media=source, caption=caption))
+        return media
+
+    results = {}
+    async with downloaded_media(bot, download_ids) as downloads:
+        photo_bytes = [None] * len(items)
+        for index, data in zip(download_indexes, downloads):
+            photo_bytes[index] = data
+        caption_bytes = downloads[-1] if needs_vision else (photo_bytes[first_photo] if first_photo is not None else None)
+        final_caption = await job_caption(job_id, job, caption_bytes, bot)
+
+        watermarked = await asyncio.gather(*(apply_watermark(data) if data is not None and not file_id else _resolved()
+                                             for data, file_id in zip(photo_bytes, file_ids)))
+        if any(file_id is None for file_id in file_ids):
+            upload_media = build_media([file_id or data for file_id, data in zip(file_ids, watermarked)])
+            sent, results = await send_first_upload(job_id, destinations, lambda dest: bot.send_media_group(chat_id=dest, media=upload_media))
+            if sent:
+                for index, (sent_message, key) in enumerate(zip(sent, cache_keys)):
+                    file_ids[index] = sent_message.photo[-1].file_id if sent_message.photo else sent_message.video.file_id
+                    if key:
+                        await file_id_cache.set(key, file_ids[index])
+    if destinations and all(file_ids):
+        cached_media = build_media(file_ids)
+        results.update(await deliver(job_id, destinations, lambda dest: bot.send_media_group(chat_id=dest, media=cached_media)))
+    log_delivery_results(results)
+    raise_for_failures(results)
+
+async def process_forward_job(job_id: str, job: Dict, bot) -> None:
+    """Kuyruktan alınan bir işi çalıştırır: yineleme kontrolü → indirme → AI → filigran → gönderim."""
+    if not job.get("dedup_checked"):
+        with STAGE_SECONDS.time(stage="dedup"):
+            duplicate = await is_duplicate_job(job, bot)
+        if duplicate:
+            logger.info(f"{job['chat_identifier']} kaynağından gelen yinelenen gönderi atlandı.")
+            return
+        job["dedup_checked"] = True
+        await outbox.save_payload(job_id, job)
+    with STAGE_SECONDS.time(stage="total"):
+        if job["kind"] == 'album':
+            await forward_album(job_id, job, bot)
+        else:
+            await forward_single(job_id, job, bot)
+
+async def enqueue_album(messages: List, bot) -> None:
+    first_message = messages[0]
+    await outbox.enqueue(f"{first_message.chat.id}:album:{first_message.media_group_id}", album_job_from_messages(messages))
+
+media_group_aggregator = MediaGroupAggregator(enqueue_album, **bot_config.get("album", {}))
+
 async def forwarder(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Yalnızca işi kalıcı kuyruğa ekler; asıl iş `outbox` işçilerinde yapılır."""
     if bot_config["is_paused"]: return
     message = update.channel_post
     if not message: return
-    chat_identifier = f"@{message.chat.username}" if message.chat.username else str(message.chat.id)
-    if (chat_identifier not in bot_config["source_channels"] and str(message.chat.id) not in bot_config["source_channels"]):
+    if not config_store.is_source(source_identifier(message), str(message.chat.id)):
+        return
+    if message.media_group_id:
+        # Albüm öğeleri birlikte işlenmek üzere toplayıcıya bırakılır.
+        media_group_aggregator.add(message, context.bot)
         return
+    await outbox.enqueue(f"{message.chat.id}:{message.message_id}", job_from_message(message))
 
-    ai_used = False
-    try:
-        final_caption = ""
-        photo_bytes = None
-
-        if message.photo:
-            file = await message.photo[-1].get_file()
-            photo_bytes = await file.download_as_bytearray()
-            photo_bytes = bytes(photo_bytes)
-
-        if photo_bytes and bot_config["ai_image_analysis_enabled"]:
-            final_caption = await generate_caption_from_image(photo_bytes)
-            ai_used = True
-        elif (message.text or message.caption) and bot_config["ai_text_enhancement_enabled"]:
-            original_text = message.text or message.caption
-            final_caption = await enhance_text_with_gemini_smarter(original_text)
-            ai_used = True
-        else:
-            final_caption = message.caption or message.text or ""
-            if "@KRBRZ063" not in final_caption:
-                final_caption += "\n\n@KRBRZ063 #KRBRZ"
-
-        for dest in bot_config["destination_channels"]:
-            try:
-                if photo_bytes:
-                    watermarked_photo = await apply_watermark(photo_bytes)
-                    await context.bot.send_photo(chat_id=dest, photo=watermarked_photo, caption=final_caption)
-                elif message.video:
-                    await context.bot.send_video(chat_id=dest, video=message.video.file_id, caption=final_caption)
-                elif message.text:
-                    await context.bot.send_message(chat_id=dest, text=final_caption)
-                else:
-                    await message.copy(chat_id=dest)
-                logger.info(f"Mesaj {dest} kanalına başarıyla yönlendirildi.")
-            except Exception as e:
-                logger.error(f"{dest} kanalına yönlendirme hatası: {e}")
-    except Exception as e:
-        logger.error(f"Genel yönlendirici hatası: {e}")
-    
-    try:
-        conn = sqlite3.connect('bot_data.db')
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO message_stats (channel_id, message_type, ai_enhanced) VALUES (?, ?, ?)", 
-                       (chat_identifier, 'photo' if message.photo else 'text', ai_used))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        logger.error(f"İstatistik kaydı hatası: {e}")
 async def user_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id in bot_config.get('admin_ids', [ADMIN_USER_ID]):
+    if config_store.is_admin(update.effective_user.id):
         return
-    user_text = update.message.text
-    await update.message.reply_chat_action('typing')
-    ai_reply = await generate_user_reply(user_text)
-    await update.message.reply_text(ai_reply, parse_mode='Markdown')
+    if not update.message or not update.message.text:
+        return
+    # Yanıt arka planda üretilir; güncelleme döngüsü bu kullanıcı için bekletilmez.
+    message_coalescer.add(update.effective_user.id, update.message)
 
 @admin_only
 async def list_channels_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -492,31 +1008,105 @@ async def list_channels_command(update: Update, context: ContextTypes.DEFAULT_TY
 
 @admin_only
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT date(timestamp) as day, COUNT(*) as count FROM message_stats WHERE date(timestamp) = date('now')")
-    today_stats = cursor.fetchone()
-    cursor.execute("SELECT COUNT(*) FROM message_stats")
-    total_stats = cursor.fetchone()
-    conn.close()
-    
-    today_count = today_stats[1] if today_stats and today_stats[1] is not None else 0
-    total_count = total_stats[0] if total_stats and total_stats[0] is not None else 0
+    def read_summary(conn):
+        # Yalnızca özet tablolar okunur; ham message_stats taranmaz.
+        today = conn.execute("SELECT COALESCE(SUM(count), 0) FROM stats_daily WHERE day = date('now')").fetchone()[0]
+        total, ai_total = conn.execute("SELECT COALESCE(SUM(count), 0), COALESCE(SUM(count * ai_enhanced), 0) FROM stats_totals").fetchone()
+        trend = conn.execute("SELECT day, SUM(count) FROM stats_daily WHERE day >= date('now', '-6 days') GROUP BY day ORDER BY day").fetchall()
+        last_30 = conn.execute("SELECT COALESCE(SUM(count), 0) FROM stats_daily WHERE day >= date('now', '-29 days')").fetchone()[0]
+        channels = conn.execute("SELECT channel_id, SUM(count), SUM(count * ai_enhanced) FROM stats_daily WHERE day >= date('now', '-29 days') GROUP BY channel_id ORDER BY 2 DESC LIMIT 10").fetchall()
+        return today, total, ai_total, trend, last_30, channels
+    today_count, total_count, ai_total, trend, last_30, channels = await stats_recorder.run(read_summary)
+    ai_ratio = ai_total / total_count * 100 if total_count else 0
+    last_7 = sum(count for _, count in trend)
     
     text = f"📊 **Mesaj İstatistikleri**\n\n- **Bugün İşlenen:** `{today_count}`\n- **Toplam İşlenen:** `{total_count}`"
+    text += f"\n- **Son 7 / 30 Gün:** `{last_7}` / `{last_30}`\n- **AI Kullanım Oranı:** `%{ai_ratio:.0f}`"
+    if trend:
+        text += "\n\n📈 **7 Günlük Trend:**\n" + "\n".join(f"`{day}`: `{count}`" for day, count in trend)
+    if channels:
+        text += "\n\n📡 **Kanal Dağılımı (30 gün):**\n" + "\n".join(f"`{ch}`: `{count}` (AI: `{ai}`)" for ch, count, ai in channels)
+    text += "\n"
+    text += f"\n- **AI Önbellek:** `{ai_cache.hits}` isabet / `{ai_cache.misses}` ıska (%{ai_cache.hit_ratio * 100:.0f})"
+    text += f"\n- **AI Toplu İstek:** ort. `{text_batcher.average_batch_size:.1f}` metin/istek (geri dönüş: `{text_batcher.fallbacks}`)"
+    text += (f"\n- **Şablon:** `{len(template_engine)}` şablon / isabet `%{template_engine.hit_ratio * 100:.0f}` "
+             f"(`{template_engine.hits}`/`{template_engine.hits + template_engine.misses}`) / kazanılan süre ~`{template_engine.saved_seconds:.0f}` sn")
+    text += f"\n- **Atlanan Yinelenen Gönderi:** `{duplicate_detector.skipped}`"
+    text += f"\n- **SSS İndeksi:** `{len(faq_index)}` kayıt / `{faq_index.hits}` isabet / `{faq_index.misses}` ıska"
+    text += f"\n- **Özel Mesaj:** `{message_coalescer.coalesced}` birleştirilen / `{user_rate_limiter.limited}` hız sınırına takılan"
+    outbox_counts = await outbox.counts()
+    text += f"\n- **Gönderi Kuyruğu:** `{outbox_counts.get('pending', 0)}` bekleyen / `{outbox.in_flight}` işlenen / `{outbox_counts.get('failed', 0)}` başarısız"
+    next_runs = auto_poster.next_runs()
+    if next_runs:
+        slot, when = next_runs[0]
+        text += f"\n- **Sonraki Oto. Gönderi:** `{when:%d.%m %H:%M}` ({len(next_runs)} etkin saat)"
+    text += f"\n- **AI Yük Modu:** {degradation.level_name} (mod değişikliği: `{degradation.changes}`)"
+    if media_pipeline.running:
+        text += f"\n- **Medya Kuyruğu:** `{media_pipeline.queue_depth}/{media_pipeline.queue_size}` (işlenen: `{media_pipeline.processed}`)"
+    for health in model_router.snapshot():
+        p95 = health.p95()
+        p95_text = f"{p95:.1f}s" if p95 is not None else "-"
+        text += f"\n- **Model `{health.name}`:** devre {health.state}, p95 `{p95_text}`, hata `%{health.error_rate * 100:.0f}`"
+    budget = media_downloader.budget
+    text += f"\n- **Medya Bütçesi:** `{budget.in_use / 1048576:.1f}/{budget.max_bytes / 1048576:.0f}` MB (bekleyen indirme: `{budget.waiting}`)"
     await update.message.reply_text(text, parse_mode='Markdown')
     
 @admin_only
 async def logs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    count, level = 20, None
+    for arg in context.args or []:
+        if arg.isdigit():
+            count = max(1, min(int(arg), 100))
+        else:
+            level = arg.upper()
     try:
-        with open(LOG_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            log_content = "".join(lines[-20:])
+        lines = await asyncio.to_thread(tail_lines, LOG_FILE, count, level)
+        log_content = "\n".join(lines)[-3500:]
         if not log_content: log_content = "Log dosyası boş."
-        await update.message.reply_text(f"📝 **Son 20 Log Kaydı:**\n\n`{log_content}`", parse_mode='Markdown')
+        level_text = f" {level}" if level else ""
+        await update.message.reply_text(f"📝 **Son {count}{level_text} Log Kaydı:**\n\n`{log_content}`", parse_mode='Markdown')
     except FileNotFoundError:
         await update.message.reply_text("Log dosyası henüz oluşturulmadı.")
 
+# Telegram'ın 4096 karakter sınırının altında, Markdown'lı yanıtlar için güvenli bütçe.
+REPLY_BUDGET = 4000
+
+def join_within(parts: List[str], limit: int, separator: str = "\n") -> str:
+    """Parçaları bütün halinde birleştirir; sınır aşılırsa kalanlar atlanır ve sayısı belirtilir.
+
+    Her parçanın Markdown'ı kendi içinde kapalı olduğundan metin bir `kod` ya da **kalın** bölümün ortasında kesilmez.
+    """
+    kept, used = [], 0
+    for index, part in enumerate(parts):
+        # Atlanan parçalar notu için yer ayrılır.
+        if used + len(part) + len(separator) > limit - 40:
+            return separator.join(kept + [f"_… {len(parts) - index} satır daha gösterilmedi._"])
+        kept.append(part)
+        used += len(part) + len(separator)
+    return separator.join(kept)
+
+@admin_only
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Aşama sürelerinin p50/p95/p99 özetini ve sayaçları gösterir."""
+    sections = []
+    for metric in metrics_registry.metrics():
+        lines = []
+        if metric.type_name == "histogram":
+            for key, series in metric.series.items():
+                p50, p95, p99 = metric.percentiles(**dict(key))
+                label = ",".join(value for _, value in key) or "-"
+                lines.append(f"`{label}`: p50 `{p50 * 1000:.0f}` / p95 `{p95 * 1000:.0f}` / p99 `{p99 * 1000:.0f}` ms (n=`{series.count}`)")
+        else:
+            values = metric.collect() if metric.type_name == "gauge" else metric.values
+            for key, value in values.items():
+                label = ",".join(value for _, value in key) or "-"
+                lines.append(f"`{label}`: `{value:g}`")
+        if lines:
+            sections.extend(["", f"`{metric.name}`"] + lines)
+    header = "⏱️ **Metrikler** (son ölçümler)\n"
+    body = join_within(sections, REPLY_BUDGET - len(header)) if sections else "\n_Henüz ölçüm yok._"
+    await update.message.reply_text(header + body, parse_mode='Markdown')
+
 @admin_only
 async def test_ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
@@ -528,18 +1118,196 @@ async def test_ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     enhanced_text = await enhance_text_with_gemini_smarter(original_text)
     await update.message.reply_text(f"**Orijinal:**\n`{original_text}`\n\n**✨ AI Sonucu:**\n`{enhanced_text}`", parse_mode='Markdown')
 
+FAQ_USAGE = ("Kullanım:\n`/sss` - kayıtları listeler\n`/sss ekle <soru> | <yanıt>` - sabit kayıt ekler\n"
+             "`/sss sabitle <no>` / `/sss coz <no>` - sabitler (⏳ aday kaydı onaylar) / sabitlemeyi kaldırır\n`/sss sil <no>` - kaydı siler\n"
+             "`/sss esik <0-1>` - benzerlik eşiğini ayarlar\n`/sss dene <metin>` - en yakın kaydı gösterir")
+
+@admin_only
+async def faq_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """SSS indeksini yönetir: listeleme, ekleme, sabitleme, silme ve eşik ayarı."""
+    args = context.args or []
+    action = args[0].lower() if args else "liste"
+    rest = " ".join(args[1:])
+    if action == "liste":
+        entries = faq_index.entries()[:20]
+        # Sorulardaki Markdown karakterleri listeyi bozmasın diye atılır.
+        plain = str.maketrans("", "", "`*_[]")
+        lines = [f"{'📌' if e.pinned else ('▫️' if faq_index.servable(e) else '⏳')} `#{e.id}` "
+                 f"({e.hits} isabet{'' if faq_index.servable(e) else f', aday {e.asks}/{faq_index.min_asks}'}) {e.question[:60].translate(plain)}"
+                 for e in entries]
+        header = f"❓ **SSS İndeksi** ({len(faq_index)} kayıt, eşik `{faq_index.threshold:.2f}`)\n\n"
+        body = join_within(lines, REPLY_BUDGET - len(header) - len(FAQ_USAGE) - 2) if lines else "_Henüz kayıt yok._"
+        await update.message.reply_text(header + body + "\n\n" + FAQ_USAGE, parse_mode='Markdown')
+    elif action == "ekle" and "|" in rest:
+        question, answer = (part.strip() for part in rest.split("|", 1))
+        entry = await faq_index.add(question, answer, pinned=True)
+        reply = f"✅ `#{entry.id}` sabit kayıt olarak eklendi." if entry else "❌ Soru veya yanıt geçersiz."
+        await update.message.reply_text(reply, parse_mode='Markdown')
+    elif action in ("sabitle", "coz", "çöz", "sil") and rest.lstrip("#").isdigit():
+        entry_id = int(rest.lstrip("#"))
+        if action == "sil":
+            done = await faq_index.evict(entry_id)
+        else:
+            done = await faq_index.pin(entry_id, pinned=action == "sabitle")
+        await update.message.reply_text(f"✅ `#{entry_id}` güncellendi." if done else f"❌ `#{entry_id}` bulunamadı.", parse_mode='Markdown')
+    elif action == "esik":
+        try:
+            threshold = float(rest.replace(",", "."))
+        except ValueError:
+            threshold = -1
+        if not 0 < threshold <= 1:
+            await update.message.reply_text("❌ Eşik 0 ile 1 arasında olmalı (örn: `/sss esik 0.8`).", parse_mode='Markdown')
+            return
+        faq_index.threshold = threshold
+        bot_config.setdefault("faq_index", {})["threshold"] = threshold
+        save_config()
+        await update.message.reply_text(f"✅ SSS benzerlik eşiği `{threshold:.2f}` olarak ayarlandı.", parse_mode='Markdown')
+    elif action == "dene" and rest:
+        best = faq_index.best(rest)
+        if best is None:
+            await update.message.reply_text("Ortak kelimesi olan kayıt yok.")
+            return
+        entry, score = best
+        if score < faq_index.threshold:
+            verdict = "❌ eşiğin altında"
+        elif faq_index.servable(entry):
+            verdict = "✅ yanıtlanır"
+        else:
+            verdict = f"⏳ aday ({entry.asks}/{faq_index.min_asks} soru), henüz yanıtlanmaz"
+        await update.message.reply_text(f"#{entry.id} benzerlik {score:.2f} ({verdict})\n\nSoru: {entry.question}\nYanıt: {entry.answer}"[:4000])
+    else:
+        await update.message.reply_text(FAQ_USAGE, parse_mode='Markdown')
+
+TEMPLATE_USAGE = ("Kullanım:\n`/template` - şablonları listeler\n`/template <ad> <içerik>` - şablon ekler/değiştirir\n"
+                  "`/template anahtar <ad> <kelime1, kelime2>` - sınıflandırma kelimelerini ayarlar\n`/template sil <ad>` - şablonu siler\n"
+                  "`/template esik <0-1>` - güven eşiğini ayarlar\n`/template dene <metin>` - seçilecek şablonu ve sonucu gösterir\n\n"
+                  "Değişkenler: " + ", ".join(f"`{{{name}}}`" for name in VARIABLES))
+TEMPLATE_ACTIONS = ("liste", "sil", "anahtar", "esik", "dene")
+
+@admin_only
+async def template_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Başlık şablonlarını yönetir; içerikteki satır sonlarını korumak için ham mesaj metni ayrıştırılır."""
+    parts = update.message.text.split(maxsplit=2)
+    action = parts[1].lower() if len(parts) > 1 else "liste"
+    rest = parts[2].strip() if len(parts) > 2 else ""
+    plain = str.maketrans("", "", "`*_[]")
+    if action == "liste":
+        lines = []
+        for template in template_engine.compiled():
+            keywords = ", ".join(bot_config["templates"][template.name].get("keywords", [])) or "-"
+            lines.append(f"▫️ `{template.name}` ({keywords.translate(plain)})\n{template.text[:120].translate(plain)}")
+        header = f"📝 **Şablonlar** (güven eşiği `{template_engine.min_confidence:.2f}`)\n\n"
+        body = join_within(lines, REPLY_BUDGET - len(header) - len(TEMPLATE_USAGE) - 2, "\n\n") if lines else "_Henüz şablon yok._"
+        await update.message.reply_text(header + body + "\n\n" + TEMPLATE_USAGE, parse_mode='Markdown')
+    elif action == "sil" and rest:
+        done = template_engine.remove(rest.lower())
+        if done:
+            save_config()
+        await update.message.reply_text(f"🗑️ `{rest.lower()}` silindi." if done else "❌ Şablon bulunamadı.", parse_mode='Markdown')
+    elif action == "anahtar" and len(rest.split(maxsplit=1)) == 2:
+        name, keywords = rest.split(maxsplit=1)
+        try:
+            done = template_engine.set_keywords(name.lower(), [keyword.strip() for keyword in keywords.split(",") if keyword.strip()])
+        except re.error as e:
+            await update.message.reply_text(f"❌ Anahtar kelimeler derlenemedi: {e}")
+            return
+        if done:
+            save_config()
+        await update.message.reply_text(f"✅ `{name.lower()}` anahtar kelimeleri güncellendi." if done else "❌ Şablon bulunamadı.", parse_mode='Markdown')
+    elif action == "esik":
+        try:
+            threshold = float(rest.replace(",", "."))
+        except ValueError:
+            threshold = -1
+        if not 0 < threshold <= 1:
+            await update.message.reply_text("❌ Eşik 0 ile 1 arasında olmalı (örn: `/template esik 0.6`).", parse_mode='Markdown')
+            return
+        template_engine.min_confidence = threshold
+        bot_config.setdefault("template_engine", {})["min_confidence"] = threshold
+        save_config()
+        await update.message.reply_text(f"✅ Şablon güven eşiği `{threshold:.2f}` olarak ayarlandı.", parse_mode='Markdown')
+    elif action == "dene" and rest:
+        match = template_engine.classify(rest)
+        if match is None:
+            await update.message.reply_text("Hiçbir şablonun anahtar kelimesi eşleşmedi; başlık AI ile üretilir.")
+            return
+        values = template_engine.variables(rest, get_ai_persona_prompt(bot_config.get("ai_persona", "Agresif Pazarlamacı")))
+        missing = match.template.variables - values.keys()
+        if missing:
+            verdict = "❌ metinde eksik değişken: " + ", ".join(sorted(missing))
+        elif match.confidence < template_engine.min_confidence:
+            verdict = "❌ eşiğin altında, AI kullanılır"
+        else:
+            verdict = "✅ şablon kullanılır"
+        preview = "" if missing else "\n\n" + match.template.render(values)
+        await update.message.reply_text(f"{match.template.name}: güven {match.confidence:.2f} ({verdict}){preview}"[:4000])
+    elif action not in TEMPLATE_ACTIONS and rest:
+        try:
+            template_engine.set_template(action, rest)
+        except (ValueError, re.error) as e:
+            await update.message.reply_text(f"❌ Şablon derlenemedi: {e}")
+            return
+        save_config()
+        await update.message.reply_text(f"✅ `{action}` şablonu kaydedildi. Sınıflandırma için: `/template anahtar {action} <kelimeler>`", parse_mode='Markdown')
+    else:
+        await update.message.reply_text(TEMPLATE_USAGE, parse_mode='Markdown')
+
 # --- Botun Başlatılması ---
+scheduler = AsyncIOScheduler(timezone="Europe/Istanbul")
+auto_poster = AutoPostScheduler(scheduler, generate_auto_post_text, 'bot_data.db', **bot_config.get("auto_post", {}))
+
+IN_FLIGHT.set_function(lambda: outbox.in_flight, component="outbox")
+IN_FLIGHT.set_function(lambda: gemini_client.in_flight, component="gemini")
+IN_FLIGHT.set_function(lambda: media_pipeline.queue_depth, component="media_queue")
+IN_FLIGHT.set_function(lambda: media_group_aggregator.pending, component="pending_albums")
+IN_FLIGHT.set_function(lambda: media_downloader.budget.waiting, component="media_budget_waiting")
+IN_FLIGHT.set_function(lambda: message_coalescer.active, component="dm_replies")
+MEDIA_BYTES = metrics_registry.gauge("krbrz_media_bytes_in_use", "Medya bütçesinden ayrılmış bayt miktarı.")
+MEDIA_BYTES.set_function(lambda: media_downloader.budget.in_use)
+
+def health_info() -> Dict[str, Any]:
+    """`/health` yanıtına eklenen anlık çalışma bilgileri."""
+    return {
+        "mode": BOT_MODE,
+        "outbox_in_flight": outbox.in_flight,
+        "media_queue": media_pipeline.queue_depth,
+        "pending_albums": media_group_aggregator.pending,
+        "degradation": degradation.level_name,
+        "media_bytes_in_use": media_downloader.budget.in_use,
+    }
+
+async def on_startup(application: Application) -> None:
+    await gemini_client.start()
+    await media_downloader.start()
+    await media_pipeline.start()
+    stats_recorder.start()
+    await outbox.start(lambda job_id, job: process_forward_job(job_id, job, application.bot))
+    degradation.start()
+    migrated = [slot for slot in bot_config["auto_post_slots"] if slot.pop("migrated", False)]
+    for slot in migrated:
+        await auto_poster.seed_previous_run(slot)
+    if migrated:
+        save_config()
+    await auto_poster.start(lambda slot, text, destinations: deliver_auto_post(application.bot, slot, text, destinations),
+                            auto_post_destinations, bot_config["auto_post_slots"] if bot_config["auto_post_enabled"] else [])
+
+async def on_shutdown(application: Application) -> None:
+    await auto_poster.stop()
+    await media_group_aggregator.drain()
+    await message_coalescer.drain()
+    await degradation.stop()
+    await outbox.stop()
+    await gemini_client.close()
+    await media_downloader.close()
+    await media_pipeline.stop()
+    watermark_renderer.shutdown()
+    await asyncio.to_thread(stats_recorder.stop)
+    await config_store.close()
+
 def main():
     logger.info("🚀 KRBRZ VIP Bot başlatılıyor (Tamamen Telegram Entegre)...")
     init_database()
-    application = Application.builder().token(BOT_TOKEN).build()
-    
-    scheduler = AsyncIOScheduler(timezone="Europe/Istanbul")
-    if bot_config.get("auto_post_enabled"):
-        time_parts = bot_config.get("auto_post_time", "19:00").split(':')
-        scheduler.add_job(generate_automated_post, 'cron', hour=int(time_parts[0]), minute=int(time_parts[1]), args=[application])
-        scheduler.start()
-        logger.info(f"Otomatik gönderi saat {bot_config['auto_post_time']} için zamanlandı.")
+    application = Application.builder().token(BOT_TOKEN).post_init(on_startup).post_shutdown(on_shutdown).build()
 
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("ayarla", setup_command))
@@ -547,7 +1315,10 @@ def main():
     application.add_handler(CommandHandler("kanallar", list_channels_command))
     application.add_handler(CommandHandler("istatistik", stats_command))
     application.add_handler(CommandHandler("loglar", logs_command))
+    application.add_handler(CommandHandler("metrik", metrics_command))
     application.add_handler(CommandHandler("testai", test_ai_command))
+    application.add_handler(CommandHandler("sss", faq_command))
+    application.add_handler(CommandHandler("template", template_command))
     
     application.add_handler(CallbackQueryHandler(menu_callback_handler))
     application.add_handler(MessageHandler(filters.REPLY & filters.TEXT & ~filters.COMMAND, reply_handler))
@@ -555,9 +1326,23 @@ def main():
     application.add_handler(MessageHandler(filters.ALL & filters.ChatType.CHANNEL, forwarder))
     application.add_handler(MessageHandler(filters.ChatType.PRIVATE & ~filters.COMMAND, user_message_handler))
     
-    logger.info("✅ Bot başarıyla yapılandırıldı ve dinlemede.")
-    application.run_polling(drop_pending_updates=True)
+    mode = BOT_MODE
+    if mode == "webhook" and not WEBHOOK_URL:
+        logger.warning("BOT_MODE=webhook fakat WEBHOOK_URL tanımlı değil, polling moduna geçiliyor.")
+        mode = "polling"
+    try:
+        from webhook_server import serve
+    except ImportError as e:
+        # starlette/uvicorn kurulu değilse HTTP sunucusu olmadan klasik polling ile çalışılır.
+        logger.warning(f"HTTP sunucusu başlatılamadı ({e}), yalnızca polling kullanılacak.")
+        logger.info("✅ Bot başarıyla yapılandırıldı ve dinlemede.")
+        application.run_polling(drop_pending_updates=False)
+        return
+
+    logger.info(f"✅ Bot başarıyla yapılandırıldı ve dinlemede (mod: {mode}).")
+    # Webhook ve /health, Application ile aynı asyncio döngüsünde PORT üzerinden sunulur.
+    asyncio.run(serve(application, PORT, mode=mode, webhook_url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET, health=health_info,
+                      metrics=metrics_registry.render))
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Bellek Sınırlı Medya Tamponları
+İndirilen medya eşik altında yeniden kullanılan bir bellek tamponunda, üstünde geçici
+bir dosyada tutulur ve tüketicilere kopyalanmadan `memoryview` olarak verilir. Genel
+bir bayt bütçesi, aynı anda bellekte/diskte tutulan medya miktarını sınırlayarak yeni
+indirmelere geri basınç uygular.
+"""
+
+import asyncio
+import io
+import logging
+import mmap
+import tempfile
+from typing import List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+# Telegram dosya boyutunu bildirmezse bütçeden ayrılacak tahmini miktar.
+DEFAULT_SIZE_ESTIMATE = 2 * MB
+
+
+class MediaBudget:
+    """Aynı anda tutulan medya baytları için asenkron bütçe (bayt semaforu)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self.waiting = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    async def acquire(self, nbytes: int) -> int:
+        """Yer açılana kadar bekler ve ayrılan miktarı döndürür.
+
+        Bütçeden büyük istekler bütçe tamamen boşken tek başına çalışabilsin diye kırpılır.
+        """
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        granted = max(0, min(nbytes, self.max_bytes))
+        async with self._condition:
+            if self.in_use and self.in_use + granted > self.max_bytes:
+                self.waiting += 1
+                logger.debug(f"Medya bütçesi dolu ({self.in_use / MB:.1f} MB), indirme bekletiliyor.")
+                try:
+                    await self._condition.wait_for(lambda: not self.in_use or self.in_use + granted <= self.max_bytes)
+                finally:
+                    self.waiting -= 1
+            self.in_use += granted
+        return granted
+
+    async def release(self, nbytes: int) -> None:
+        async with self._condition:
+            self.in_use -= nbytes
+            self._condition.notify_all()
+
+
+class BufferPool:
+    """Eşik altındaki indirmeler için yeniden kullanılan `bytearray` havuzu."""
+
+    def __init__(self, max_buffers: int = 4):
+        self.max_buffers = max_buffers
+        self._free: List[bytearray] = []
+
+    def take(self, size_hint: int) -> bytearray:
+        # Kapasitesi yeten en küçük tampon seçilir; yoksa yenisi oluşturulur.
+        candidates = [buf for buf in self._free if len(buf) >= size_hint]
+        if candidates:
+            buf = min(candidates, key=len)
+            self._free.remove(buf)
+            return buf
+        return bytearray(size_hint)
+
+    def give_back(self, buf: bytearray) -> None:
+        if len(self._free) < self.max_buffers:
+            self._free.append(buf)
+
+
+class MediaBuffer:
+    """Eşiğe kadar bellekte, sonrasında geçici dosyada tutulan, yazılabilir medya tamponu."""
+
+    def __init__(self, pool: BufferPool, spool_threshold: int, size_hint: int = 0):
+        self.pool = pool
+        self.spool_threshold = spool_threshold
+        self.size = 0
+        self._memory: Optional[bytearray] = None
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._views: List[memoryview] = []
+        if size_hint > spool_threshold:
+            self._file = tempfile.TemporaryFile(prefix="krbrz_media_")
+        else:
+            self._memory = pool.take(size_hint)
+
+    @property
+    def spooled(self) -> bool:
+        return self._file is not None
+
+    def reset(self) -> None:
+        """Yeniden deneme öncesi yazılan veriyi atar."""
+        self._release_views()
+        self.size = 0
+        if self._file is not None:
+            self._file.seek(0)
+            self._file.truncate()
+
+    def write(self, data) -> int:
+        chunk = memoryview(data).cast("B")
+        if self._file is None and self.size + len(chunk) > self.spool_threshold:
+            self._spool()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            end = self.size + len(chunk)
+            if end > len(self._memory):
+                self._memory.extend(bytes(end - len(self._memory)))
+            self._memory[self.size:end] = chunk
+        self.size += len(chunk)
+        return len(chunk)
+
+    def _spool(self) -> None:
+        self._file = tempfile.TemporaryFile(prefix="krbrz_media_")
+        self._file.write(memoryview(self._memory)[:self.size])
+        self.pool.give_back(self._memory)
+        self._memory = None
+
+    def view(self) -> memoryview:
+        """Veriye kopyasız erişim; diskteki veri salt okunur `mmap` üzerinden verilir."""
+        if self._file is not None:
+            if self.size == 0:
+                view = memoryview(b"")
+            else:
+                self._file.flush()
+                if self._mmap is None:
+                    self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                view = memoryview(self._mmap)[:self.size]
+        else:
+            view = memoryview(self._memory)[:self.size]
+        self._views.append(view)
+        return view
+
+    def _release_views(self) -> None:
+        # Dağıtılan görünümler kapatılır; tampon yeniden kullanıldıktan sonra eski veri okunamaz.
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def close(self) -> None:
+        self._release_views()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._memory is not None:
+            self.pool.give_back(self._memory)
+            self._memory = None
+
+
+class MemoryViewReader(io.RawIOBase):
+    """`memoryview` üzerinde kopyasız, aranabilir okuyucu (Pillow'a dosya gibi verilir)."""
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        count = max(0, min(len(target), len(self._view) - self._position))
+        target[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+class MediaDownloader:
+    """Telegram dosyalarını parça parça `MediaBuffer`'a indirir."""
+
+    def __init__(self, budget_mb: float = 64, spool_threshold_mb: float = 8, pool_size: int = 4,
+                 chunk_size: int = 64 * 1024, timeout: float = 60.0):
+        self.budget = MediaBudget(int(budget_mb * MB))
+        self.pool = BufferPool(pool_size)
+        self.spool_threshold = int(spool_threshold_mb * MB)
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def estimate_size(file) -> int:
+        return getattr(file, "file_size", None) or DEFAULT_SIZE_ESTIMATE
+
+    def new_buffer(self, size_hint: int = 0) -> MediaBuffer:
+        return MediaBuffer(self.pool, self.spool_threshold, size_hint or 0)
+
+    async def fetch(self, file, buffer: MediaBuffer) -> None:
+        """Dosyayı tampona yazar; uzak dosyalar yanıt gövdesi bellekte biriktirilmeden akıtılır."""
+        buffer.reset()
+        file_path = getattr(file, "file_path", None) or ""
+        if file_path.startswith(("http://", "https://")):
+            if self._client is None:
+                await self.start()
+            async with self._client.stream("GET", file_path) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    buffer.write(chunk)
+        else:
+            # Yerel Bot API sunucusu gibi durumlarda PTB'nin kendi indiricisi kullanılır.
+            await file.download_to_memory(out=buffer)
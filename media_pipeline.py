@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Süreç Havuzlu Medya İşleme Hattı
+Görsel çözme, filigran ve JPEG kodlama gibi GIL'e takılan Pillow işlerini ayrı süreçlerde
+çalıştırır. Sınırlı bir giriş kuyruğu dolduğunda `submit` bekler ve böylece forwarder'a
+geri basınç uygular. Görseller mümkünse paylaşımlı bellek ile, kopyalanıp pickle
+edilmeden işçilere aktarılır.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+from watermark import watermark_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def _watermark_from_shared(shm_name: str, size: int, wm_config: Dict, quality: int) -> bytes:
+    """İşçi süreçte çalışır: görseli paylaşımlı bellekten okuyup filigranlar."""
+    # Blok ana süreçte oluşturulup orada silinir; işçi yalnızca bağlanıp kapatır.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        return watermark_bytes(shm.buf[:size], wm_config, quality)
+    finally:
+        shm.close()
+
+
+class MediaPipeline:
+    """`ProcessPoolExecutor` destekli, sınırlı kuyruklu filigran hattı."""
+
+    def __init__(self, enabled: bool = True, workers: int = 2, quality: int = 95, queue_size: int = 8,
+                 use_shared_memory: bool = True):
+        self.enabled = enabled
+        self.workers = workers
+        self.quality = quality
+        self.queue_size = queue_size
+        self.use_shared_memory = use_shared_memory
+        self.processed = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumers = []
+        self._in_progress = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def queue_depth(self) -> int:
+        """Kuyrukta bekleyen ve işlenmekte olan görsel sayısı."""
+        return (self._queue.qsize() if self._queue else 0) + self._in_progress
+
+    async def start(self) -> None:
+        if not self.enabled or self.running:
+            return
+        # Olay döngüsü ve iş parçacıkları çalışırken fork güvenli olmadığından 'spawn' kullanılır.
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        logger.info(f"Medya hattı başlatıldı ({self.workers} işçi süreç, kuyruk: {self.queue_size}).")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            future.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        logger.info("Medya hattı durduruldu.")
+
+    async def submit(self, photo_bytes, wm_config: Dict) -> bytes:
+        """Görseli kuyruğa ekler; kuyruk doluysa yer açılana kadar bekler."""
+        future = asyncio.get_running_loop().create_future()
+        if self._queue.full():
+            logger.warning(f"Medya kuyruğu dolu ({self.queue_depth}), yeni görsel bekletiliyor.")
+        await self._queue.put((photo_bytes, dict(wm_config), future))
+        return await future
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            photo_bytes, wm_config, future = await self._queue.get()
+            self._in_progress += 1
+            started = time.monotonic()
+            try:
+                result = await self._run(loop, photo_bytes, wm_config)
+                if not future.done():
+                    future.set_result(result)
+                self.processed += 1
+                logger.debug(f"Görsel {(time.monotonic() - started) * 1000:.0f} ms'de işlendi (kuyruk: {self.queue_depth}).")
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._in_progress -= 1
+                self._queue.task_done()
+
+    async def _run(self, loop, photo_bytes, wm_config: Dict) -> bytes:
+        if not self.use_shared_memory:
+            # memoryview pickle edilemediği için yalnızca bu yolda kopya alınır.
+            return await loop.run_in_executor(self._executor, watermark_bytes, bytes(photo_bytes), wm_config, self.quality)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(photo_bytes)))
+        try:
+            shm.buf[:len(photo_bytes)] = photo_bytes
+            return await loop.run_in_executor(self._executor, _watermark_from_shared, shm.name, len(photo_bytes), wm_config, self.quality)
+        finally:
+            shm.close()
+            shm.unlink()
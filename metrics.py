@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Metrikler
+Harici bağımlılık olmadan sayaç, gösterge ve histogram tutar; bunları Prometheus
+metin biçiminde (`/metrics`) ve `/metrik` komutu için yüzdelik özetler olarak sunar.
+Tüm ölçümler olay döngüsünde yapıldığından kilit kullanılmaz.
+"""
+
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, object]) -> LabelKey:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Beklenen etiketler {list(labelnames)}, gelen {sorted(labels)}")
+    return tuple((name, str(labels[name])) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Yalnızca artan sayaç."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self.values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Gauge:
+    """Anlık değer; `set_function` ile değer okuma anında hesaplanabilir."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[LabelKey, float] = {}
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self.values[_label_key(self.labelnames, labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, func: Callable[[], float], **labels) -> None:
+        self._functions[_label_key(self.labelnames, labels)] = func
+
+    def collect(self) -> Dict[LabelKey, float]:
+        current = dict(self.values)
+        for key, func in self._functions.items():
+            try:
+                current[key] = float(func())
+            except Exception:
+                current[key] = float("nan")
+        return current
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self.collect().items():
+            yield f"{self.name}{_format_labels(key)} {'NaN' if math.isnan(value) else _format_value(value)}"
+
+
+class _HistogramSeries:
+    __slots__ = ("bucket_counts", "count", "total", "recent")
+
+    def __init__(self, bucket_count: int, window: int):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+
+class Histogram:
+    """Kova sayımları (Prometheus için) ve yüzdelikler için son `window` ölçümü tutan histogram."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = 2048):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.window = window
+        self.series: Dict[LabelKey, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = _HistogramSeries(len(self.buckets), self.window)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series.bucket_counts[index] += 1
+                break
+        series.count += 1
+        series.total += value
+        series.recent.append(value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """`with` bloğunun süresini (hata olsa bile) ölçer; `await` içeren bloklarda da kullanılabilir."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def percentiles(self, quantiles: Sequence[float] = (0.5, 0.95, 0.99), **labels) -> Optional[List[float]]:
+        series = self.series.get(_label_key(self.labelnames, labels))
+        if series is None or not series.recent:
+            return None
+        ordered = sorted(series.recent)
+        return [ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))] for q in quantiles]
+
+    def samples(self) -> Iterator[str]:
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.bucket_counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series.count}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(series.total)}"
+            yield f"{self.name}_count{_format_labels(key)} {series.count}"
+
+
+class MetricsRegistry:
+    """Metrikleri adıyla saklar; aynı ad ikinci kez istenirse mevcut nesne döner."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"{name} metriği farklı türde zaten tanımlı.")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, **kwargs)
+
+    def metrics(self) -> List[object]:
+        return list(self._metrics.values())
+
+    def render(self) -> str:
+        """Tüm metrikleri Prometheus metin biçiminde (0.0.4) döndürür."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Modüller kendi metriklerini bu ortak kayıt üzerinde tanımlar.
+registry = MetricsRegistry()
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Model Yönlendirici
+Her Gemini modeli için son isteklerin gecikmesini ve hata oranını izler. Hata oranı
+eşiği aşan modelin devre kesicisi açılır ve istekler bekleme süresi boyunca diğer
+modele yönlendirilir; süre dolunca tek bir deneme isteğiyle model yeniden sınanır.
+Yavaş kalan isteğe modelin p95 gecikmesinden sonra yedek (hedge) bir istek eşlik
+eder ve her çağrının toplam bir süre sınırı (deadline) vardır. Yalnızca zaman aşımı, 5xx
+ve 429 hataları modelin hatası sayılır; reddedilen (4xx) ya da engellenen istekler sağlık
+durumunu değiştirmez.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Sequence
+
+from gemini_client import GeminiRequestError, GeminiStreamError
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+ROUTER_CALLS = registry.counter("krbrz_model_calls_total", "Model yönlendiricinin yaptığı çağrılar.", ["model", "outcome"])
+ROUTER_STATE = registry.gauge("krbrz_model_circuit_state", "Devre kesici durumu (0 kapalı, 1 yarı açık, 2 açık).", ["model"])
+HEDGES = registry.counter("krbrz_model_hedges_total", "Gönderilen ve kazanan yedek (hedge) istekler.", ["result"])
+DEADLINES = registry.counter("krbrz_model_deadline_exceeded_total", "Süre sınırı aşıldığı için yanıtsız kalan çağrılar.")
+
+CLOSED, HALF_OPEN, OPEN = "kapalı", "yarı açık", "açık"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class ModelHealth:
+    """Tek bir modelin kayan penceredeki sonuçları ve devre kesici durumu."""
+
+    def __init__(self, name: str, window: int = 50, min_requests: int = 4, error_threshold: float = 0.5,
+                 cooldown: float = 30.0, max_cooldown: float = 300.0):
+        self.name = name
+        self.min_requests = min_requests
+        self.error_threshold = error_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def available(self) -> bool:
+        """Açık devrede bekleme süresi dolduysa yarı açığa geçer ve yalnızca bir deneme isteğine izin verir."""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN:
+            return not self._probing
+        return self.state == CLOSED
+
+    def begin(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probing = True
+
+    def abandon(self) -> None:
+        """Sonuçlanmadan iptal edilen deneme isteği; bir sonraki istek yeniden deneme yapabilir."""
+        self._probing = False
+
+    def record(self, ok: bool, latency: float) -> None:
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+        if self.state == HALF_OPEN:
+            if ok:
+                logger.info(f"{self.name} modeli yeniden sağlıklı, devre kapatıldı.")
+                self.state = CLOSED
+                self.cooldown = self.base_cooldown
+                self.outcomes.clear()
+            else:
+                # Deneme başarısızsa bekleme süresi ikiye katlanarak devre yeniden açılır.
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._open()
+            self._probing = False
+        elif self.state == CLOSED and len(self.outcomes) >= self.min_requests and self.error_rate >= self.error_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(f"{self.name} modeli bozuk (hata oranı %{self.error_rate * 100:.0f}), devre {self.cooldown:.0f} saniye açık.")
+
+
+class ModelRouter:
+    """İstenen modeli öncelikli, diğerlerini yedek olarak kullanan sağlık farkındalıklı yönlendirici."""
+
+    def __init__(self, client, models: Sequence[str] = ("gemini-1.5-flash-latest", "gemini-1.5-pro-latest"),
+                 deadline: float = 20.0, attempt_retries: int = 2, hedge: bool = True, hedge_min_delay: float = 2.0,
+                 hedge_max_delay: float = 6.0,
+                 window: int = 50, min_requests: int = 4, error_threshold: float = 0.5, cooldown: float = 30.0):
+        self.client = client
+        self.models = list(models)
+        self.deadline = deadline
+        self.attempt_retries = attempt_retries
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self._health_options = dict(window=window, min_requests=min_requests, error_threshold=error_threshold, cooldown=cooldown)
+        self._health: Dict[str, ModelHealth] = {}
+        for model in self.models:
+            self.health(model)
+
+    def health(self, model: str) -> ModelHealth:
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = ModelHealth(model, **self._health_options)
+            ROUTER_STATE.set_function(lambda: STATE_VALUES[health.state], model=model)
+        return health
+
+    def snapshot(self) -> List[ModelHealth]:
+        return list(self._health.values())
+
+    def candidates(self, primary: str) -> List[str]:
+        """Önce istenen model, sonra diğerleri; devresi açık olanlar atlanır."""
+        ordered = [primary] + [model for model in self.models if model != primary]
+        return [model for model in ordered if self.health(model).available()]
+
+    def record(self, model: str, ok: bool, latency: float) -> None:
+        """Yönlendirici dışında yapılan (örn. akışlı) çağrıların sonucunu da sağlık durumuna işler."""
+        self.health(model).record(ok, latency)
+        ROUTER_CALLS.inc(model=model, outcome="ok" if ok else "error")
+
+    def reject(self, model: str, reason: str) -> None:
+        """Reddedilen ya da engellenen istek: ayrı sayılır, modelin sağlık durumu değişmez."""
+        self.health(model).abandon()
+        ROUTER_CALLS.inc(model=model, outcome=reason)
+
+    async def _attempt(self, model: str, payload: Dict, inline_data) -> Dict:
+        health = self.health(model)
+        health.begin()
+        started = time.perf_counter()
+        try:
+            result = await self.client.generate_content(model, payload, inline_data, max_retries=self.attempt_retries)
+        except asyncio.CancelledError:
+            # İptal edilen (yedeğe kaybeden ya da süresi dolan) istek modelin hatası sayılmaz.
+            health.abandon()
+            raise
+        except GeminiRequestError as e:
+            logger.warning(f"{model} isteği reddetti (HTTP {e.status_code}), model sağlıklı sayılıyor.")
+            self.reject(model, "rejected")
+            raise
+        except Exception as e:
+            logger.error(f"{model} isteğinde beklenmedik hata: {e}")
+            result = {}
+        if result and not result.get("candidates") and result.get("promptFeedback", {}).get("blockReason"):
+            # Engellenen istem modelin hatası değildir; yanıt olduğu gibi döner, başka modelde denenmez.
+            self.reject(model, "blocked")
+            return result
+        self.record(model, bool(result), time.perf_counter() - started)
+        return result
+
+    async def stream_generate_content(self, primary: str, payload: Dict) -> AsyncIterator[str]:
+        """Sağlıklı ilk modelden akışlı yanıt; süre sınırı dolarsa ya da model yoksa `GeminiStreamError` fırlatır.
+
+        Akışta yedek istek ve model değiştirme yapılmaz; çağıran akışsız yola döner.
+        """
+        models = self.candidates(primary)
+        if not models:
+            raise GeminiStreamError("Kullanılabilir AI modeli yok.")
+        model = models[0]
+        health = self.health(model)
+        health.begin()
+        started = time.perf_counter()
+        deadline_at = time.monotonic() + self.deadline
+        stream = self.client.stream_generate_content(model, payload)
+        ok = False
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline_at - time.monotonic()))
+                except StopAsyncIteration:
+                    ok = True
+                    return
+                except asyncio.TimeoutError:
+                    DEADLINES.inc()
+                    raise GeminiStreamError(f"{self.deadline:.0f} saniyelik süre sınırı aşıldı.")
+                yield chunk
+        except GeminiRequestError:
+            self.reject(model, "rejected")
+            ok = None
+            raise
+        except GeminiStreamError:
+            raise
+        except BaseException:
+            # Tüketici akışı bıraktıysa (iptal/kapanış) model suçlanmaz.
+            health.abandon()
+            ok = None
+            raise
+        finally:
+            await stream.aclose()
+            if ok is not None:
+                self.record(model, ok, time.perf_counter() - started)
+
+    def _hedge_delay(self, model: str) -> float:
+        # Kuyruk ağırlaşıp p95 de yavaşladığında yedek istek işe yaramaz hale gelmesin diye üst sınır uygulanır.
+        p95 = self.health(model).p95()
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, p95 if p95 is not None else 0.0))
+
+    async def _race(self, models: List[str], payload: Dict, inline_data, deadline_at: float, tried: set) -> Dict:
+        """İlk modele istek atar; p95 süresinde yanıt gelmezse sıradaki modele yedek istek gönderir.
+
+        Aynı modele yedek istek gönderilmez; tek aday kaldıysa yalnızca süre sınırı beklenir.
+        """
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._attempt(models[0], payload, inline_data))
+        tried.add(models[0])
+        task_models = {primary: models[0]}
+        pending = {primary}
+        try:
+            if self.hedge and len(models) > 1:
+                done, pending = await asyncio.wait(pending, timeout=min(self._hedge_delay(models[0]), max(0.0, deadline_at - time.monotonic())))
+                if not done and time.monotonic() < deadline_at:
+                    backup = models[1]
+                    HEDGES.inc(result="sent")
+                    logger.info(f"{models[0]} yavaş, {backup} modeline yedek istek gönderiliyor.")
+                    tried.add(backup)
+                    hedge = asyncio.ensure_future(self._attempt(backup, payload, inline_data))
+                    task_models[hedge] = backup
+                    pending.add(hedge)
+                pending |= done
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline_at - time.monotonic()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Süre sınırına kadar yanıt vermeyen model hatalı sayılır; yedeğe kaybeden istekler sayılmaz.
+                    for task in pending:
+                        self.record(task_models[task], False, time.perf_counter() - started)
+                    return {}
+                for task in done:
+                    result = task.result()
+                    if result:
+                        if task is not primary:
+                            HEDGES.inc(result="won")
+                        return result
+            return {}
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate_content(self, primary: str, payload: Dict, inline_data=None) -> Dict:
+        """Süre sınırı içinde sağlıklı modellerden yanıt alır; alınamazsa boş sözlük döner."""
+        deadline_at = time.monotonic() + self.deadline
+        tried = set()
+        while True:
+            if time.monotonic() >= deadline_at:
+                DEADLINES.inc()
+                logger.error(f"AI isteği {self.deadline:.0f} saniyelik süre sınırını aştı, varsayılan metne dönülüyor.")
+                return {}
+            models = [model for model in self.candidates(primary) if model not in tried]
+            if not models:
+                logger.error("Sağlıklı hiçbir AI modelinden yanıt alınamadı, varsayılan metne dönülüyor.")
+                return {}
+            try:
+                result = await self._race(models, payload, inline_data, deadline_at, tried)
+            except GeminiRequestError:
+                # Reddedilen istek başka modelde de reddedilir; yedeğe geçilmez.
+                return {}
+            if result:
+                return result
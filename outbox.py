@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Kalıcı Gönderi Kuyruğu (Outbox)
+Telegram güncelleme işleyicisi yalnızca bir iş kaydı oluşturur; indirme → AI → filigran
+→ gönderim zinciri, `bot_data.db` içindeki bu kayıtları işleyen eşzamansız işçiler
+tarafından yürütülür. Başarısız işler üstel geri çekilmeyle yeniden denenir, her
+(iş, hedef) çifti için gönderim kaydı tutulur ve yarım kalan işler açılışta sürdürülür.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+async def with_retries(func: Callable[[], Awaitable[Any]], attempts: int = 3, base_delay: float = 1.0) -> Any:
+    """Tek bir adımı (ör. dosya indirme) jitter'lı üstel geri çekilmeyle tekrar dener."""
+    for attempt in range(attempts):
+        try:
+            return await func()
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = random.uniform(0, base_delay * (2 ** attempt))
+            logger.warning(f"Adım başarısız ({e}), {delay:.1f} saniye sonra tekrar denenecek...")
+            await asyncio.sleep(delay)
+
+
+class Outbox:
+    """SQLite destekli iş kuyruğu ve onu işleyen işçi havuzu."""
+
+    def __init__(self, db_path: str = 'bot_data.db', workers: int = 3, max_attempts: int = 5, base_delay: float = 5.0,
+                 max_delay: float = 300.0, poll_interval: float = 5.0, keep_done_days: int = 7):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.keep_done_days = keep_done_days
+        self.in_flight = 0
+        self._handler: Optional[Callable[[str, Dict], Awaitable[None]]] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._claim_lock: Optional[asyncio.Lock] = None
+        self._running = False
+
+    def ensure_schema(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS outbox_jobs (job_id TEXT PRIMARY KEY, payload TEXT NOT NULL, status TEXT NOT NULL DEFAULT \'pending\', attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, last_error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_jobs_ready ON outbox_jobs (status, next_attempt_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS outbox_deliveries (job_id TEXT NOT NULL, destination TEXT NOT NULL, result_ref TEXT, delivered_at REAL NOT NULL, PRIMARY KEY (job_id, destination)) WITHOUT ROWID')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _execute(self, sql: str, params: Tuple = (), fetch: bool = False):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(sql, params)
+            rows = cursor.fetchall() if fetch else cursor.rowcount
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    async def _db(self, sql: str, params: Tuple = (), fetch: bool = False):
+        return await asyncio.to_thread(self._execute, sql, params, fetch)
+
+    async def enqueue(self, job_id: str, payload: Dict) -> bool:
+        """İşi kuyruğa ekler. Aynı `job_id` zaten varsa (ör. tekrar gelen güncelleme) eklenmez."""
+        now = time.time()
+        added = await self._db("INSERT OR IGNORE INTO outbox_jobs (job_id, payload, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                               (job_id, json.dumps(payload, ensure_ascii=False), now, now, now))
+        if added and self._wakeup:
+            self._wakeup.set()
+        return bool(added)
+
+    async def save_payload(self, job_id: str, payload: Dict) -> None:
+        """Ara sonuçları (ör. üretilen başlık) saklar; yeniden denemede tekrar hesaplanmaz."""
+        await self._db("UPDATE outbox_jobs SET payload = ?, updated_at = ? WHERE job_id = ?", (json.dumps(payload, ensure_ascii=False), time.time(), job_id))
+
+    async def delivered_destinations(self, job_id: str) -> Dict[str, Optional[str]]:
+        rows = await self._db("SELECT destination, result_ref FROM outbox_deliveries WHERE job_id = ?", (job_id,), fetch=True)
+        return dict(rows)
+
+    async def mark_delivered(self, job_id: str, destination: str, result_ref: Optional[str] = None) -> None:
+        await self._db("INSERT OR IGNORE INTO outbox_deliveries (job_id, destination, result_ref, delivered_at) VALUES (?, ?, ?, ?)",
+                       (job_id, destination, result_ref, time.time()))
+
+    async def counts(self) -> Dict[str, int]:
+        rows = await self._db("SELECT status, COUNT(*) FROM outbox_jobs GROUP BY status", fetch=True)
+        return dict(rows)
+
+    async def backlog(self) -> int:
+        """Vakti gelmiş bekleyen ve işlenmekte olan iş sayısı (ileri tarihli yeniden denemeler hariç)."""
+        rows = await self._db("SELECT COUNT(*) FROM outbox_jobs WHERE status = 'processing' OR (status = 'pending' AND next_attempt_at <= ?)",
+                              (time.time(),), fetch=True)
+        return rows[0][0]
+
+    async def start(self, handler: Callable[[str, Dict], Awaitable[None]]) -> None:
+        if self._running:
+            return
+        self._handler = handler
+        self._wakeup = asyncio.Event()
+        self._claim_lock = asyncio.Lock()
+        # Önceki çalışmada yarıda kalan işler yeniden kuyruğa alınır.
+        resumed = await self._db("UPDATE outbox_jobs SET status = 'pending', updated_at = ? WHERE status = 'processing'", (time.time(),))
+        await self._db("DELETE FROM outbox_deliveries WHERE job_id IN (SELECT job_id FROM outbox_jobs WHERE status = 'done' AND updated_at < ?)",
+                       (time.time() - self.keep_done_days * 86400,))
+        await self._db("DELETE FROM outbox_jobs WHERE status = 'done' AND updated_at < ?", (time.time() - self.keep_done_days * 86400,))
+        self._running = True
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Gönderi kuyruğu başlatıldı ({self.workers} işçi, sürdürülen iş: {resumed}).")
+
+    async def stop(self, timeout: float = 20.0) -> None:
+        if not self._running:
+            return
+        self._running = False
+        self._wakeup.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Gönderi kuyruğu durduruldu.")
+
+    def _claim_sync(self) -> Tuple[Optional[Tuple[str, Dict, int]], Optional[float]]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            now = time.time()
+            row = conn.execute("SELECT job_id, payload, attempts FROM outbox_jobs WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT 1", (now,)).fetchone()
+            if row is None:
+                next_at = conn.execute("SELECT MIN(next_attempt_at) FROM outbox_jobs WHERE status = 'pending'").fetchone()[0]
+                return None, next_at
+            conn.execute("UPDATE outbox_jobs SET status = 'processing', updated_at = ? WHERE job_id = ?", (now, row[0]))
+            conn.commit()
+            return (row[0], json.loads(row[1]), row[2]), None
+        finally:
+            conn.close()
+
+    async def _worker(self, index: int) -> None:
+        while self._running:
+            async with self._claim_lock:
+                job, next_at = await asyncio.to_thread(self._claim_sync)
+            if job is None:
+                self._wakeup.clear()
+                wait = self.poll_interval if next_at is None else max(0.05, min(self.poll_interval, next_at - time.time()))
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job_id, payload, attempts = job
+            self.in_flight += 1
+            try:
+                await self._handler(job_id, payload)
+                await self._db("UPDATE outbox_jobs SET status = 'done', attempts = ?, last_error = NULL, updated_at = ? WHERE job_id = ?",
+                               (attempts + 1, time.time(), job_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self._schedule_retry(job_id, attempts + 1, str(e))
+            finally:
+                self.in_flight -= 1
+
+    async def _schedule_retry(self, job_id: str, attempts: int, error: str) -> None:
+        if attempts >= self.max_attempts:
+            await self._db("UPDATE outbox_jobs SET status = 'failed', attempts = ?, last_error = ?, updated_at = ? WHERE job_id = ?",
+                           (attempts, error, time.time(), job_id))
+            logger.error(f"Gönderi işi {job_id} {attempts} denemeden sonra başarısız oldu: {error}")
+            return
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1))) * random.uniform(0.5, 1.0)
+        await self._db("UPDATE outbox_jobs SET status = 'pending', attempts = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE job_id = ?",
+                       (attempts, error, time.time() + delay, time.time(), job_id))
+        logger.warning(f"Gönderi işi {job_id} başarısız ({error}), {delay:.0f} saniye sonra tekrar denenecek.")
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Aşamalı Yanıt Mesajı
+Akan AI yanıtının ilk parçası gelir gelmez bir mesaj gönderir, ardından biriken metinle
+bu mesajı hız sınırına uygun aralıklarla düzenler. Son düzenleme Markdown ile yapılır;
+Markdown çözümlenemezse düz metne dönülür.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from telegram.error import BadRequest, RetryAfter
+
+from fanout import RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+# Telegram'ın tek mesaj için izin verdiği en uzun metin.
+MESSAGE_LIMIT = 4096
+
+
+class ProgressiveReply:
+    """Bir kullanıcı mesajına verilen, parça parça büyüyen yanıt."""
+
+    def __init__(self, message, edit_interval: float = 1.0, min_chars: int = 20, cursor: str = " ▌", max_retries: int = 3):
+        self.message = message
+        self.max_retries = max_retries
+        self.edit_interval = edit_interval
+        self.min_chars = min_chars
+        self.cursor = cursor
+        self.text = ""
+        self.sent = None
+        self.edits = 0
+        self._shown = ""
+        self._next_edit_at = 0.0
+
+    @property
+    def started(self) -> bool:
+        return self.sent is not None
+
+    async def append(self, chunk: str) -> None:
+        """Parçayı ekler; ilk parçada mesajı gönderir, sonrakilerde gerekiyorsa düzenler."""
+        self.text += chunk
+        if time.monotonic() < self._next_edit_at:
+            return
+        if self.sent is None:
+            await self._start(self._preview())
+            return
+        if len(self.text) - len(self._shown) < self.min_chars:
+            return
+        await self._edit(self._preview())
+
+    async def _start(self, text: str) -> None:
+        """İlk mesajı gönderir; hata olursa mesaj sonraki parçada ya da `finish` içinde yeniden denenir."""
+        try:
+            self.sent = await self.message.reply_text(text)
+            self._shown = text
+        except RetryAfter as e:
+            RATE_LIMITED.inc(service="telegram")
+            self._next_edit_at = time.monotonic() + float(e.retry_after)
+            return
+        except BadRequest as e:
+            logger.warning(f"Ara yanıt gönderilemedi, atlanıyor: {e}")
+        self._next_edit_at = time.monotonic() + self.edit_interval
+
+    def _preview(self) -> str:
+        return self.text[:MESSAGE_LIMIT - len(self.cursor)] + self.cursor
+
+    async def _edit(self, text: str) -> None:
+        try:
+            await self.sent.edit_text(text)
+            self._shown = text
+            self.edits += 1
+        except RetryAfter as e:
+            # Ara düzenlemeler atlanır; bir sonraki düzenleme bekleme süresinden sonra yapılır.
+            RATE_LIMITED.inc(service="telegram")
+            self._next_edit_at = time.monotonic() + float(e.retry_after)
+            return
+        except BadRequest as e:
+            # Ara düzenleme hataları yanıtı bozmaz; son metni `finish` yazar.
+            if "not modified" not in str(e).lower():
+                logger.warning(f"Ara yanıt düzenlemesi atlandı: {e}")
+        self._next_edit_at = time.monotonic() + self.edit_interval
+
+    async def finish(self, final_text: str, parse_mode: Optional[str] = "Markdown") -> None:
+        """Son metni (varsa Markdown ile) yazar; uzun metnin devamı ayrı mesajlarla gönderilir."""
+        parts = [final_text[i:i + MESSAGE_LIMIT] for i in range(0, len(final_text), MESSAGE_LIMIT)] or [""]
+        first, rest = parts[0], parts[1:]
+        if self.sent is None:
+            self.sent = await self._reply(first, parse_mode)
+        else:
+            await self._with_retries(lambda: self._final_edit(first, parse_mode))
+        for part in rest:
+            await self._reply(part, parse_mode)
+        self._shown = final_text
+
+    async def _with_retries(self, send):
+        """Flood limitinde bekleyip en fazla `max_retries` kez yeniden dener; son denemede hata yükselir."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await send()
+            except RetryAfter as e:
+                RATE_LIMITED.inc(service="telegram")
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Yanıt için flood limiti: {e.retry_after} saniye bekleniyor.")
+                await asyncio.sleep(float(e.retry_after))
+
+    async def _final_edit(self, text: str, parse_mode: Optional[str]) -> None:
+        try:
+            await self.sent.edit_text(text, parse_mode=parse_mode)
+            self.edits += 1
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return
+            if not parse_mode:
+                raise
+            logger.warning(f"Yanıt Markdown olarak işlenemedi, düz metin kullanılıyor: {e}")
+            await self.sent.edit_text(text)
+
+    async def _reply(self, text: str, parse_mode: Optional[str]):
+        return await self._with_retries(lambda: self._send_reply(text, parse_mode))
+
+    async def _send_reply(self, text: str, parse_mode: Optional[str]):
+        try:
+            return await self.message.reply_text(text, parse_mode=parse_mode)
+        except BadRequest as e:
+            if not parse_mode:
+                raise
+            logger.warning(f"Yanıt Markdown olarak işlenemedi, düz metin kullanılıyor: {e}")
+            return await self.message.reply_text(text)
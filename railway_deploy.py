@@ -31,7 +31,9 @@ def check_requirements():
             'httpx',
             'Pillow',
             'Flask',
-            'google-generativeai'
+            'google-generativeai',
+            'starlette',
+            'uvicorn'
         ]
         
         missing = []
@@ -55,10 +57,9 @@ def check_main_py():
         content = f.read()
         
         checks = [
-            ('Flask app tanımı', 'app = flask_app'),
             ('PORT environment variable', 'os.environ.get(\'PORT\''),
-            ('Flask run config', 'flask_app.run(host=\'0.0.0.0\''),
-            ('Threading import', 'from threading import Thread')
+            ('HTTP sunucusu (webhook + /health)', 'from webhook_server import serve'),
+            ('Güncelleme modu seçimi', 'os.environ.get(\'BOT_MODE\'')
         ]
         
         all_good = True
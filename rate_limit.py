@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Hız Sınırlama Yardımcıları
+Gemini istemcisi ve Telegram dağıtıcısı tarafından paylaşılan token-bucket uygulaması ve
+özel mesajlar için kullanıcı başına, beklemeden karar veren sınırlayıcı.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Saniyede `rate` jeton üreten, en fazla `capacity` jeton biriktiren basit sınırlayıcı."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def pause(self, seconds: float) -> None:
+        """Sunucu `Retry-After` döndürdüğünde tüm istekleri bu süre kadar bekletir."""
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0
+        self.updated_at = now
+
+    def try_acquire(self) -> bool:
+        """Jeton varsa hemen alır; yoksa beklemeden False döner."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return False
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    # Bekleme süresi dolunca en az bir isteğe hemen izin verilir.
+                    self._refill(time.monotonic())
+                    self.tokens = max(self.tokens, 1)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class UserRateLimiter:
+    """Kullanıcı başına token-bucket; en uzun süredir görülmeyen kullanıcılar `max_users` aşılınca unutulur."""
+
+    def __init__(self, per_minute: float = 6, burst: int = 3, notice_interval: float = 60.0, max_users: int = 10000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.notice_interval = notice_interval
+        self.max_users = max_users
+        self.limited = 0
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._noticed_at = {}
+
+    def allow(self, user_id: int) -> bool:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(rate=self.rate, capacity=self.burst)
+            while len(self._buckets) > self.max_users:
+                forgotten, _ = self._buckets.popitem(last=False)
+                self._noticed_at.pop(forgotten, None)
+        self._buckets.move_to_end(user_id)
+        if bucket.try_acquire():
+            return True
+        self.limited += 1
+        return False
+
+    def should_notify(self, user_id: int) -> bool:
+        """Sınırlanan kullanıcıya uyarı `notice_interval` içinde en fazla bir kez gönderilir."""
+        now = time.monotonic()
+        if now - self._noticed_at.get(user_id, float("-inf")) < self.notice_interval:
+            return False
+        self._noticed_at[user_id] = now
+        return True
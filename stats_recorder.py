@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Arka Planda Toplu Yazan İstatistik Kaydedici
+Tek bir WAL modlu SQLite bağlantısına sahip özel bir iş parçacığı çalıştırır. Mesaj
+akışındaki kodlar olayları bellek içi kuyruğa bırakır ve disk G/Ç'sini asla beklemez;
+kaydedici olayları boyut veya süre dolduğunda tek bir işlemde (transaction) yazar.
+Aynı işlemde gün/kanal/tür/AI bazlı özet tabloları da artımlı olarak güncellenir,
+böylece `/istatistik` sorguları ham tablo büyüdükçe yavaşlamaz.
+"""
+
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class StatsRecorder:
+    """`message_stats` satırlarını toplu halde yazan, sorguları da aynı bağlantıdan yanıtlayan kaydedici."""
+
+    def __init__(self, db_path: str = 'bot_data.db', batch_size: int = 100, flush_interval: float = 2.0,
+                 retention_days: int = 30, compaction_interval: float = 6 * 3600):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.compaction_interval = compaction_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: List[Tuple] = []
+
+    def ensure_schema(self) -> None:
+        """Özet tablolarını ve indeksleri oluşturur; özetler boşsa ham tablodan bir kez doldurur."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_message_stats_timestamp ON message_stats (timestamp)')
+            conn.execute('CREATE TABLE IF NOT EXISTS stats_daily (day TEXT NOT NULL, channel_id TEXT NOT NULL, message_type TEXT NOT NULL, ai_enhanced INTEGER NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (day, channel_id, message_type, ai_enhanced)) WITHOUT ROWID')
+            # Gün aralıklı sorgular (kanal dağılımı dahil) `day` ile başlayan birincil anahtarı tarar; ek indeks
+            # eklenmez, yoksa planlayıcı tüm geçmişi okuyan kanal indeksini seçebilir.
+            conn.execute('CREATE TABLE IF NOT EXISTS stats_totals (channel_id TEXT NOT NULL, message_type TEXT NOT NULL, ai_enhanced INTEGER NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (channel_id, message_type, ai_enhanced)) WITHOUT ROWID')
+            if conn.execute("SELECT 1 FROM stats_totals LIMIT 1").fetchone() is None:
+                conn.execute("INSERT INTO stats_daily SELECT date(timestamp), channel_id, message_type, ai_enhanced, COUNT(*) FROM message_stats GROUP BY 1, 2, 3, 4")
+                conn.execute("INSERT INTO stats_totals SELECT channel_id, message_type, ai_enhanced, COUNT(*) FROM message_stats GROUP BY 1, 2, 3")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="stats-recorder", daemon=True)
+        self._thread.start()
+        logger.info("İstatistik kaydedici başlatıldı.")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Bekleyen tüm olayları yazar ve iş parçacığını kapatır."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"İstatistik kaydedici durduruldu ({self.written} kayıt yazıldı).")
+
+    def record(self, channel_id: str, message_type: str, ai_enhanced: bool) -> None:
+        """Olayı kuyruğa bırakır; çağıran hiçbir zaman diske yazılmasını beklemez."""
+        self._queue.put_nowait(("event", (channel_id, message_type, bool(ai_enhanced), time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()))))
+
+    async def run(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """`func(conn)` fonksiyonunu kaydedicinin bağlantısında çalıştırıp sonucunu bekler."""
+        future: Future = Future()
+        self._queue.put_nowait(("call", func, future))
+        return await asyncio.wrap_future(future)
+
+    async def query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _flush(self, conn: sqlite3.Connection) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            with conn:
+                self._write_batch(conn, batch)
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            self.dropped += len(batch)
+            logger.error(f"İstatistik kaydı hatası ({len(batch)} kayıt): {e}")
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple]) -> None:
+        conn.executemany("INSERT INTO message_stats (channel_id, message_type, ai_enhanced, timestamp) VALUES (?, ?, ?, ?)", batch)
+        daily = Counter((timestamp[:10], channel_id, message_type, int(ai)) for channel_id, message_type, ai, timestamp in batch)
+        totals = Counter((channel_id, message_type, int(ai)) for channel_id, message_type, ai, _ in batch)
+        conn.executemany("INSERT INTO stats_daily (day, channel_id, message_type, ai_enhanced, count) VALUES (?, ?, ?, ?, ?) "
+                         "ON CONFLICT (day, channel_id, message_type, ai_enhanced) DO UPDATE SET count = count + excluded.count",
+                         [(*key, count) for key, count in daily.items()])
+        conn.executemany("INSERT INTO stats_totals (channel_id, message_type, ai_enhanced, count) VALUES (?, ?, ?, ?) "
+                         "ON CONFLICT (channel_id, message_type, ai_enhanced) DO UPDATE SET count = count + excluded.count",
+                         [(*key, count) for key, count in totals.items()])
+
+    def _compact(self, conn: sqlite3.Connection) -> None:
+        """Saklama süresini aşan ham satırları siler; özet tablolar korunur."""
+        try:
+            with conn:
+                deleted = conn.execute("DELETE FROM message_stats WHERE timestamp < datetime('now', ?)", (f"-{self.retention_days} days",)).rowcount
+            if deleted:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                logger.info(f"İstatistik sıkıştırma: {deleted} eski ham kayıt silindi.")
+        except sqlite3.Error as e:
+            logger.error(f"İstatistik sıkıştırma hatası: {e}")
+
+    def _run(self) -> None:
+        conn = self._connect()
+        deadline = time.monotonic() + self.flush_interval
+        next_compaction = time.monotonic() + 60
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if item is not None and item[0] == "event":
+                    self._pending.append(item[1])
+                elif item is not None and item[0] == "call":
+                    # Sorgular kendi yazdıklarımızı görsün diye önce bekleyen olaylar yazılır.
+                    self._flush(conn)
+                    _, func, future = item
+                    try:
+                        future.set_result(func(conn))
+                    except Exception as e:
+                        future.set_exception(e)
+                if len(self._pending) >= self.batch_size or time.monotonic() >= deadline:
+                    self._flush(conn)
+                    deadline = time.monotonic() + self.flush_interval
+                if time.monotonic() >= next_compaction:
+                    self._compact(conn)
+                    next_compaction = time.monotonic() + self.compaction_interval
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP and item[0] == "event":
+                    self._pending.append(item[1])
+                elif item is not _STOP and item[0] == "call":
+                    item[2].set_exception(RuntimeError("İstatistik kaydedici kapatıldı."))
+            self._flush(conn)
+        finally:
+            conn.close()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Şablon Motoru Yerel Testi
+Varsayılan şablonlarla örnek duyuruları sınıflandırır; sürüm numarasının doğru
+bulunduğunu, fiyat ve tarihlerin sürüm sanılıp şablona yol açmadığını kontrol eder.
+Kullanım: `python template_selftest.py`
+"""
+
+import sys
+from datetime import datetime
+
+from caption_templates import TemplateEngine, find_version
+
+TEMPLATES = {
+    "guncelleme": {"text": "🚀 KRBRZ VIP BYPASS {surum} güncellemesi yayında! ({tarih})",
+                   "keywords": ["güncelleme", "güncellendi", "update", "sürüm", "versiyon", "yama", "patch"]},
+    "bakim": {"text": "🛠️ KRBRZ VIP BYPASS kısa bir bakım çalışmasında ({tarih} {saat}).",
+              "keywords": ["bakım", "maintenance", "geçici olarak", "kapalı", "erişilemiyor", "çalışma yapıl"]},
+}
+
+VERSIONS = [
+    ("v2.4.1 yayında", "v2.4.1"),
+    ("Yeni sürüm 2.5 çıktı", "v2.5"),
+    ("2.4.1 sürümü geldi", "v2.4.1"),
+    ("Güncelleme: 3.1", "v3.1"),
+    ("Yama v1.2, fiyat 1.500 TL", "v1.2"),
+    ("Fiyat güncellendi: 1.500 TL", None),
+    ("Yeni paket 1.500₺", None),
+    ("Güncelleme 18.10'da", None),
+    ("Güncelleme 18.10.2026 tarihinde", None),
+    ("Güncelleme 1.500 kullanıcıya ulaştı", None),
+]
+
+CAPTIONS = [
+    ("Yeni güncelleme: sürüm 2.7 yayında", "guncelleme"),
+    ("Fiyat güncellendi: 1.500 TL", None),
+    ("Güncelleme 18.10'da", None),
+    ("Sunucular bakım nedeniyle geçici olarak kapalı", "bakim"),
+]
+
+
+def run_checks():
+    results = []
+    for text, expected in VERSIONS:
+        results.append((f"Sürüm: {text!r} → {expected}", find_version(text) == expected))
+    engine = TemplateEngine(TEMPLATES, clock=lambda: datetime(2026, 10, 18, 12, 0))
+    for text, expected in CAPTIONS:
+        match = engine.render(text, "")
+        results.append((f"Şablon: {text!r} → {expected}", (match.template.name if match else None) == expected))
+    return results
+
+
+def main():
+    print("🔍 Şablon motoru yerel testi çalıştırılıyor...")
+    results = run_checks()
+    for name, ok in results:
+        print(f"{'✅' if ok else '❌'} {name}")
+    failed = [name for name, ok in results if not ok]
+    if failed:
+        print(f"\n❌ {len(failed)} kontrol başarısız.")
+        sys.exit(1)
+    print("\n🎉 Tüm şablon kontrolleri başarılı!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Görsel Analiz Ön İşleme
+Gemini'ye gönderilmeden önce görselin gerçek MIME türü baytlarından tespit edilir,
+uzun kenarı `max_edge` pikseli aşıyorsa küçültülüp ayarlı kalitede JPEG olarak yeniden
+kodlanır. Kısa bir başlık için tam çözünürlük gerekmez; küçük gövde hem gecikmeyi hem
+token maliyetini düşürür.
+"""
+
+import asyncio
+import io
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+from PIL import Image
+
+from media_buffer import MemoryViewReader
+
+logger = logging.getLogger(__name__)
+
+# Gemini'nin satır içi (inline_data) kabul ettiği görsel türleri.
+GEMINI_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/heic", "image/heif"}
+
+
+def sniff_mime(data) -> Optional[str]:
+    """Dosya imzasından (magic bytes) görsel türünü bulur; tanınmazsa None döner."""
+    head = bytes(memoryview(data)[:16])
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"heic", b"heix", b"hevc", b"hevx"):
+            return "image/heic"
+        if brand in (b"mif1", b"msf1"):
+            return "image/heif"
+    return None
+
+
+def pick_photo_size(sizes: List[Dict], max_edge: int) -> Dict:
+    """Uzun kenarı `max_edge`'e yeten en küçük PhotoSize'ı seçer; hiçbiri yetmezse en büyüğünü."""
+    if max_edge > 0:
+        for size in sorted(sizes, key=lambda s: s["width"] * s["height"]):
+            if max(size["width"], size["height"]) >= max_edge:
+                return size
+    return max(sizes, key=lambda s: s["width"] * s["height"])
+
+
+@dataclass
+class PreparedImage:
+    """Gemini'ye gönderilecek görsel ve boyut bilgisi."""
+    data: Union[bytes, memoryview]
+    mime_type: str
+    original_bytes: int
+    resized: bool
+
+    @property
+    def sent_bytes(self) -> int:
+        return len(self.data)
+
+
+def prepare_image(data, max_edge: int = 768, quality: int = 80) -> PreparedImage:
+    """Görseli gerekirse küçültüp JPEG'e çevirir (senkron, iş parçacığında çağrılır).
+
+    Zaten yeterince küçük ve Gemini'nin desteklediği türdeki görseller kopyalanmadan aynen döner.
+    """
+    mime_type = sniff_mime(data)
+    with Image.open(MemoryViewReader(data)) as image:
+        if max_edge <= 0 or (max(image.size) <= max_edge and mime_type in GEMINI_IMAGE_TYPES):
+            return PreparedImage(data, mime_type or "image/jpeg", len(data), False)
+        # Görsel asla büyütülmez; desteklenmeyen türdeki küçük görseller yalnızca JPEG'e çevrilir.
+        scale = min(1.0, max_edge / max(image.size))
+        if scale < 1.0:
+            target = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            # JPEG'lerde çözme sırasında DCT ölçekleme yapılır; tam çözünürlüklü kare hiç açılmaz.
+            image.draft("RGB", target)
+            small = image.convert("RGB").resize(target, Image.BICUBIC, reducing_gap=2.0)
+        else:
+            small = image.convert("RGB")
+    buffer = io.BytesIO()
+    small.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return PreparedImage(buffer.getvalue(), "image/jpeg", len(data), scale < 1.0)
+
+
+class VisionPreprocessor:
+    """Ön işleme ayarlarını tutar ve işi olay döngüsü dışında çalıştırır."""
+
+    def __init__(self, enabled: bool = True, max_edge: int = 768, quality: int = 80):
+        self.enabled = enabled
+        self.max_edge = max_edge if enabled else 0
+        self.quality = quality
+
+    @property
+    def cache_tag(self) -> str:
+        """Önbellek anahtarına eklenir; ayarlar değişince eski başlıklar kullanılmaz."""
+        return f"{self.max_edge}:{self.quality}"
+
+    async def prepare(self, data) -> PreparedImage:
+        try:
+            return await asyncio.to_thread(prepare_image, data, self.max_edge, self.quality)
+        except Exception as e:
+            logger.warning(f"Görsel ön işlenemedi, orijinali gönderilecek: {e}")
+            return PreparedImage(data, sniff_mime(data) or "image/jpeg", len(data), False)
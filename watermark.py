@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Filigran Oluşturucu
+Fontlar bir kez yüklenir, yazı damgası (text, renk, font boyutu) için bir kez çizilip
+önbelleğe alınır ve görsele yalnızca damganın kapladığı alan kadar yapıştırılır.
+Pillow işleri olay döngüsünü bekletmemek için bir işçi havuzunda çalıştırılır.
+"""
+
+import asyncio
+import io
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from media_buffer import MemoryViewReader
+
+logger = logging.getLogger(__name__)
+
+FONT_PATHS = ['/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 'arial.ttf', '/System/Library/Fonts/Supplemental/Arial.ttf']
+COLORS = {"beyaz": (255, 255, 255, 180), "siyah": (0, 0, 0, 180), "kirmizi": (255, 0, 0, 180)}
+MARGIN = 15
+
+
+@lru_cache(maxsize=1)
+def _font_path() -> Optional[str]:
+    for path in FONT_PATHS:
+        try:
+            ImageFont.truetype(path, size=12)
+            return path
+        except IOError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=32)
+def _load_font(size: int):
+    path = _font_path()
+    return ImageFont.truetype(path, size=size) if path else ImageFont.load_default()
+
+
+@lru_cache(maxsize=64)
+def render_stamp(text: str, color: str, font_size: int) -> Tuple[Image.Image, Tuple[int, int]]:
+    """Yazıyı yalnızca kendi sınır kutusu büyüklüğünde bir RGBA damgaya çizer."""
+    font = _load_font(font_size)
+    left, top, right, bottom = ImageDraw.Draw(Image.new("RGBA", (1, 1))).textbbox((0, 0), text, font=font)
+    stamp = Image.new("RGBA", (max(1, right - left), max(1, bottom - top)), (255, 255, 255, 0))
+    fill_color = COLORS.get(color.lower(), COLORS["beyaz"])
+    ImageDraw.Draw(stamp).text((-left, -top), text, font=font, fill=fill_color)
+    return stamp, (left, top)
+
+
+def watermark_bytes(photo_bytes, wm_config: Dict, quality: int = 95) -> bytes:
+    """Görsele filigran basar ve JPEG olarak geri döndürür (senkron, işçi havuzunda çağrılır).
+
+    Girdi (`bytes` ya da `memoryview`) kopyalanmadan okunur; görsel zaten RGB ise ikinci bir
+    tam kare kopya oluşturulmadan damga doğrudan üzerine yapıştırılır.
+    """
+    with Image.open(MemoryViewReader(photo_bytes)) as source:
+        source.load()
+        base = source if source.mode == "RGB" else source.convert("RGB")
+        return _stamp_and_encode(base, wm_config, quality)
+
+
+def _stamp_and_encode(base: Image.Image, wm_config: Dict, quality: int) -> bytes:
+    font_size = max(15, base.size[1] // 25)
+    stamp, (offset_x, offset_y) = render_stamp(wm_config.get("text", "KRBRZ_VIP"), wm_config.get("color", "beyaz"), font_size)
+    text_width, text_height = stamp.size
+    positions = {'sag-alt': (base.width - text_width - MARGIN, base.height - text_height - MARGIN), 'sol-ust': (MARGIN, MARGIN)}
+    x, y = positions.get(wm_config.get("position", "sag-alt"), positions['sag-alt'])
+    # Tam kare katman yerine sadece damganın kutusu alfa maskesiyle yapıştırılır.
+    base.paste(stamp, (x + offset_x, y + offset_y), mask=stamp)
+    buffer = io.BytesIO()
+    base.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class WatermarkRenderer:
+    """Filigran işlerini olay döngüsü dışında, bir işçi havuzunda çalıştırır."""
+
+    def __init__(self, max_workers: int = 2, quality: int = 95, executor: Optional[Executor] = None):
+        self.quality = quality
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="watermark")
+
+    async def apply(self, photo_bytes: bytes, wm_config: Dict) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, watermark_bytes, photo_bytes, dict(wm_config), self.quality)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
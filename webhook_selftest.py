@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Webhook Yerel Testi
+Ağ ya da gerçek bir bot token'ı gerektirmeden, sahte güncellemeleri webhook uç
+noktasına gönderir ve gizli anahtar doğrulamasını, kuyruğa alma ile `/health`
+yanıtını kontrol eder. Kullanım: `python webhook_selftest.py`
+"""
+
+import asyncio
+import sys
+
+import httpx
+from telegram.ext import Application
+
+from webhook_server import SECRET_HEADER, WEBHOOK_PATH, build_web_app
+
+SECRET = "yerel-test-anahtari"
+
+
+def synthetic_update(update_id):
+    """Kanal gönderisi içeren örnek bir Telegram güncellemesi."""
+    return {
+        "update_id": update_id,
+        "channel_post": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": -1001234567890, "type": "channel", "title": "Test Kanalı"},
+            "text": f"Sahte gönderi #{update_id}",
+        },
+    }
+
+
+async def run_checks():
+    application = Application.builder().token("123456:TEST").build()
+    web_app = build_web_app(application, SECRET, health=lambda: {"outbox_in_flight": 0},
+                            metrics=lambda: "# TYPE krbrz_test_total counter\nkrbrz_test_total 1\n")
+    transport = httpx.ASGITransport(app=web_app)
+    results = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(WEBHOOK_PATH, json=synthetic_update(1))
+        results.append(("Gizli anahtarsız istek reddedilir", response.status_code == 403))
+
+        response = await client.post(WEBHOOK_PATH, json=synthetic_update(2), headers={SECRET_HEADER: "yanlis"})
+        results.append(("Yanlış gizli anahtar reddedilir", response.status_code == 403))
+
+        response = await client.post(WEBHOOK_PATH, content=b"{bozuk", headers={SECRET_HEADER: SECRET})
+        results.append(("Bozuk gövde 400 döner", response.status_code == 400))
+
+        for update_id in (10, 11, 12):
+            response = await client.post(WEBHOOK_PATH, json=synthetic_update(update_id), headers={SECRET_HEADER: SECRET})
+            results.append((f"Geçerli güncelleme #{update_id} kabul edilir", response.status_code == 200))
+
+        queued = []
+        while not application.update_queue.empty():
+            queued.append(application.update_queue.get_nowait())
+        results.append(("Yalnızca geçerli güncellemeler kuyruğa alınır", [u.update_id for u in queued] == [10, 11, 12]))
+        results.append(("Güncelleme kanal gönderisi olarak çözülür", bool(queued) and queued[0].channel_post.text == "Sahte gönderi #10"))
+
+        response = await client.get("/health")
+        body = response.json()
+        results.append(("/health yanıt verir", response.status_code == 200 and body.get("status") == "ok" and "outbox_in_flight" in body))
+
+        response = await client.get("/metrics")
+        results.append(("/metrics Prometheus metni döner", response.status_code == 200 and "krbrz_test_total 1" in response.text))
+
+    return results
+
+
+def main():
+    print("🔍 Webhook yerel testi çalıştırılıyor...")
+    results = asyncio.run(run_checks())
+    for name, ok in results:
+        print(f"{'✅' if ok else '❌'} {name}")
+    failed = [name for name, ok in results if not ok]
+    if failed:
+        print(f"\n❌ {len(failed)} kontrol başarısız.")
+        sys.exit(1)
+    print("\n🎉 Tüm webhook kontrolleri başarılı!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+KRBRZ VIP Bot - Webhook ve Sağlık Kontrolü Sunucusu
+Telegram güncellemelerini ve `/health` uç noktasını, `Application` ile aynı asyncio
+döngüsünde çalışan bir ASGI sunucusundan (Starlette + Uvicorn) sunar. Webhook isteği
+`X-Telegram-Bot-Api-Secret-Token` başlığı ile doğrulanır. Polling modunda da aynı
+sunucu `/health` ve (verilmişse) Prometheus biçimindeki `/metrics` için çalışır.
+"""
+
+import hmac
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+WEBHOOK_PATH = "/telegram"
+
+
+def build_web_app(application: Application, secret_token: Optional[str], webhook_enabled: bool = True,
+                  health: Optional[Callable[[], Dict[str, Any]]] = None, extra_routes: Optional[list] = None,
+                  metrics: Optional[Callable[[], str]] = None) -> Starlette:
+    """Webhook ve sağlık kontrolü rotalarını içeren Starlette uygulamasını oluşturur."""
+    started_at = time.monotonic()
+
+    async def telegram_webhook(request: Request) -> Response:
+        received = request.headers.get(SECRET_HEADER, "")
+        if not secret_token or not hmac.compare_digest(received, secret_token):
+            logger.warning("Geçersiz gizli anahtarla webhook isteği reddedildi.")
+            return PlainTextResponse("forbidden", status_code=403)
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except Exception as e:
+            logger.error(f"Webhook gövdesi çözümlenemedi: {e}")
+            return PlainTextResponse("bad request", status_code=400)
+        await application.update_queue.put(update)
+        return Response(status_code=200)
+
+    async def health_check(request: Request) -> Response:
+        info = {"status": "ok", "uptime": round(time.monotonic() - started_at, 1)}
+        if health:
+            info.update(health())
+        return JSONResponse(info)
+
+    async def metrics_endpoint(request: Request) -> Response:
+        return PlainTextResponse(metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    routes = [Route("/health", health_check, methods=["GET"])]
+    if metrics:
+        routes.append(Route("/metrics", metrics_endpoint, methods=["GET"]))
+    if webhook_enabled:
+        routes.append(Route(WEBHOOK_PATH, telegram_webhook, methods=["POST"]))
+    routes.extend(extra_routes or [])
+    return Starlette(routes=routes)
+
+
+async def serve(application: Application, port: int, mode: str = "webhook", webhook_url: Optional[str] = None,
+                secret_token: Optional[str] = None, health: Optional[Callable[[], Dict[str, Any]]] = None,
+                extra_routes: Optional[list] = None, metrics: Optional[Callable[[], str]] = None) -> None:
+    """Botu başlatır, HTTP sunucusunu aynı döngüde çalıştırır ve sunucu durunca botu kapatır.
+
+    `run_polling`/`run_webhook` kullanılmadığı için `post_init`/`post_shutdown` burada çağrılır.
+    """
+    import uvicorn
+
+    webhook_enabled = mode == "webhook"
+    web_app = build_web_app(application, secret_token, webhook_enabled, health, extra_routes, metrics)
+    server = uvicorn.Server(uvicorn.Config(web_app, host="0.0.0.0", port=port, log_level="warning", access_log=False))
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    if webhook_enabled:
+        await application.bot.set_webhook(url=f"{webhook_url.rstrip('/')}{WEBHOOK_PATH}", secret_token=secret_token,
+                                          allowed_updates=Update.ALL_TYPES)
+        logger.info(f"Webhook ayarlandı: {webhook_url.rstrip('/')}{WEBHOOK_PATH}")
+    else:
+        await application.bot.delete_webhook()
+        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=False)
+    await application.start()
+    logger.info(f"HTTP sunucusu {port} portunda dinlemede (mod: {mode}).")
+    try:
+        await server.serve()
+    finally:
+        if application.updater.running:
+            await application.updater.stop()
+        await application.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        await application.shutdown()